@@ -0,0 +1,442 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+from argparse import ArgumentParser
+
+from . import report
+from .completion import bench_completion
+from .crawling import bench_crawling
+from .fuzzy import bench_fuzzy
+from .indexing import ANALYSES, bench_indexing
+from .memory import LAYOUTS, bench_memory
+from .querying import bench_queries
+from .startup import bench_cold_query, bench_import
+
+
+def parse_args():
+    parser = ArgumentParser(
+        prog="Benchmark",
+        description="Script para medir el rendimiento del buscador sobre"
+        " corpus y webs sintéticos.",
+    )
+
+    parser.add_argument(
+        "-d",
+        "--directorio",
+        type=str,
+        default=os.path.join(tempfile.gettempdir(), "benchmark"),
+        help="Carpeta de trabajo donde generar los corpus y los índices",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--salida",
+        type=str,
+        help="Fichero JSON donde guardar los resultados",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--comparar",
+        type=str,
+        help="Fichero JSON con resultados de referencia. Si alguna métrica"
+        " empeora más de la tolerancia, el script termina con error",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--tolerancia",
+        type=float,
+        default=0.1,
+        help="Empeoramiento relativo admitido al comparar, e.g., 0.1 = 10%%",
+    )
+
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    indexado = subparsers.add_parser(
+        "indexado",
+        help="Tiempo y pico de memoria de la construcción del índice",
+    )
+    indexado.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[1000, 4000, 16000],
+        help="Tamaños de corpus a medir",
+    )
+    indexado.add_argument(
+        "-m",
+        "--memoria",
+        type=int,
+        nargs="+",
+        default=[0, 16],
+        help="Presupuestos de memoria del indexador en MB, 0 construye en"
+        " memoria",
+    )
+    indexado.add_argument(
+        "-a",
+        "--analisis",
+        type=str,
+        nargs="+",
+        choices=ANALYSES,
+        default=["ninguno"],
+        help="Análisis de los términos a medir. El tamaño del índice de"
+        " cada uno muestra cuánto reduce el vocabulario",
+    )
+
+    crawling = subparsers.add_parser(
+        "crawling",
+        help="Páginas por segundo del crawler contra una web local",
+    )
+    crawling.add_argument(
+        "-p", "--paginas", type=int, default=300, help="Páginas HTML"
+    )
+    crawling.add_argument("--pdfs", type=int, default=20, help="PDFs")
+    crawling.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        nargs="+",
+        default=[multiprocessing.cpu_count()],
+        help="Peticiones concurrentes del crawler a medir",
+    )
+    crawling.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Procesos del crawler a medir",
+    )
+    crawling.add_argument(
+        "-l",
+        "--limite",
+        type=int,
+        default=0,
+        help="Peticiones por segundo a partir de las que el servidor"
+        " responde 429, 0 para no limitar",
+    )
+    crawling.add_argument(
+        "-v",
+        "--variantes",
+        type=int,
+        default=0,
+        help="Variantes casi duplicadas de cada página (?orden=N)",
+    )
+    crawling.add_argument(
+        "--distancia-duplicados",
+        type=int,
+        nargs="+",
+        default=[-1],
+        help="Distancias de casi duplicados del crawler a medir, -1 no los"
+        " detecta",
+    )
+
+    consultas = subparsers.add_parser(
+        "consultas",
+        help="Tiempo de carga del índice y latencia de las queries",
+    )
+    consultas.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[4000],
+        help="Tamaños de corpus a medir",
+    )
+    consultas.add_argument(
+        "-q",
+        "--queries",
+        type=int,
+        default=200,
+        help="Número de queries por mezcla",
+    )
+    consultas.add_argument(
+        "-r",
+        "--ranking",
+        type=str,
+        nargs="+",
+        choices=["coseno", "bm25"],
+        default=["coseno", "bm25"],
+        help="Funciones de puntuación a medir",
+    )
+    consultas.add_argument(
+        "--orden-estatico",
+        action="store_true",
+        help="Numera los documentos del índice por PageRank, lo que permite"
+        " la parada temprana de BM25",
+    )
+    consultas.add_argument(
+        "--parada-temprana",
+        action="store_true",
+        help="Puntúa con BM25 con parada temprana. Necesita --orden-estatico",
+    )
+
+    memoria = subparsers.add_parser(
+        "memoria",
+        help="Memoria residente que ocupa el índice una vez cargado",
+    )
+    memoria.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[4000],
+        help="Tamaños de corpus a medir",
+    )
+    memoria.add_argument(
+        "-d",
+        "--disposicion",
+        type=str,
+        nargs="+",
+        choices=LAYOUTS,
+        default=list(LAYOUTS),
+        help="Disposiciones del índice en memoria a medir. La de listas es"
+        " la anterior a la compacta y sirve de referencia",
+    )
+
+    autocompletado = subparsers.add_parser(
+        "autocompletado",
+        help="Latencia del autocompletado por pulsación y memoria de su"
+        " estructura",
+    )
+    autocompletado.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[4000],
+        help="Tamaños de corpus a medir",
+    )
+    autocompletado.add_argument(
+        "-p",
+        "--palabras",
+        type=int,
+        default=500,
+        help="Términos que se escriben letra a letra",
+    )
+
+    difusa = subparsers.add_parser(
+        "difusa",
+        help="Latencia de las búsquedas tolerantes a errores",
+    )
+    difusa.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[4000],
+        help="Tamaños de corpus a medir",
+    )
+    difusa.add_argument(
+        "-e",
+        "--erratas",
+        type=int,
+        default=2000,
+        help="Erratas buscadas",
+    )
+    difusa.add_argument(
+        "--terminos",
+        type=int,
+        nargs="+",
+        default=[1, 64],
+        help="Términos devueltos por búsqueda: 1 en las sugerencias y"
+        " --max-expansiones en el operador ~",
+    )
+    difusa.add_argument(
+        "--presupuesto-difusa",
+        type=float,
+        default=1,
+        help="Milisegundos máximos de la mediana y la media de la latencia."
+        " Si se superan, el script termina con error",
+    )
+    difusa.add_argument(
+        "--presupuesto-difusa-p99",
+        type=float,
+        default=2,
+        help="Milisegundos máximos del percentil 99 de la latencia. Si se"
+        " superan, el script termina con error",
+    )
+
+    arranque = subparsers.add_parser(
+        "arranque",
+        help="Tiempo de import del retriever y latencia de una query en un"
+        " proceso nuevo",
+    )
+    arranque.add_argument(
+        "-n",
+        "--documentos",
+        type=int,
+        nargs="+",
+        default=[4000],
+        help="Tamaños de corpus a medir",
+    )
+    arranque.add_argument(
+        "-r",
+        "--repeticiones",
+        type=int,
+        default=5,
+        help="Procesos lanzados por medición, se reporta la mediana",
+    )
+    arranque.add_argument(
+        "--presupuesto-importacion",
+        type=float,
+        default=100,
+        help="Milisegundos máximos para importar el retriever. Si se"
+        " superan, el script termina con error",
+    )
+    arranque.add_argument(
+        "--presupuesto-consulta",
+        type=float,
+        default=1000,
+        help="Milisegundos máximos para resolver una query en un proceso"
+        " nuevo. Si se superan, el script termina con error",
+    )
+
+    subparsers.add_parser("todo", help="Todos los benchmarks con sus valores")
+
+    args = parser.parse_args()
+    if (
+        args.benchmark == "consultas"
+        and args.parada_temprana
+        and not args.orden_estatico
+    ):
+        parser.error("La parada temprana necesita --orden-estatico.")
+    if args.benchmark == "todo":
+        args.documentos = [1000, 4000]
+        args.memoria = [0, 16]
+        args.analisis = list(ANALYSES)
+        args.disposicion = list(LAYOUTS)
+        args.paginas = 300
+        args.pdfs = 20
+        args.jobs = [multiprocessing.cpu_count()]
+        args.workers = [1]
+        args.limite = 0
+        args.variantes = 0
+        args.distancia_duplicados = [-1]
+        args.queries = 200
+        args.palabras = 500
+        args.erratas = 2000
+        args.terminos = [1, 64]
+        args.ranking = ["coseno", "bm25"]
+        args.orden_estatico = False
+        args.parada_temprana = False
+        args.repeticiones = 5
+        args.presupuesto_importacion = 100
+        args.presupuesto_consulta = 1000
+        args.presupuesto_difusa = 1
+        args.presupuesto_difusa_p99 = 2
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = []
+
+    if args.benchmark in ("indexado", "todo"):
+        for n_docs in args.documentos:
+            for memoria in args.memoria:
+                for analisis in args.analisis:
+                    results.append(
+                        bench_indexing(
+                            args.directorio, n_docs, memoria, analisis=analisis
+                        )
+                    )
+                    print(report.format_result(results[-1]))
+
+    if args.benchmark in ("crawling", "todo"):
+        for jobs in args.jobs:
+            for distance in args.distancia_duplicados:
+                for workers in args.workers:
+                    results.append(
+                        bench_crawling(
+                            args.directorio,
+                            args.paginas,
+                            args.pdfs,
+                            jobs,
+                            args.limite,
+                            args.variantes,
+                            distance,
+                            workers,
+                        )
+                    )
+                    print(report.format_result(results[-1]))
+
+    if args.benchmark in ("consultas", "todo"):
+        for n_docs in args.documentos:
+            for ranking in args.ranking:
+                for result in bench_queries(
+                    args.directorio,
+                    n_docs,
+                    args.queries,
+                    ranking,
+                    args.orden_estatico,
+                    early_stop=args.parada_temprana,
+                ):
+                    results.append(result)
+                    print(report.format_result(result))
+
+    if args.benchmark in ("memoria", "todo"):
+        for n_docs in args.documentos:
+            for layout in args.disposicion:
+                results.append(
+                    bench_memory(args.directorio, n_docs, layout=layout)
+                )
+                print(report.format_result(results[-1]))
+
+    if args.benchmark in ("autocompletado", "todo"):
+        for n_docs in args.documentos:
+            results.append(
+                bench_completion(args.directorio, n_docs, args.palabras)
+            )
+            print(report.format_result(results[-1]))
+
+    exceeded = []
+    if args.benchmark in ("difusa", "todo"):
+        budgets = {
+            "p50": args.presupuesto_difusa / 1000,
+            "mean": args.presupuesto_difusa / 1000,
+            "p99": args.presupuesto_difusa_p99 / 1000,
+        }
+        for n_docs in args.documentos:
+            for limit in args.terminos:
+                results.append(
+                    bench_fuzzy(args.directorio, n_docs, args.erratas, limit)
+                )
+                print(report.format_result(results[-1]))
+                exceeded += report.check_budgets(results[-1], budgets)
+
+    if args.benchmark in ("arranque", "todo"):
+        budgets = {
+            "import_time": args.presupuesto_importacion / 1000,
+            "cold_query": args.presupuesto_consulta / 1000,
+        }
+        results.append(bench_import(args.repeticiones))
+        print(report.format_result(results[-1]))
+        exceeded += report.check_budgets(results[-1], budgets)
+        for n_docs in args.documentos:
+            results.append(
+                bench_cold_query(args.directorio, n_docs, args.repeticiones)
+            )
+            print(report.format_result(results[-1]))
+            exceeded += report.check_budgets(results[-1], budgets)
+
+    for budget in exceeded:
+        print(f"PRESUPUESTO EXCEDIDO: {budget}")
+
+    if args.salida:
+        report.save(results, args.salida)
+
+    if args.comparar:
+        regressions = report.compare(
+            results, report.load(args.comparar), args.tolerancia
+        )
+        for regression in regressions:
+            print(f"REGRESIÓN: {regression}")
+        if regressions:
+            sys.exit(1)
+
+    if exceeded:
+        sys.exit(1)
@@ -0,0 +1,74 @@
+import os
+import random
+import statistics
+import sys
+from time import perf_counter
+from typing import Any, Dict
+
+from .indexing import build_index, corpus_folder, measure
+from .querying import retriever_args
+
+
+def run_completions(
+    index_file: str, n_words: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Carga el índice y autocompleta cada prefijo de `n_words` términos del
+    vocabulario, como si se escribieran letra a letra, midiendo la latencia
+    de cada pulsación. Mide también la memoria de la estructura de
+    autocompletado."""
+    from ..retriever.retriever import Retriever  # type: ignore
+
+    retriever = Retriever(retriever_args(index_file))
+    index = retriever.index
+
+    rng = random.Random(seed)
+    words = rng.sample(index.terms, min(n_words, len(index.terms)))
+    latencies = []
+    for word in words:
+        for i in range(1, len(word) + 1):
+            ts = perf_counter()
+            retriever.complete(word[:i])
+            latencies.append(perf_counter() - ts)
+
+    completion_bytes = sys.getsizeof(index.completions) + sys.getsizeof(
+        index.df
+    )
+    for prefix, ids in index.completions.items():
+        completion_bytes += sys.getsizeof(prefix) + sys.getsizeof(ids)
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "terms": len(index.terms),
+        "prefixes": len(index.completions),
+        "completion_bytes": completion_bytes,
+        "p50": percentiles[49],
+        "p99": percentiles[98],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def bench_completion(
+    workdir: str, n_docs: int, n_words: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Mide la latencia del autocompletado por pulsación y la memoria de su
+    estructura en el índice de un corpus sintético.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        n_words (int): términos que se escriben letra a letra
+        seed (int): semilla del corpus y de los términos
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    output = os.path.join(workdir, f"index-{n_docs}-{seed}-0")
+    index_file = os.path.join(output, "index")
+    if not os.path.exists(index_file):
+        measure(build_index, corpus_folder(workdir, n_docs, seed), output, 0)
+
+    res = measure(run_completions, index_file, n_words, seed)
+    return {
+        "benchmark": "autocompletado",
+        "params": {"docs": n_docs},
+        "metrics": res["value"],
+    }
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+from typing import List, Set
+
+# Palabras funcionales, las más frecuentes en cualquier texto en español
+_function_words = (
+    "de la que el en y a los del se las por un para con no una su al lo como"
+    " más pero sus le ya o este sí porque esta entre cuando muy sin sobre"
+).split()
+
+_syllables = (
+    "ca ce ci co cu da de di do du ga ge gi go la le li lo lu ma me mi mo mu"
+    " na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so su ta te ti to"
+    " tu va ve vi vo bra bre bri tra tre tri pla ple cla cle gra gre in en"
+    " es al ar er or an on"
+).split()
+
+# Sufijos flexivos y derivativos, generan familias de palabras con la misma
+# raíz como hacen los textos reales
+_suffixes = (
+    " a o os as ar er ir ado ada ados adas ción ciones mente ía ías ista"
+    " istas ero era eros eras ía ido ida"
+).split(" ")
+
+_accents = str.maketrans("aeiou", "áéíóú")
+
+
+class Corpus:
+    """Generador de un corpus sintético con apariencia de español.
+
+    El vocabulario se compone de raíces formadas por sílabas y sufijos
+    flexivos, con variantes acentuadas y en mayúsculas. Las palabras siguen
+    una distribución de Zipf, de modo que el vocabulario crece de forma
+    sublineal con el tamaño del corpus como en un corpus real.
+    """
+
+    def __init__(self, n_stems: int = 20000, seed: int = 0):
+        self.rng = random.Random(seed)
+
+        stems: Set[str] = set()
+        while len(stems) < n_stems:
+            n = self.rng.randint(1, 3)
+            stems.add("".join(self.rng.choices(_syllables, k=n)))
+
+        words: List[str] = []
+        for stem in sorted(stems):
+            for suffix in self.rng.sample(_suffixes, 3):
+                words.append(stem + suffix)
+        self.rng.shuffle(words)
+        self.words = _function_words + words
+
+        weights = [1 / rank for rank in range(1, len(self.words) + 1)]
+        self.cum_weights = []
+        acc = 0.0
+        for weight in weights:
+            acc += weight
+            self.cum_weights.append(acc)
+
+    def sentence(self, n_words: int) -> str:
+        """Genera una frase de `n_words` palabras"""
+        words = self.rng.choices(
+            self.words, cum_weights=self.cum_weights, k=n_words
+        )
+        for i, word in enumerate(words):
+            r = self.rng.random()
+            if r < 0.02:
+                words[i] = word.translate(_accents)
+            elif r < 0.05:
+                words[i] = word.capitalize()
+        return " ".join(words) + "."
+
+    def html(self, title: str, links: List[str], n_words: int) -> str:
+        """Genera una página HTML con el contenido principal dentro de
+        <div class="page">, como las de la web de la universidad.
+
+        Args:
+            title (str): título de la página
+            links (List[str]): URLs a las que enlaza la página
+            n_words (int): número aproximado de palabras del cuerpo
+        Returns:
+            str: contenido HTML de la página
+        """
+        paragraphs = []
+        while n_words > 0:
+            n = min(n_words, self.rng.randint(20, 80))
+            paragraphs.append(f"<p>{self.sentence(n)}</p>")
+            n_words -= n
+
+        anchors = "".join(
+            f'<a href="{link}">{self.sentence(3)}</a>' for link in links
+        )
+        return (
+            f"<html><head><title>{title}</title></head><body>"
+            f"<nav>{self.sentence(10)}</nav>"
+            f'<div class="page"><h1>{title}</h1>{"".join(paragraphs)}'
+            f"{anchors}</div></body></html>"
+        )
+
+    def write(
+        self,
+        output_folder: str,
+        n_docs: int,
+        words_per_doc: int = 300,
+        base_url: str = "https://universidadeuropea.com",
+    ) -> None:
+        """Escribe un corpus con el mismo formato que el crawler: un
+        fichero content.json por página.
+
+        Args:
+            output_folder (str): carpeta destino
+            n_docs (int): número de páginas
+            words_per_doc (int): número medio de palabras por página
+            base_url (str): URL base de las páginas
+        """
+        for i in range(n_docs):
+            url = f"{base_url}/pagina/{i}"
+            links = [
+                f"{base_url}/pagina/{self.rng.randrange(n_docs)}"
+                for _ in range(self.rng.randint(2, 10))
+            ]
+            n_words = max(10, int(self.rng.gauss(words_per_doc, 80)))
+            text = self.html(self.sentence(4), links, n_words)
+
+            folder = os.path.join(output_folder, url.removeprefix("https://"))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "content.json"), "w") as fw:
+                json.dump(
+                    {"url": url, "text": text, "type": "html", "links": links},
+                    fw,
+                )
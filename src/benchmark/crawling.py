@@ -0,0 +1,102 @@
+import asyncio
+import os
+import shutil
+from argparse import Namespace
+from typing import Any, Dict
+
+from .indexing import measure
+from .site import SiteServer
+
+
+def crawl(
+    url: str,
+    max_webs: int,
+    output_folder: str,
+    jobs: int,
+    distancia_duplicados: int = -1,
+    workers: int = 1,
+) -> int:
+    """Ejecuta el crawler y devuelve el número de páginas almacenadas"""
+    from ..crawler.coordinator import Coordinator  # type: ignore
+    from ..crawler.crawler import Crawler  # type: ignore
+
+    args = Namespace(
+        url=url,
+        max_webs=max_webs,
+        output_folder=output_folder,
+        jobs=jobs,
+        distancia_duplicados=distancia_duplicados,
+        tamano_maximo=20,
+        workers=workers,
+        metrics=None,
+    )
+    crawler = Coordinator(args) if workers > 1 else Crawler(args)
+    asyncio.run(crawler.crawl())
+
+    return sum(
+        "content.json" in files for _, _, files in os.walk(output_folder)
+    )
+
+
+def bench_crawling(
+    workdir: str,
+    n_pages: int,
+    n_pdfs: int,
+    jobs: int,
+    max_rate: int,
+    n_variants: int = 0,
+    max_distance: int = -1,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Mide el crawler contra una web sintética servida en local.
+
+    Args:
+        workdir (str): carpeta de trabajo donde almacenar las páginas
+        n_pages (int): número de páginas HTML de la web
+        n_pdfs (int): número de PDFs de la web
+        jobs (int): peticiones concurrentes del crawler
+        max_rate (int): peticiones por segundo a partir de las que el
+            servidor responde 429, 0 para no limitar
+        n_variants (int): variantes casi duplicadas de cada página
+        max_distance (int): distancia de los casi duplicados del crawler,
+            -1 para no detectarlos
+        workers (int): procesos del crawler
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    output = os.path.join(workdir, f"crawl-{n_pages}-{n_pdfs}-{jobs}-{workers}")
+    shutil.rmtree(output, ignore_errors=True)
+
+    # El presupuesto alcanza para toda la web, variantes incluidas. Las
+    # peticiones servidas miden cuántas se ahorra el crawler.
+    with SiteServer(n_pages, n_pdfs, max_rate, n_variants=n_variants) as server:
+        res = measure(
+            crawl,
+            server.url,
+            n_pages * (n_variants + 1) + n_pdfs + 1,
+            output,
+            jobs,
+            max_distance,
+            workers,
+        )
+
+    return {
+        "benchmark": "crawling",
+        "params": {
+            "paginas": n_pages,
+            "pdfs": n_pdfs,
+            "jobs": jobs,
+            "limite": max_rate,
+            "variantes": n_variants,
+            "duplicados": max_distance,
+            "workers": workers,
+        },
+        "metrics": {
+            "time": res["time"],
+            "pages_per_sec": res["value"] / res["time"],
+            "peak_rss": res["peak_rss"],
+            "throttled": server.throttled,
+            "stored": res["value"],
+            "requests": server.served,
+        },
+    }
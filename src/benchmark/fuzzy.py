@@ -0,0 +1,95 @@
+import os
+import random
+import statistics
+from time import perf_counter
+from typing import Any, Dict
+
+from .indexing import build_index, corpus_folder, measure
+
+# Caracteres con los que se insertan o sustituyen letras en las erratas
+_letters = "abcdeilmnoprstu"
+
+
+def _misspell(rng: random.Random, word: str, n_edits: int) -> str:
+    """Aplica `n_edits` ediciones aleatorias a una palabra: inserciones,
+    borrados, sustituciones o transposiciones de caracteres consecutivos"""
+    for _ in range(n_edits):
+        i = rng.randrange(len(word) + 1)
+        edit = rng.randrange(4)
+        if edit == 0 or len(word) < 2:
+            word = word[:i] + rng.choice(_letters) + word[i:]
+        elif edit == 1:
+            i = min(i, len(word) - 1)
+            word = word[:i] + word[i + 1 :]
+        elif edit == 2:
+            i = min(i, len(word) - 1)
+            word = word[:i] + rng.choice(_letters) + word[i + 1 :]
+        else:
+            i = min(i, len(word) - 2)
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+    return word
+
+
+def run_fuzzy(
+    index_file: str, n_words: int, limit: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Carga el índice y busca con `Index.fuzzy` erratas de `n_words`
+    términos del vocabulario, con hasta `max_edit_distance` ediciones,
+    midiendo la latencia de cada búsqueda.
+
+    `limit` es el número de términos buscados: 1 en las sugerencias de
+    "quizás quisiste decir" y `--max-expansiones` en el operador `~`.
+    """
+    from ..indexer.index import Index  # type: ignore
+
+    index = Index.load(index_file)
+    rng = random.Random(seed)
+    words = rng.sample(index.terms, min(n_words, len(index.terms)))
+    typos = [
+        _misspell(rng, word, rng.randint(1, index.max_edit_distance))
+        for word in words
+    ]
+    # La primera búsqueda carga el índice de borrados
+    index.fuzzy(typos[0], limit)
+
+    latencies = []
+    for typo in typos:
+        ts = perf_counter()
+        index.fuzzy(typo, limit)
+        latencies.append(perf_counter() - ts)
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "terms": len(index.terms),
+        "p50": percentiles[49],
+        "p99": percentiles[98],
+        "mean": statistics.fmean(latencies),
+    }
+
+
+def bench_fuzzy(
+    workdir: str, n_docs: int, n_words: int, limit: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Mide la latencia de las búsquedas tolerantes a errores en el índice
+    de un corpus sintético.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        n_words (int): número de erratas buscadas
+        limit (int): número de términos devueltos por búsqueda
+        seed (int): semilla del corpus y de las erratas
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    output = os.path.join(workdir, f"index-{n_docs}-{seed}-0")
+    index_file = os.path.join(output, "index")
+    if not os.path.exists(index_file):
+        measure(build_index, corpus_folder(workdir, n_docs, seed), output, 0)
+
+    res = measure(run_fuzzy, index_file, n_words, limit, seed)
+    return {
+        "benchmark": "difusa",
+        "params": {"docs": n_docs, "limite": limit},
+        "metrics": res["value"],
+    }
@@ -0,0 +1,142 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+from argparse import Namespace
+from time import perf_counter
+from typing import Any, Callable, Dict
+
+from .corpus import Corpus
+
+# Análisis de los términos que se pueden medir: ninguno, sin acentos o con
+# stemming, que también elimina los acentos
+ANALYSES = ("ninguno", "acentos", "stemming")
+
+# Segundos entre comprobaciones de si el proceso de `measure` sigue vivo
+POLL_SECONDS = 1.0
+
+
+def _run(fn: Callable[..., Any], args: tuple, conn) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        ts = perf_counter()
+        value = fn(*args)
+        te = perf_counter()
+    # ru_maxrss está en KB en Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    conn.send({"time": te - ts, "peak_rss": peak, "value": value})
+    conn.close()
+
+
+def measure(fn: Callable[..., Any], *args) -> Dict[str, Any]:
+    """Ejecuta `fn` en un proceso nuevo y mide su duración y su pico de
+    memoria residente. Se usa "spawn" para que el proceso no herede la
+    memoria del proceso que lanza el benchmark.
+
+    Returns:
+        Dict[str, Any]: "time" en segundos, "peak_rss" en bytes y "value",
+            el valor devuelto por `fn`
+    Raises:
+        RuntimeError: si el proceso termina sin devolver el resultado, e.g.,
+            porque `fn` lanza una excepción o el proceso muere por falta de
+            memoria
+    """
+    ctx = multiprocessing.get_context("spawn")
+    conn, child_conn = ctx.Pipe()
+    process = ctx.Process(target=_run, args=(fn, args, child_conn))
+    process.start()
+    # Sin cerrar este extremo, la tubería sigue abierta aunque el proceso
+    # muera y `recv` no termina nunca. Además se comprueba cada
+    # `POLL_SECONDS` si el proceso sigue vivo, por si la tubería la mantiene
+    # abierta otro proceso que haya lanzado `fn`.
+    child_conn.close()
+    while not conn.poll(POLL_SECONDS) and process.exitcode is None:
+        pass
+    try:
+        res = conn.recv() if conn.poll() else None
+    except EOFError:
+        res = None
+    process.join()
+    if res is None:
+        raise RuntimeError(
+            f"{fn.__name__} ha terminado sin resultado"
+            f" (código de salida {process.exitcode})"
+        )
+    return res
+
+
+def corpus_folder(workdir: str, n_docs: int, seed: int = 0) -> str:
+    """Devuelve la carpeta de un corpus sintético de `n_docs` documentos,
+    generándolo si no existe todavía."""
+    corpus = os.path.join(workdir, f"corpus-{n_docs}-{seed}")
+    if not os.path.isdir(corpus):
+        Corpus(seed=seed).write(corpus, n_docs)
+    return corpus
+
+
+def build_index(
+    input_folder: str,
+    output_name: str,
+    memoria: int,
+    orden_estatico: bool = False,
+    analisis: str = "ninguno",
+) -> int:
+    """Construye un índice y devuelve su tamaño en bytes, incluido el
+    fichero del índice de borrados. `analisis` es uno de `ANALYSES`."""
+    from ..indexer.indexer import Indexer  # type: ignore
+
+    args = Namespace(
+        input_folder=input_folder,
+        output_name=output_name,
+        distancia_edicion=2,
+        shards=1,
+        memoria=memoria,
+        sin_acentos=analisis == "acentos",
+        stemming=analisis == "stemming",
+        distancia_duplicados=-1,
+        orden_estatico=orden_estatico,
+    )
+    Indexer(args).build_index()
+    index_file = os.path.join(output_name, "index")
+    return sum(
+        os.path.getsize(fname)
+        for fname in (index_file, index_file + ".deletes")
+        if os.path.exists(fname)
+    )
+
+
+def bench_indexing(
+    workdir: str,
+    n_docs: int,
+    memoria: int,
+    seed: int = 0,
+    analisis: str = "ninguno",
+) -> Dict[str, Any]:
+    """Mide la construcción del índice de un corpus sintético. Su tamaño
+    permite comparar el vocabulario de cada análisis de los términos.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        memoria (int): presupuesto de memoria del indexador en MB, 0 para
+            construir en memoria
+        seed (int): semilla del generador del corpus
+        analisis (str): análisis de los términos, uno de `ANALYSES`
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    corpus = corpus_folder(workdir, n_docs, seed)
+    output = os.path.join(
+        workdir, f"index-{n_docs}-{seed}-{memoria}-{analisis}"
+    )
+    res = measure(build_index, corpus, output, memoria, False, analisis)
+    return {
+        "benchmark": "indexado",
+        "params": {"docs": n_docs, "memoria_mb": memoria, "analisis": analisis},
+        "metrics": {
+            "time": res["time"],
+            "docs_per_sec": n_docs / res["time"],
+            "peak_rss": res["peak_rss"],
+            "index_bytes": res["value"],
+        },
+    }
@@ -0,0 +1,111 @@
+import os
+from dataclasses import dataclass, field, fields, replace
+from time import perf_counter
+from typing import Any, Dict, List
+
+from .indexing import build_index, corpus_folder, measure
+
+# Disposiciones del índice en memoria que se pueden medir: la actual, con
+# `array` y documentos con `__slots__`, y la anterior, con listas de enteros
+# y documentos con `__dict__`, como referencia de cuánto ahorra la actual.
+#
+# El ahorro crece con el tamaño del índice. En índices pequeños casi todas
+# las posting lists tienen uno o dos documentos, y un `array` ocupa lo mismo
+# que una lista con sus enteros. Medido con el corpus sintético: 8,4 frente
+# a 9,0 MB (-7%) con 300 documentos, 33 frente a 47 MB (-29%) con 2000 y
+# 44 frente a 75 MB (-41%) con 4000.
+LAYOUTS = ("compacta", "listas")
+
+
+@dataclass
+class _ListDocument:
+    """`Document` sin `__slots__`, como se guardaba en la disposición
+    "listas"."""
+
+    id: int
+    title: str
+    url: str
+    text: str
+    snippet: str
+    partial_score: float
+    aliases: List[str] = field(default_factory=lambda: [])
+
+
+def _rss() -> int:
+    """Memoria residente actual del proceso, en bytes (solo Linux)"""
+    with open("/proc/self/statm", "r") as fr:
+        return int(fr.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def list_layout(index_file: str, output_name: str) -> None:
+    """Guarda en `output_name` una copia de un índice con la disposición
+    "listas": las posting lists, las frecuencias y el resto de `array` como
+    listas de enteros, y los documentos con `__dict__`."""
+    from ..indexer.index import Document, Index  # type: ignore
+
+    index = Index.load(index_file)
+    names = [f.name for f in fields(Document)]
+    replace(
+        index,
+        postings={t: list(docs) for t, docs in index.postings.items()},
+        frequencies={t: list(fs) for t, fs in index.frequencies.items()},
+        documents=[
+            _ListDocument(*(getattr(doc, name) for name in names))
+            for doc in index.documents
+        ],
+        doc_lengths=list(index.doc_lengths),
+        static_rank=list(index.static_rank),
+        df=list(index.df),
+        word_df=list(index.word_df),
+    ).save(output_name)
+
+
+def load_index(index_file: str) -> Dict[str, float]:
+    """Carga un índice y mide cuánta memoria residente ocupa una vez
+    cargado, sin contar la del intérprete ni la de los módulos."""
+    from ..indexer.index import Index  # type: ignore
+
+    before = _rss()
+    ts = perf_counter()
+    index = Index.load(index_file)
+    load_time = perf_counter() - ts
+    res = {"index_rss": _rss() - before, "load_time": load_time}
+    del index
+    return res
+
+
+def bench_memory(
+    workdir: str, n_docs: int, seed: int = 0, layout: str = "compacta"
+) -> Dict[str, Any]:
+    """Mide la memoria que ocupa el índice de un corpus sintético una vez
+    cargado por el retriever.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        seed (int): semilla del generador del corpus
+        layout (str): disposición del índice en memoria, una de `LAYOUTS`
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    output = os.path.join(workdir, f"index-{n_docs}-{seed}-0")
+    index_file = os.path.join(output, "index")
+    if not os.path.exists(index_file):
+        measure(build_index, corpus_folder(workdir, n_docs, seed), output, 0)
+
+    if layout == "listas":
+        list_file = os.path.join(f"{output}-listas", "index")
+        if not os.path.exists(list_file):
+            measure(list_layout, index_file, list_file)
+        index_file = list_file
+
+    res = measure(load_index, index_file)
+    return {
+        "benchmark": "memoria",
+        "params": {"docs": n_docs, "disposicion": layout},
+        "metrics": {
+            "index_rss": res["value"]["index_rss"],
+            "load_time": res["value"]["load_time"],
+            "peak_rss": res["peak_rss"],
+        },
+    }
@@ -0,0 +1,177 @@
+import os
+import random
+import statistics
+from argparse import Namespace
+from time import perf_counter
+from typing import Any, Dict, List
+
+from .indexing import build_index, corpus_folder, measure
+
+# Mezclas de queries. Cada una ejercita una parte distinta del retriever:
+# términos sueltos, expansión de comodines, búsqueda tolerante a errores,
+# árboles profundos y NOT sobre términos raros, que devuelven casi todo el
+# índice.
+MIXES = ("termino", "comodin", "difusa", "profunda", "not_amplio")
+
+
+def retriever_args(index_file: str, **kwargs) -> Namespace:
+    """Argumentos por defecto del retriever, como los de su app"""
+    args = Namespace(
+        index_file=index_file,
+        max_resultados=10,
+        max_expansiones=64,
+        ranking="coseno",
+        k1=1.2,
+        b=0.75,
+        peso_estatico=0.0,
+        parada_temprana=False,
+        shards=1,
+        sugerencias=False,
+        max_completions=10,
+        metrics=None,
+    )
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+
+def _typo(rng: random.Random, word: str) -> str:
+    """Intercambia dos caracteres consecutivos de una palabra"""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2 :]
+
+
+def make_queries(
+    postings: Dict[str, Any], n_queries: int, seed: int = 0
+) -> Dict[str, List[str]]:
+    """Genera `n_queries` queries de cada mezcla a partir del vocabulario
+    de un índice.
+
+    Args:
+        postings (Dict[str, Any]): posting lists del índice
+        n_queries (int): número de queries por mezcla
+        seed (int): semilla del generador
+    Returns:
+        Dict[str, List[str]]: queries de cada mezcla
+    """
+    rng = random.Random(seed)
+    by_df = sorted(postings, key=lambda word: len(postings[word]), reverse=True)
+    frequent = [word for word in by_df[:1000] if len(word) > 4]
+    rare = [word for word in by_df if len(postings[word]) == 1] or by_df[-10:]
+
+    res: Dict[str, List[str]] = {mix: [] for mix in MIXES}
+    for _ in range(n_queries):
+        a, b, c, d, e, f, g = rng.sample(frequent, 7)
+        res["termino"].append(a)
+        res["comodin"].append(f"{b[:4]}*")
+        res["difusa"].append(f"~{_typo(rng, c)}")
+        res["profunda"].append(
+            f"({a} AND ({b} OR NOT {c})) OR (({d} OR {e}) AND NOT ({f} AND {g}))"
+        )
+        res["not_amplio"].append(f"NOT {rng.choice(rare)}")
+    return res
+
+
+def run_queries(
+    index_file: str,
+    n_queries: int,
+    ranking: str,
+    seed: int,
+    early_stop: bool = False,
+) -> Dict[str, Any]:
+    """Carga el índice y resuelve las queries de cada mezcla, midiendo la
+    latencia de cada una (parseo incluido)."""
+    from ..retriever.parser import parse_query  # type: ignore
+    from ..retriever.retriever import Retriever  # type: ignore
+
+    ts = perf_counter()
+    retriever = Retriever(
+        retriever_args(index_file, ranking=ranking, parada_temprana=early_stop)
+    )
+    load_time = perf_counter() - ts
+
+    res: Dict[str, Any] = {"load_time": load_time, "mixes": {}}
+    queries = make_queries(retriever.index.postings, n_queries, seed)
+    for mix, mix_queries in queries.items():
+        latencies = []
+        for query in mix_queries:
+            ts = perf_counter()
+            retriever.search_query(parse_query(query))
+            latencies.append(perf_counter() - ts)
+
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        res["mixes"][mix] = {
+            "p50": percentiles[49],
+            "p99": percentiles[98],
+            "mean": statistics.fmean(latencies),
+            "qps": len(latencies) / sum(latencies),
+        }
+    return res
+
+
+def bench_queries(
+    workdir: str,
+    n_docs: int,
+    n_queries: int,
+    ranking: str,
+    static_order: bool = False,
+    seed: int = 0,
+    early_stop: bool = False,
+) -> List[Dict[str, Any]]:
+    """Mide la carga del índice y la latencia de las queries sobre el índice
+    de un corpus sintético.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        n_queries (int): número de queries por mezcla
+        ranking (str): función de puntuación del retriever
+        static_order (bool): si los documentos del índice se numeran por
+            PageRank
+        seed (int): semilla del corpus y de las queries
+        early_stop (bool): si BM25 usa la parada temprana, que necesita
+            `static_order`
+    Returns:
+        List[Dict[str, Any]]: resultados de la carga y de cada mezcla
+    """
+    output = os.path.join(workdir, f"index-{n_docs}-{seed}-0")
+    if static_order:
+        output += "-estatico"
+    index_file = os.path.join(output, "index")
+    if not os.path.exists(index_file):
+        measure(
+            build_index,
+            corpus_folder(workdir, n_docs, seed),
+            output,
+            0,
+            static_order,
+        )
+
+    res = measure(run_queries, index_file, n_queries, ranking, seed, early_stop)
+    results = [
+        {
+            "benchmark": "carga",
+            "params": {"docs": n_docs},
+            "metrics": {
+                "load_time": res["value"]["load_time"],
+                "peak_rss": res["peak_rss"],
+            },
+        }
+    ]
+    for mix, metrics in res["value"]["mixes"].items():
+        results.append(
+            {
+                "benchmark": "consultas",
+                "params": {
+                    "docs": n_docs,
+                    "ranking": ranking,
+                    "orden_estatico": static_order,
+                    "parada_temprana": early_stop,
+                    "mezcla": mix,
+                },
+                "metrics": metrics,
+            }
+        )
+    return results
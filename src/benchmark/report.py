@@ -0,0 +1,116 @@
+import json
+import platform
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Métricas en las que un valor mayor es una mejora. El resto de métricas
+# comparables son tiempos, memoria o tamaños, en las que es un empeoramiento.
+_higher_is_better = {"docs_per_sec", "pages_per_sec", "qps", "stored"}
+_lower_is_better = {
+    "time",
+    "peak_rss",
+    "index_rss",
+    "completion_bytes",
+    "index_bytes",
+    "load_time",
+    "p50",
+    "p99",
+    "mean",
+    "requests",
+    "import_time",
+    "cold_query",
+}
+
+
+def _key(result: Dict[str, Any]) -> str:
+    return json.dumps([result["benchmark"], result["params"]], sort_keys=True)
+
+
+def save(results: List[Dict[str, Any]], fname: str) -> None:
+    """Guarda los resultados de una ejecución en formato JSON"""
+    data = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": results,
+    }
+    with open(fname, "w") as fw:
+        json.dump(data, fw, indent=4)
+
+
+def load(fname: str) -> List[Dict[str, Any]]:
+    """Carga los resultados de una ejecución guardados con `save`"""
+    with open(fname, "r") as fr:
+        return json.load(fr)["resultados"]
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """Compara dos ejecuciones y devuelve las regresiones encontradas.
+
+    Solo se comparan las mediciones con el mismo benchmark y parámetros en
+    ambas ejecuciones.
+
+    Args:
+        results (List[Dict[str, Any]]): resultados de la ejecución actual
+        baseline (List[Dict[str, Any]]): resultados de referencia
+        tolerance (float): empeoramiento relativo admitido, e.g., 0.1
+    Returns:
+        List[str]: descripción de cada regresión
+    """
+    reference = {_key(result): result["metrics"] for result in baseline}
+    regressions = []
+    for result in results:
+        metrics = reference.get(_key(result))
+        if metrics is None:
+            continue
+
+        for name, value in result["metrics"].items():
+            old = metrics.get(name)
+            if not old:
+                continue
+
+            change = (value - old) / old
+            if (name in _lower_is_better and change > tolerance) or (
+                name in _higher_is_better and change < -tolerance
+            ):
+                regressions.append(
+                    f"{result['benchmark']} {result['params']} {name}:"
+                    f" {old:.4g} -> {value:.4g} ({change:+.1%})"
+                )
+    return regressions
+
+
+def check_budgets(
+    result: Dict[str, Any], budgets: Dict[str, float]
+) -> List[str]:
+    """Comprueba las métricas de un resultado contra valores máximos
+    absolutos.
+
+    Args:
+        result (Dict[str, Any]): resultado de una medición
+        budgets (Dict[str, float]): valor máximo admitido de cada métrica
+    Returns:
+        List[str]: descripción de cada métrica que supera su presupuesto
+    """
+    exceeded = []
+    for name, value in result["metrics"].items():
+        budget = budgets.get(name)
+        if budget is not None and value > budget:
+            exceeded.append(
+                f"{result['benchmark']} {result['params']} {name}:"
+                f" {value:.4g} > {budget:.4g}"
+            )
+    return exceeded
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    params = " ".join(f"{k}={v}" for k, v in result["params"].items())
+    metrics = " ".join(
+        f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+        for k, v in result["metrics"].items()
+    )
+    return f"[{result['benchmark']}] {params} | {metrics}"
@@ -0,0 +1,198 @@
+import threading
+import unicodedata
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic
+from typing import Deque, Dict, List, Tuple
+
+from .corpus import Corpus
+
+
+def make_pdf(lines: List[str]) -> bytes:
+    """Genera un PDF mínimo de una página con las líneas de texto dadas.
+
+    Las fuentes estándar de PDF no cubren bien los caracteres acentuados, así
+    que el texto se reduce a ASCII.
+
+    Args:
+        lines (List[str]): líneas de texto
+    Returns:
+        bytes: contenido del fichero PDF
+    """
+    text = []
+    for line in lines:
+        line = unicodedata.normalize("NFKD", line)
+        line = line.encode("ascii", "ignore").decode("ascii")
+        line = (
+            line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        )
+        text.append(f"({line}) Tj T*")
+    stream = f"BT /F1 11 Tf 14 TL 72 720 Td {' '.join(text)} ET".encode()
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+        b" /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    pdf += b"startxref\n%d\n%%%%EOF\n" % xref
+    return pdf
+
+
+class Site:
+    """Web sintética que imita a la de la universidad: una portada que
+    enlaza a todas las páginas, páginas HTML enlazadas entre sí y enlaces
+    relativos a PDFs.
+
+    Con `n_variants`, cada página tiene además una cadena de variantes
+    (?orden=1, ?orden=2...) que solo se diferencian en el número de página,
+    como los listados paginados, y que enlazan a la siguiente variante.
+
+    Todo el contenido se genera al construir el objeto, de modo que servirlo
+    no influye en las mediciones del crawler.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        n_pages: int,
+        n_pdfs: int,
+        words_per_page: int = 300,
+        seed: int = 0,
+        n_variants: int = 0,
+    ):
+        corpus = Corpus(seed=seed)
+        self.pages: Dict[str, Tuple[str, bytes]] = {}
+
+        links = [f"{base_url}/pagina/{i}" for i in range(n_pages)]
+        pdfs = [f"/docs/{i}.pdf" for i in range(n_pdfs)]
+
+        html = corpus.html("Portada", links, 0)
+        self.pages["/"] = ("text/html; charset=utf-8", html.encode())
+        for i in range(n_pages):
+            targets = corpus.rng.sample(links, min(len(links), 8))
+            if pdfs and corpus.rng.random() < 0.3:
+                targets.append(corpus.rng.choice(pdfs))
+            if n_variants > 0:
+                targets.append(f"{base_url}/pagina/{i}?orden=1")
+            html = corpus.html(corpus.sentence(4), targets, words_per_page)
+            self.pages[f"/pagina/{i}"] = (
+                "text/html; charset=utf-8",
+                html.encode(),
+            )
+
+            for j in range(1, n_variants + 1):
+                following = (
+                    f'<a href="{base_url}/pagina/{i}?orden={j + 1}">'
+                    "Siguiente</a>"
+                    if j < n_variants
+                    else ""
+                )
+                variant = html.replace(
+                    "</div></body>",
+                    f"<p>Página {j}</p>{following}</div></body>",
+                )
+                self.pages[f"/pagina/{i}?orden={j}"] = (
+                    "text/html; charset=utf-8",
+                    variant.encode(),
+                )
+
+        for path in pdfs:
+            lines = [corpus.sentence(12) for _ in range(40)]
+            self.pages[path] = ("application/pdf", make_pdf(lines))
+
+
+class SiteServer:
+    """Servidor HTTP local que sirve una `Site` en un hilo. El puerto se
+    elige libremente y la URL base queda en `url`.
+
+    Si se supera `max_rate` peticiones por segundo, responde con 429 igual
+    que la web real cuando se la crawlea demasiado rápido.
+    """
+
+    def __init__(
+        self,
+        n_pages: int,
+        n_pdfs: int,
+        max_rate: int = 0,
+        seed: int = 0,
+        n_variants: int = 0,
+    ):
+        self.max_rate = max_rate
+        self.requests: Deque[float] = deque()
+        self.lock = threading.Lock()
+        self.served = 0
+        self.throttled = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.throttle():
+                    self.send_response(429)
+                    self.end_headers()
+                    return
+
+                page = server.site.pages.get(self.path)
+                if page is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                content_type, body = page
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.site = Site(
+            self.url, n_pages, n_pdfs, seed=seed, n_variants=n_variants
+        )
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+
+    def throttle(self) -> bool:
+        """Registra una petición y decide si hay que rechazarla"""
+        with self.lock:
+            if self.max_rate <= 0:
+                self.served += 1
+                return False
+
+            now = monotonic()
+            while self.requests and now - self.requests[0] > 1.0:
+                self.requests.popleft()
+            if len(self.requests) >= self.max_rate:
+                self.throttled += 1
+                return True
+            self.requests.append(now)
+            self.served += 1
+            return False
+
+    def __enter__(self) -> "SiteServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
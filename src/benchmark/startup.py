@@ -0,0 +1,108 @@
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict
+
+from .indexing import build_index, corpus_folder, measure
+
+# Raíz del repositorio, desde donde se lanzan los scripts como módulos
+ROOT = Path(__file__).resolve().parents[2]
+
+_import_snippet = (
+    "from time import perf_counter\n"
+    "ts = perf_counter()\n"
+    "import src.retriever.app\n"
+    "print(perf_counter() - ts)\n"
+)
+
+
+def import_time() -> float:
+    """Mide en un intérprete nuevo cuánto tarda en importarse el script del
+    retriever, sin contar el arranque del propio intérprete."""
+    out = subprocess.run(
+        [sys.executable, "-c", _import_snippet],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(out.stdout)
+
+
+def cold_query(index_file: str, query: str) -> float:
+    """Mide el tiempo total de resolver una query con el script del
+    retriever en un proceso nuevo: arranque, imports, carga del índice y
+    búsqueda."""
+    ts = perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "src.retriever.app",
+            "-i",
+            index_file,
+            "-q",
+            query,
+        ],
+        cwd=ROOT,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return perf_counter() - ts
+
+
+def frequent_term(index_file: str) -> str:
+    """Devuelve el término con la posting list más larga del índice"""
+    from ..indexer.index import Index  # type: ignore
+
+    index = Index.load(index_file)
+    return max(index.postings, key=lambda term: len(index.postings[term]))
+
+
+def bench_import(repetitions: int) -> Dict[str, Any]:
+    """Mide el tiempo de import del script del retriever.
+
+    Args:
+        repetitions (int): número de procesos lanzados, se reporta la
+            mediana
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    times = [import_time() for _ in range(repetitions)]
+    return {
+        "benchmark": "importacion",
+        "params": {},
+        "metrics": {"import_time": statistics.median(times)},
+    }
+
+
+def bench_cold_query(
+    workdir: str, n_docs: int, repetitions: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Mide el coste de lanzar el retriever para resolver una sola query,
+    el caso de uso de un proceso por consulta.
+
+    Args:
+        workdir (str): carpeta de trabajo para el corpus y el índice
+        n_docs (int): número de documentos del corpus
+        repetitions (int): número de procesos lanzados, se reporta la
+            mediana
+        seed (int): semilla del generador del corpus
+    Returns:
+        Dict[str, Any]: resultado de la medición
+    """
+    output = os.path.join(workdir, f"index-{n_docs}-{seed}-0")
+    index_file = os.path.join(output, "index")
+    if not os.path.exists(index_file):
+        measure(build_index, corpus_folder(workdir, n_docs, seed), output, 0)
+    query = frequent_term(index_file)
+
+    times = [cold_query(index_file, query) for _ in range(repetitions)]
+    return {
+        "benchmark": "consulta_en_frio",
+        "params": {"docs": n_docs},
+        "metrics": {"cold_query": statistics.median(times)},
+    }
@@ -2,6 +2,11 @@ import asyncio
 import multiprocessing
 from argparse import ArgumentParser
 
+from ..indexer.duplicates import MAX_DISTANCE  # type: ignore
+from ..instrumentation.metrics import (  # type: ignore
+    add_arguments,
+    instrumented,
+)
 from .crawler import Crawler
 
 
@@ -43,13 +48,50 @@ def parse_args():
         "--jobs",
         type=int,
         default=multiprocessing.cpu_count(),
-        help="Cantidad de consultas concurrentes",
+        help="Cantidad de consultas concurrentes de cada worker",
     )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Número de procesos crawler. Las URLs se reparten entre ellos"
+        " por su hash y cada uno las descarga con su propio bucle de eventos",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--tamano-maximo",
+        type=int,
+        default=20,
+        help="Tamaño máximo en MB de cada página o PDF. Las respuestas más"
+        " grandes se descartan sin terminar de descargarlas",
+    )
+
+    parser.add_argument(
+        "--distancia-duplicados",
+        type=int,
+        default=-1,
+        help="Distancia de Hamming máxima entre las huellas SimHash de dos"
+        " páginas para considerarlas casi duplicadas. De un casi duplicado"
+        " no se almacena el contenido ni se siguen sus enlaces. -1 desactiva"
+        f" la detección (por defecto). Se recomienda {MAX_DISTANCE}",
+    )
+
+    add_arguments(parser)
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    crawler = Crawler(args)
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(crawler.crawl())
+    if args.workers > 1:
+        # multiprocessing solo se usa si hay varios workers
+        from .coordinator import Coordinator
+
+        crawler: Crawler = Coordinator(args)
+    else:
+        crawler = Crawler(args)
+    with instrumented(args):
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(crawler.crawl())
@@ -0,0 +1,337 @@
+import asyncio
+import multiprocessing
+from argparse import Namespace
+from dataclasses import dataclass
+from hashlib import blake2b
+from queue import Empty, Queue
+from typing import Any, Dict, List, Set
+
+from ..instrumentation.metrics import metrics  # type: ignore
+from .crawler import Crawler
+
+# Segundos que un worker sin URLs pendientes espera a recibir alguna antes de
+# volver a comprobar si el crawl ha terminado
+POLL_SECONDS = 0.05
+
+# Intentos de descarga de cada URL antes de abandonarla. Solo se reintentan
+# las respuestas 429 y 5xx, el resto de errores no se arreglan reintentando.
+MAX_ATTEMPTS = 3
+
+
+def owner(url: str, n_workers: int) -> int:
+    """Worker al que pertenece una URL. Se usa un hash estable entre
+    procesos, a diferencia de `hash`, para que todos los workers asignen
+    cada URL al mismo.
+
+    Se usa la URL completa y no solo el host porque el crawl se limita a las
+    URLs de `args.url`, que comparten host.
+
+    Args:
+        url (str): URL a asignar
+        n_workers (int): número de workers
+    Returns:
+        int: id del worker
+    """
+    digest = blake2b(url.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n_workers
+
+
+@dataclass
+class Frontier:
+    """Estado compartido por el coordinador y los workers.
+
+    `pending` cuenta las URLs enviadas a algún worker que todavía no se han
+    terminado de procesar. Un worker envía los enlaces de una página antes
+    de darla por terminada, así que cuando llega a 0 no queda trabajo en
+    ningún worker ni en ninguna cola y el crawl ha terminado.
+    """
+
+    # Cola de URLs de cada worker
+    inboxes: List[Any]
+    # Mensajes de los workers al coordinador
+    messages: Any
+    # Respuestas del coordinador a cada worker
+    replies: List[Any]
+    # Webs reclamadas del presupuesto `args.max_webs`
+    budget: Any
+    pending: Any
+    # Se activa si un worker falla, para que el resto terminen
+    stop: Any
+
+
+class Worker(Crawler):
+    """Crawler de una partición de las URLs, con su propio bucle de eventos.
+
+    Solo descarga las URLs que le pertenecen según `owner` y envía los
+    enlaces que encuentra al worker al que pertenecen. Como cada URL tiene
+    un único dueño, las URLs vistas por cada worker bastan para no repetir
+    ninguna en todo el crawl. Los casi duplicados se consultan al
+    coordinador, que guarda las huellas de todas las páginas.
+    """
+
+    def __init__(self, args: Namespace, worker_id: int, frontier: Frontier):
+        super().__init__(args)
+        self.id = worker_id
+        self.frontier = frontier
+        self.inbox = frontier.inboxes[worker_id]
+        # URLs recibidas por este worker y enlaces ya enviados a otros
+        self.seen: Set[str] = set()
+        self.sent: Set[str] = set()
+        # Descargas fallidas de cada URL
+        self.failures: Dict[str, int] = {}
+
+    def claim(self) -> bool:
+        """Reserva una web del presupuesto compartido
+
+        Returns:
+            bool: False si el presupuesto está agotado
+        """
+        with self.frontier.budget.get_lock():
+            if self.frontier.budget.value >= self.args.max_webs:
+                return False
+            self.frontier.budget.value += 1
+            return True
+
+    def release(self) -> None:
+        """Devuelve al presupuesto una web que no se ha podido descargar"""
+        with self.frontier.budget.get_lock():
+            self.frontier.budget.value -= 1
+
+    def route(self, url: str) -> None:
+        """Envía un enlace al worker al que pertenece"""
+        if url in self.sent:
+            return
+        self.sent.add(url)
+        with self.frontier.pending.get_lock():
+            self.frontier.pending.value += 1
+        self.frontier.inboxes[owner(url, len(self.frontier.inboxes))].put(url)
+        metrics.incr("crawler.routed")
+
+    def done(self) -> None:
+        """Da por terminada una URL recibida"""
+        with self.frontier.pending.get_lock():
+            self.frontier.pending.value -= 1
+
+    def finished(self) -> bool:
+        return self.frontier.pending.value == 0 or self.frontier.stop.is_set()
+
+    def receive(self, queue: Queue, wait: bool) -> None:
+        """Pasa a la cola local las URLs recibidas. Las que ya ha visto se
+        descartan.
+
+        Args:
+            queue (Queue): cola local de URLs por descargar
+            wait (bool): si esperar a recibir al menos una URL
+        """
+        urls = []
+        try:
+            if wait:
+                urls.append(self.inbox.get(timeout=POLL_SECONDS))
+            while True:
+                urls.append(self.inbox.get_nowait())
+        except Empty:
+            pass
+
+        for url in urls:
+            if url in self.seen:
+                self.done()
+            else:
+                self.seen.add(url)
+                queue.put(url)
+
+    async def crawl(self) -> None:
+        """Crawlea las URLs de su partición por lotes de `args.jobs`
+        peticiones, como `Crawler.crawl`, hasta que termina el crawl."""
+        queue: Queue = Queue()
+
+        throtle = False
+        while not self.finished():
+            self.receive(queue, wait=queue.empty())
+            if queue.empty():
+                continue
+
+            tasks: list = []
+            if throtle:
+                metrics.incr("crawler.throttled_waits")
+                print("Esperando un segundo...")
+                await asyncio.sleep(1)
+                throtle = False
+
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    while not queue.empty() and len(tasks) < self.args.jobs:
+                        url = queue.get()
+                        if self.claim():
+                            tasks.append(tg.create_task(self._crawl(url)))
+                        else:
+                            self.done()
+
+                for task in tasks:
+                    res = task.result()
+                    status_code = res["status_code"]
+
+                    if status_code != 200:
+                        self.release()
+                        if self.retry(res["url"], status_code):
+                            queue.put(res["url"])
+                        else:
+                            self.done()
+
+                        # Fallo por demasiadas peticiones, esperamos antes de
+                        # reintentar.
+                        if status_code == 429:
+                            throtle = True
+                        continue
+
+                    if not res.get("skipped"):
+                        if self.is_duplicate(res["url"], res["fingerprint"]):
+                            res["writer"].discard()
+                        else:
+                            for url in res["crawled_urls"]:
+                                self.route(url)
+
+                            with metrics.stage("crawler.dump"):
+                                res["writer"].commit()
+                    self.done()
+            except BaseException:
+                self.discard_pending(tasks)
+                raise
+
+    def retry(self, url: str, status_code: int) -> bool:
+        """Decide si reintentar una URL cuya descarga ha fallado
+
+        Args:
+            url (str): URL descargada
+            status_code (int): código de la respuesta
+        Returns:
+            bool: si volver a encolarla. Si no, se abandona
+        """
+        failures = self.failures.get(url, 0) + 1
+        self.failures[url] = failures
+        if (status_code == 429 or status_code >= 500) and (
+            failures < MAX_ATTEMPTS
+        ):
+            return True
+        metrics.incr("crawler.abandoned")
+        print(f"Abandonando {url} ({status_code})")
+        return False
+
+    def is_duplicate(self, url: str, fingerprint: int | None) -> bool:
+        """Consulta al coordinador si una página es un casi duplicado de
+        otra ya almacenada por cualquier worker."""
+        if self.duplicates is None or fingerprint is None:
+            return False
+
+        with metrics.stage("crawler.duplicate_check"):
+            self.frontier.messages.put(("check", self.id, url, fingerprint))
+            return self.frontier.replies[self.id].get()
+
+
+def _work(args: Namespace, worker_id: int, frontier: Frontier) -> None:
+    """Proceso de un worker. Al terminar envía sus métricas al
+    coordinador."""
+    metrics.reset()
+    metrics.enabled = bool(args.metrics)
+    try:
+        asyncio.run(Worker(args, worker_id, frontier).crawl())
+    except BaseException:
+        frontier.stop.set()
+        raise
+    finally:
+        frontier.messages.put(
+            ("done", worker_id, metrics.counters, metrics.histograms)
+        )
+
+
+class Coordinator(Crawler):
+    """Crawler distribuido en `args.workers` procesos.
+
+    Las URLs se reparten entre los workers por su hash, de modo que el
+    parseo de HTML y PDF y la escritura en disco de cada worker corren en un
+    núcleo distinto. El coordinador solo reparte la URL base y responde a
+    las consultas de casi duplicados, que necesitan las huellas de todas las
+    páginas almacenadas.
+    """
+
+    async def crawl(self) -> None:
+        """Lanza los workers y atiende sus mensajes hasta que terminan"""
+        n_workers = self.args.workers
+        frontier = Frontier(
+            inboxes=[multiprocessing.Queue() for _ in range(n_workers)],
+            messages=multiprocessing.Queue(),
+            replies=[multiprocessing.Queue() for _ in range(n_workers)],
+            budget=multiprocessing.Value("i", 0),
+            pending=multiprocessing.Value("i", 1),
+            stop=multiprocessing.Event(),
+        )
+        frontier.inboxes[owner(self.args.url, n_workers)].put(self.args.url)
+
+        workers = [
+            multiprocessing.Process(
+                target=_work, args=(self.args, i, frontier), daemon=True
+            )
+            for i in range(n_workers)
+        ]
+        for process in workers:
+            process.start()
+
+        finished: Set[int] = set()
+        while len(finished) < n_workers:
+            try:
+                message = await asyncio.to_thread(
+                    frontier.messages.get, True, POLL_SECONDS
+                )
+            except Empty:
+                self.check_workers(workers, frontier, finished)
+                continue
+            self.handle(message, frontier, finished)
+
+        for process in workers:
+            process.join()
+        failed = [i for i, process in enumerate(workers) if process.exitcode]
+        if failed:
+            raise RuntimeError(f"Los workers {failed} han fallado")
+
+    def handle(
+        self, message: tuple, frontier: Frontier, finished: Set[int]
+    ) -> None:
+        """Atiende un mensaje de un worker: una consulta de casi duplicados
+        o el aviso de que ha terminado, con sus métricas."""
+        if message[0] == "check":
+            _, worker_id, url, fingerprint = message
+            frontier.replies[worker_id].put(self.is_duplicate(url, fingerprint))
+        else:
+            _, worker_id, counters, histograms = message
+            metrics.merge(counters, histograms)
+            finished.add(worker_id)
+
+    def check_workers(
+        self,
+        workers: List[multiprocessing.Process],
+        frontier: Frontier,
+        finished: Set[int],
+    ) -> None:
+        """Da por terminados los workers que han muerto sin avisar, e.g., por
+        SIGKILL o por falta de memoria, y detiene al resto, ya que las URLs
+        de su partición no se van a procesar."""
+        dead = [
+            i
+            for i, process in enumerate(workers)
+            if i not in finished and process.exitcode is not None
+        ]
+        if not dead:
+            return
+
+        # Un worker que termina con normalidad deja su aviso en la cola antes
+        # de salir
+        try:
+            while True:
+                self.handle(frontier.messages.get_nowait(), frontier, finished)
+        except Empty:
+            pass
+
+        for i in dead:
+            if i not in finished:
+                print(f"El worker {i} ha terminado sin avisar")
+                frontier.stop.set()
+                finished.add(i)
@@ -1,16 +1,36 @@
 import asyncio
-import io
+import codecs
+import contextlib
 import json
 import os
 import re
+import tempfile
 import time
 from argparse import Namespace
 from queue import Queue
-from typing import Set
+from typing import IO, Iterator, List, Set, Tuple
 
 import requests  # type: ignore
-from bs4 import BeautifulSoup
-from pypdf import PdfReader
+
+from ..indexer.duplicates import (  # type: ignore
+    DUPLICATES_FILE,
+    SimHashIndex,
+    simhash,
+    words,
+)
+from ..instrumentation.metrics import metrics  # type: ignore
+from .streaming import LinkParser, PageWriter
+
+# Tamaño de los fragmentos en los que se descarga cada respuesta
+CHUNK_SIZE = 1 << 16
+
+# Tipos de contenido que se almacenan, el resto no se descargan
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+PDF_TYPES = ("application/pdf",)
+
+
+class PageTooLarge(Exception):
+    """La respuesta supera el tamaño máximo de descarga"""
 
 
 class Crawler:
@@ -22,36 +42,172 @@ class Crawler:
         self.pdf_regex = re.compile(r"^\/.*\.pdf$")
         self.url_parameters_regex = re.compile(r"\?.*$")
         self.urls_visitadas: set = set()
+        self.max_bytes = args.tamano_maximo * 1024 * 1024
+        # Huellas de las páginas almacenadas, para reconocer casi duplicados
+        self.duplicates = (
+            SimHashIndex(args.distancia_duplicados)
+            if args.distancia_duplicados >= 0
+            else None
+        )
 
     async def _crawl(self, url: str) -> dict:
         print(f"Crawling {url}...")
-        response = await asyncio.to_thread(
-            requests.get, url
-        )  # se extraen todas las urls
-
-        if response.status_code != 200:
-            return {
-                "url": url,
-                "status_code": response.status_code,
-            }
-
-        if not url.endswith(".pdf"):
-            urls_list = self.find_urls(response.text)
-            text = response.text
-            type = "html"
-        else:
-            urls_list = set()
-            text = self.read_pdf(response.content)
-            type = "pdf"
-
-        print(f"Done crawling {url}")
-        return {
-            "url": url,
-            "text": text,
-            "crawled_urls": urls_list,
-            "status_code": response.status_code,
-            "type": type,
-        }
+        # La descarga, la extracción de enlaces y la escritura en disco se
+        # hacen en un hilo, fragmento a fragmento
+        download = asyncio.ensure_future(asyncio.to_thread(self.download, url))
+        try:
+            res = await asyncio.shield(download)
+        except asyncio.CancelledError:
+            # El hilo no se puede interrumpir. Se espera a que termine para
+            # eliminar el fichero temporal que haya escrito.
+            with contextlib.suppress(Exception):
+                writer = (await download).get("writer")
+                if writer is not None:
+                    writer.discard()
+            raise
+        if res["status_code"] == 200:
+            print(f"Done crawling {url}")
+        return res
+
+    def fetch(self, url: str) -> requests.Response:
+        """Hace la petición. El cuerpo de la respuesta no se descarga hasta
+        que se lee."""
+        with metrics.stage("crawler.fetch"):
+            return requests.get(url, stream=True)
+
+    def download(self, url: str) -> dict:
+        """Descarga una URL en streaming y escribe su contenido en disco a
+        medida que llega, sin tenerlo entero en memoria.
+
+        Antes de descargar el cuerpo se comprueban el tipo de contenido y el
+        tamaño declarado. Las respuestas que no son HTML ni PDF, o que
+        superan `args.tamano_maximo` MB, se descartan.
+
+        Args:
+            url (str): URL a descargar
+        Returns:
+            dict: "url" y "status_code". Si la página se ha descargado,
+                "crawled_urls", "fingerprint" y "writer", con el fichero
+                pendiente de `commit`. Si se ha descartado, "skipped".
+        """
+        with self.fetch(url) as response:
+            metrics.incr(f"crawler.status.{response.status_code}")
+            res: dict = {"url": url, "status_code": response.status_code}
+            if response.status_code != 200:
+                return res
+
+            type = self.content_type(url, response)
+            length = int(response.headers.get("Content-Length") or 0)
+            if type is None or length > self.max_bytes:
+                metrics.incr("crawler.skipped")
+                res["skipped"] = True
+                return res
+
+            writer = PageWriter(self.page_path(url), url, type)
+            try:
+                with metrics.stage("crawler.download"):
+                    if type == "html":
+                        urls, content = self.stream_html(response, writer)
+                    else:
+                        urls, content = set(), self.stream_pdf(response, writer)
+            except PageTooLarge:
+                writer.discard()
+                metrics.incr("crawler.skipped")
+                res["skipped"] = True
+                return res
+            except BaseException:
+                writer.discard()
+                raise
+            writer.close(urls)
+
+        metrics.incr("crawler.pages")
+        fingerprint = None
+        if self.duplicates is not None:
+            with metrics.stage("crawler.fingerprint"):
+                fingerprint = simhash(content)
+
+        res.update(crawled_urls=urls, fingerprint=fingerprint, writer=writer)
+        return res
+
+    def content_type(self, url: str, response: requests.Response) -> str | None:
+        """Decide, por la cabecera Content-Type, si una respuesta es una web
+        ("html"), un PDF ("pdf") o un contenido que no se almacena (None).
+        Sin una cabecera concreta, se decide por la extensión de la URL."""
+        header = response.headers.get("Content-Type", "")
+        content_type = header.split(";")[0].strip().lower()
+        if content_type in HTML_TYPES:
+            return "html"
+        if content_type in PDF_TYPES:
+            return "pdf"
+        if content_type in ("", "application/octet-stream"):
+            return "pdf" if url.endswith(".pdf") else "html"
+        return None
+
+    def chunks(self, response: requests.Response) -> Iterator[bytes]:
+        """Itera sobre el cuerpo de una respuesta por fragmentos
+
+        Raises:
+            PageTooLarge: si el cuerpo supera el tamaño máximo
+        """
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise PageTooLarge(response.url)
+            yield chunk
+        metrics.observe("crawler.response_bytes", size)
+
+    def stream_html(
+        self, response: requests.Response, writer: PageWriter
+    ) -> Tuple[Set[str], List[str]]:
+        """Descarga una web, extrayendo los enlaces y escribiéndola en
+        disco fragmento a fragmento.
+
+        Returns:
+            Tuple[Set[str], List[str]]: los enlaces de la web y, si se
+                detectan casi duplicados, las palabras de su texto
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(
+                response.encoding or "utf-8"
+            )(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        parser = LinkParser(
+            self.args.url,
+            self.url_regex,
+            self.pdf_regex,
+            keep_words=self.duplicates is not None,
+        )
+        for chunk in self.chunks(response):
+            text = decoder.decode(chunk)
+            parser.feed(text)
+            writer.write(text)
+        text = decoder.decode(b"", final=True)
+        parser.feed(text)
+        writer.write(text)
+        parser.close()
+        return parser.urls, parser.words
+
+    def stream_pdf(
+        self, response: requests.Response, writer: PageWriter
+    ) -> List[str]:
+        """Descarga un PDF a un fichero temporal, que solo se queda en
+        memoria si es pequeño, y escribe su texto en disco.
+
+        Returns:
+            List[str]: si se detectan casi duplicados, las palabras del
+                texto del PDF
+        """
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as buffer:
+            for chunk in self.chunks(response):
+                buffer.write(chunk)
+            buffer.seek(0)
+            with metrics.stage("crawler.read_pdf"):
+                text = self.read_pdf(buffer)
+        writer.write(text)
+        return words(text) if self.duplicates is not None else []
 
     async def crawl(self) -> None:
         """Método para crawlear la URL base. `crawl` debe crawlear, desde
@@ -76,40 +232,67 @@ class Crawler:
         while not queue.empty() and len(urls_visitadas) < self.args.max_webs:
             tasks: list = []
             if throtle:
+                metrics.incr("crawler.throttled_waits")
                 print("Esperando un segundo...")
                 time.sleep(1)
                 throtle = False
 
-            async with asyncio.TaskGroup() as tg:
-                while (
-                    not queue.empty()
-                    and len(urls_visitadas) < self.args.max_webs
-                    and len(tasks) < self.args.jobs
-                ):
-                    url = queue.get()
-                    if url not in urls_visitadas:
-                        urls_visitadas.add(url)
-                        tasks.append(tg.create_task(self._crawl(url)))
-
-            for task in tasks:
-                res = task.result()
-                status_code = res["status_code"]
-
-                if status_code != 200:
-                    urls_visitadas.remove(res["url"])
-                    queue.put(res["url"])
-
-                    # Fallo por demasiadas peticiones, esperamos antes de
-                    # reintentar.
-                    if status_code == 429:
-                        throtle = True
-                    continue
-
-                for url in res["crawled_urls"]:
-                    if url not in urls_visitadas:
-                        queue.put(url)
-
-                self.dump_data(res["url"], res["text"], res["type"])
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    while (
+                        not queue.empty()
+                        and len(urls_visitadas) < self.args.max_webs
+                        and len(tasks) < self.args.jobs
+                    ):
+                        url = queue.get()
+                        if url not in urls_visitadas:
+                            urls_visitadas.add(url)
+                            tasks.append(tg.create_task(self._crawl(url)))
+
+                for task in tasks:
+                    res = task.result()
+                    status_code = res["status_code"]
+
+                    if status_code != 200:
+                        urls_visitadas.remove(res["url"])
+                        queue.put(res["url"])
+
+                        # Fallo por demasiadas peticiones, esperamos antes de
+                        # reintentar.
+                        if status_code == 429:
+                            throtle = True
+                        continue
+
+                    if res.get("skipped"):
+                        continue
+
+                    # Los enlaces de un casi duplicado llevan a las mismas páginas
+                    # que los del original, o a más variantes de la misma página
+                    if self.is_duplicate(res["url"], res["fingerprint"]):
+                        res["writer"].discard()
+                        continue
+
+                    for url in res["crawled_urls"]:
+                        if url not in urls_visitadas:
+                            queue.put(url)
+
+                    with metrics.stage("crawler.dump"):
+                        res["writer"].commit()
+            except BaseException:
+                self.discard_pending(tasks)
+                raise
+
+    @staticmethod
+    def discard_pending(tasks: List[asyncio.Task]) -> None:
+        """Elimina los ficheros temporales de las páginas descargadas por
+        `tasks` que no se han llegado a guardar, e.g., porque otra tarea del
+        lote ha fallado o se ha cancelado el crawl. Las tareas sin terminar
+        eliminan el suyo al cancelarse, ver `_crawl`."""
+        for task in tasks:
+            if task.done() and not task.cancelled() and not task.exception():
+                writer = task.result().get("writer")
+                if writer is not None:
+                    writer.discard()
 
     def find_urls(self, text: str) -> Set[str]:
         """Método para encontrar URLs de la Universidad Europea en el
@@ -123,43 +306,55 @@ class Crawler:
         Returns:
             Set[str]: conjunto de urls (únicas) extraídas de la web
         """
-        soup = BeautifulSoup(text, "html.parser")
-        # re.compile trata a todos los caracteres del href como literales y no especiales.
-        # Buscar enlaces a páginas web
-        urls_filtradas = {
-            link["href"] for link in soup.find_all("a", href=self.url_regex)
-        }
-
-        # Buscar enlaces a archivos PDF
-        urls_filtradas.update(
-            {
-                f"{self.args.url}{link['href']}"
-                for link in soup.find_all("a", href=self.pdf_regex)
-            }
-        )
+        parser = LinkParser(self.args.url, self.url_regex, self.pdf_regex)
+        parser.feed(text)
+        parser.close()
+        return parser.urls
+
+    def is_duplicate(self, url: str, fingerprint: int | None) -> bool:
+        """Comprueba si una página es un casi duplicado de otra ya
+        almacenada. Si lo es, la registra en `DUPLICATES_FILE` para que el
+        indexador la añada como alias del original; si no, guarda su huella.
+
+        Args:
+            url (str): URL de la página
+            fingerprint (int | None): huella SimHash de su contenido
+        Returns:
+            bool: si la página es un casi duplicado
+        """
+        if self.duplicates is None or fingerprint is None:
+            return False
 
-        return urls_filtradas
+        original = self.duplicates.find(fingerprint)
+        if original is None:
+            self.duplicates.add(fingerprint, url)
+            return False
 
-    def read_pdf(self, content: bytes) -> str:
-        content_stream = io.BytesIO(content)
-        pdf = PdfReader(content_stream)
+        metrics.incr("crawler.duplicates")
+        print(f"{url} es un casi duplicado de {original}")
+        os.makedirs(self.args.output_folder, exist_ok=True)
+        fname = os.path.join(self.args.output_folder, DUPLICATES_FILE)
+        with open(fname, "a") as f:
+            f.write(json.dumps({"url": url, "duplicate_of": original}) + "\n")
+        return True
+
+    def read_pdf(self, stream: IO[bytes]) -> str:
+        # pypdf tarda en importarse y muchos crawls no encuentran ningún PDF
+        from pypdf import PdfReader
+
+        pdf = PdfReader(stream)
         text = ""
         for page in pdf.pages:
             text += page.extract_text(0)
 
         return text
 
-    def dump_data(self, url: str, text: str, type: str):
-        info_web = {"url": url, "text": text, "type": type}
-
+    def page_path(self, url: str) -> str:
+        """Ruta del fichero .json donde se almacena una URL"""
         url_sin_prefijo = url.removeprefix("https://")
         directorio_limpio = re.sub(
             self.url_parameters_regex, "", url_sin_prefijo
         )
-
-        directorios = os.path.join(self.args.output_folder, directorio_limpio)
-        os.makedirs(directorios, exist_ok=True)
-        web_content = os.path.join(directorios, "content.json")
-
-        with open(web_content, "w") as f:
-            json.dump(info_web, f, indent=4)
+        return os.path.join(
+            self.args.output_folder, directorio_limpio, "content.json"
+        )
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import os
+import tempfile
+from html.parser import HTMLParser
+from typing import Iterable, List, Pattern, Set, TextIO
+
+from ..indexer.duplicates import words  # type: ignore
+
+
+class LinkParser(HTMLParser):
+    """Parser HTML incremental. Recibe la página por fragmentos a medida
+    que se descarga y extrae los enlaces a webs y PDFs de la Universidad,
+    con el mismo criterio que `Crawler.find_urls`.
+
+    Si `keep_words` es True, acumula también las palabras del texto para
+    calcular la huella de la página. Solo se usan las del bloque principal
+    (`div.page`), como en el indexador, sin scripts ni estilos: el menú y el
+    pie se repiten en todas las páginas y acercan las huellas de páginas
+    distintas.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        url_regex: Pattern,
+        pdf_regex: Pattern,
+        keep_words: bool = False,
+    ):
+        super().__init__()
+        self.base_url = base_url
+        self.url_regex = url_regex
+        self.pdf_regex = pdf_regex
+        self.keep_words = keep_words
+        self.urls: Set[str] = set()
+        self.words: List[str] = []
+        # Texto del bloque principal desde la última etiqueta. HTMLParser
+        # puede entregar un mismo texto en varios trozos si llega en varios
+        # fragmentos, partiendo alguna palabra.
+        self.text: List[str] = []
+        # Divs abiertos dentro del bloque principal, 0 fuera de él
+        self.main_depth = 0
+        # Dentro de un <script> o un <style>
+        self.skip = False
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_words()
+        if tag in ("script", "style"):
+            self.skip = True
+        elif tag == "div":
+            if self.main_depth > 0:
+                self.main_depth += 1
+            elif "page" in (dict(attrs).get("class") or "").split():
+                self.main_depth = 1
+        if tag != "a":
+            return
+        for name, value in attrs:
+            if name != "href" or value is None:
+                continue
+            if self.url_regex.search(value):
+                self.urls.add(value)
+            elif self.pdf_regex.search(value):
+                self.urls.add(f"{self.base_url}{value}")
+
+    def handle_endtag(self, tag):
+        self.flush_words()
+        if tag in ("script", "style"):
+            self.skip = False
+        elif tag == "div" and self.main_depth > 0:
+            self.main_depth -= 1
+
+    def handle_data(self, data):
+        if self.keep_words and self.main_depth > 0 and not self.skip:
+            self.text.append(data)
+
+    def flush_words(self) -> None:
+        """Pasa a `words` las palabras del texto acumulado"""
+        if self.text:
+            self.words.extend(words("".join(self.text)))
+            self.text = []
+
+    def close(self):
+        super().close()
+        self.flush_words()
+
+
+class PageWriter:
+    """Escribe el fichero .json de una página a medida que se descarga, sin
+    llegar a tener todo el texto en memoria.
+
+    Se escribe primero en un fichero temporal de la misma carpeta, que no
+    termina en .json para que el indexador no lo lea a medias. `commit` lo
+    mueve a su ruta definitiva y `discard` lo elimina.
+    """
+
+    def __init__(self, path: str, url: str, type: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), suffix=".part"
+        )
+        self.file: TextIO = os.fdopen(fd, "w")
+        self.file.write(
+            f'{{\n    "url": {json.dumps(url)},\n'
+            f'    "type": {json.dumps(type)},\n    "text": "'
+        )
+
+    def write(self, text: str) -> None:
+        """Añade un fragmento al texto de la página"""
+        # json.dumps escapa el fragmento como una cadena JSON completa, se
+        # quitan las comillas de los extremos
+        self.file.write(json.dumps(text)[1:-1])
+
+    def close(self, links: Iterable[str] = ()) -> None:
+        """Termina el fichero. Debe llamarse antes de `commit`
+
+        Args:
+            links (Iterable[str]): URLs a las que enlaza la página, se
+                guardan para construir el grafo de enlaces
+        """
+        if not self.file.closed:
+            self.file.write(f'",\n    "links": {json.dumps(sorted(links))}\n}}')
+            self.file.close()
+
+    def commit(self) -> None:
+        self.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        """Elimina el fichero temporal. No hace nada si ya se ha movido con
+        `commit` o eliminado, así que se puede llamar al abortar el crawl
+        sin saber qué páginas se habían guardado."""
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.tmp_path)
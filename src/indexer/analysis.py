@@ -0,0 +1,94 @@
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, List
+
+
+def _accent_table() -> Dict[int, str]:
+    """Tabla de `str.translate` que sustituye cada letra latina acentuada
+    por su letra base, excepto la ñ, que en español es otra letra."""
+    table = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        if char in "ñÑ":
+            continue
+        base = unicodedata.normalize("NFD", char)
+        if len(base) > 1 and all(unicodedata.combining(c) for c in base[1:]):
+            table[code] = base[0]
+    return table
+
+
+_accents = _accent_table()
+
+
+def fold_accents(text: str) -> str:
+    """Elimina tildes y diéresis, e.g., "Ingeniería" -> "Ingenieria"
+
+    Args:
+        text (str): texto a normalizar
+    Returns:
+        str: el texto sin acentos
+    """
+    return text.translate(_accents)
+
+
+class Analyzer:
+    """Etapa de análisis que normaliza cada término antes de indexarlo o de
+    buscarlo: elimina los acentos y/o lo reduce a su raíz con el stemmer
+    Snowball para español, e.g., "grados" -> "grad".
+
+    El resultado de cada término se memoriza, así que el coste del stemmer se
+    paga una vez por término distinto y no una vez por aparición.
+    """
+
+    def __init__(self, accents: bool, stemming: bool):
+        self.accents = accents
+        self.stemming = stemming
+        self.cache: Dict[str, str] = {}
+
+        # El stemmer va primero porque sus reglas reconocen sufijos con
+        # tilde, e.g., "-ción" o "-ía"
+        steps: List[Callable[[str], str]] = []
+        if stemming:
+            # nltk solo se importa si se pide stemming. El stemmer Snowball
+            # no necesita descargar ningún corpus.
+            from nltk.stem.snowball import SpanishStemmer  # type: ignore
+
+            steps.append(SpanishStemmer().stem)
+        if accents:
+            steps.append(fold_accents)
+        self.steps = steps
+
+    def __call__(self, term: str) -> str:
+        """Analiza un término
+
+        Args:
+            term (str): término en minúsculas
+        Returns:
+            str: el término normalizado
+        """
+        res = self.cache.get(term)
+        if res is None:
+            res = term
+            for step in self.steps:
+                res = step(res)
+            self.cache[term] = res
+        return res
+
+    def analyze(self, tokens: List[str]) -> List[str]:
+        """Analiza todos los términos de un documento
+
+        Args:
+            tokens (List[str]): términos del documento
+        Returns:
+            List[str]: los términos normalizados, en el mismo orden
+        """
+        if not self.steps:
+            return tokens
+        return [self(token) for token in tokens]
+
+
+@lru_cache(maxsize=None)
+def get_analyzer(accents: bool, stemming: bool) -> Analyzer:
+    """Devuelve el analizador compartido para una configuración, de modo
+    que todos los usuarios comparten su caché de términos."""
+    return Analyzer(accents, stemming)
@@ -1,6 +1,12 @@
 from argparse import ArgumentParser
 
+from ..instrumentation.metrics import (  # type: ignore
+    add_arguments,
+    instrumented,
+)
+from .duplicates import MAX_DISTANCE
 from .indexer import Indexer
+from .spelling import MAX_EDIT_DISTANCE
 
 
 def parse_args():
@@ -29,12 +35,84 @@ def parse_args():
         required=True,
     )
 
+    parser.add_argument(
+        "-d",
+        "--distancia-edicion",
+        type=int,
+        default=MAX_EDIT_DISTANCE,
+        help="Distancia de edición máxima de las búsquedas tolerantes a"
+        " errores (~termino). 0 las desactiva",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--shards",
+        type=int,
+        default=1,
+        help="Número de shards en los que particionar el índice por"
+        " documentos. Con más de uno se genera un fichero index.N por shard",
+    )
+
+    parser.add_argument(
+        "-m",
+        "--memoria",
+        type=int,
+        default=0,
+        help="Presupuesto de memoria en MB para las posting lists. Si se"
+        " indica, el índice se construye volcando bloques parciales a disco"
+        " y mezclándolos al final (SPIMI). 0 construye todo en memoria",
+    )
+
+    parser.add_argument(
+        "-a",
+        "--sin-acentos",
+        action="store_true",
+        help="Elimina tildes y diéresis de los términos, e.g., ingeniería y"
+        " ingenieria se indexan igual. Se aplica también a las queries",
+    )
+
+    parser.add_argument(
+        "--stemming",
+        action="store_true",
+        help="Reduce cada término a su raíz con el stemmer Snowball para"
+        " español, e.g., grado y grados se indexan como grad. Se aplica"
+        " también a las queries. Los comodines de prefijo, e.g., grados*,"
+        " encuentran además las raíces más cortas que su prefijo. El resto"
+        " de comodines se comparan con las raíces",
+    )
+
+    parser.add_argument(
+        "--distancia-duplicados",
+        type=int,
+        default=-1,
+        help="Distancia de Hamming máxima entre las huellas SimHash de dos"
+        " documentos para considerarlos casi duplicados. Cada casi duplicado"
+        " se indexa como alias del primer documento. -1 desactiva la"
+        f" detección (por defecto). Se recomienda {MAX_DISTANCE}",
+    )
+
+    parser.add_argument(
+        "--orden-estatico",
+        action="store_true",
+        help="Numera los documentos de mayor a menor PageRank, de modo que"
+        " las posting lists quedan ordenadas por puntuación estática y el"
+        " retriever puede parar en cuanto tiene los mejores resultados",
+    )
+
+    add_arguments(parser)
+
     # Añade aquí cualquier otro argumento que condicione
     # el funcionamiento del indexer
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.memoria > 0 and args.shards > 1:
+        parser.error("La construcción externa (-m) no admite shards (-s).")
+    if args.memoria > 0 and args.orden_estatico:
+        parser.error("La construcción externa (-m) no admite --orden-estatico.")
+    return args
 
 
 if __name__ == "__main__":
     args = parse_args()
-    indexer = Indexer(args)
-    indexer.build_index()
+    with instrumented(args):
+        indexer = Indexer(args)
+        indexer.build_index()
@@ -0,0 +1,86 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence
+
+# Completions que se precalculan para cada prefijo
+COMPLETIONS = 10
+
+# Los prefijos que abarcan como mucho este número de términos no se
+# precalculan. Sus completions se obtienen recorriendo su rango del
+# diccionario ordenado, que cuesta lo mismo que una búsqueda en un trie.
+SCAN_LIMIT = 256
+
+# Mayor carácter Unicode, cierra el rango de términos de un prefijo
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def top_terms(ids: Iterable[int], df: Sequence[int], limit: int) -> List[int]:
+    """Elige los términos que aparecen en más documentos. A igual número de
+    documentos, gana el primero en orden lexicográfico.
+
+    Args:
+        ids (Iterable[int]): posiciones de los términos en el diccionario
+        df (Sequence[int]): número de documentos de cada término
+        limit (int): número máximo de términos a devolver
+    Returns:
+        List[int]: posiciones de los términos elegidos, de más a menos
+            documentos
+    """
+    return heapq.nsmallest(limit, ids, key=lambda i: (-df[i], i))
+
+
+def prefix_range(terms: Sequence[str], prefix: str) -> range:
+    """Posiciones del diccionario ordenado `terms` de los términos que
+    empiezan por `prefix`"""
+    lo = bisect_left(terms, prefix)
+    return range(lo, bisect_left(terms, prefix + _MAX_CHAR, lo))
+
+
+def completion_index(
+    terms: Sequence[str],
+    df: Sequence[int],
+    size: int = COMPLETIONS,
+    scan_limit: int = SCAN_LIMIT,
+) -> Dict[str, "array[int]"]:
+    """Precalcula las mejores completions de los prefijos del vocabulario.
+
+    Equivale a un trie sobre el diccionario ordenado en el que cada nodo
+    guarda sus `size` completions con más documentos. Solo se guardan los
+    nodos con más de `scan_limit` términos. Sus completions se obtienen
+    mezclando las de sus hijos, así que cada término se recorre una sola
+    vez.
+
+    Args:
+        terms (Sequence[str]): diccionario de términos ordenado
+        df (Sequence[int]): número de documentos de cada término
+        size (int): completions por prefijo
+        scan_limit (int): términos a partir de los que se precalcula un
+            prefijo
+    Returns:
+        Dict[str, array[int]]: posiciones en `terms` de las completions de
+            cada prefijo, de más a menos documentos
+    """
+    res: Dict[str, "array[int]"] = {}
+
+    def visit(prefix: str, lo: int, hi: int) -> List[int]:
+        if hi - lo <= scan_limit:
+            return top_terms(range(lo, hi), df, size)
+
+        candidates = []
+        if terms[lo] == prefix:
+            candidates.append(lo)
+            lo += 1
+        while lo < hi:
+            child = terms[lo][: len(prefix) + 1]
+            end = bisect_left(terms, child + _MAX_CHAR, lo, hi)
+            candidates.extend(visit(child, lo, end))
+            lo = end
+
+        top = top_terms(candidates, df, size)
+        res[prefix] = array("I", top)
+        return top
+
+    if terms:
+        visit("", 0, len(terms))
+    return res
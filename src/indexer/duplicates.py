@@ -0,0 +1,111 @@
+import re
+from hashlib import blake2b
+from typing import Any, Dict, List, Tuple
+
+# Bits de las huellas SimHash
+FINGERPRINT_BITS = 64
+
+# Distancia de Hamming máxima entre las huellas de dos casi duplicados
+MAX_DISTANCE = 3
+
+# Número de palabras consecutivas de cada shingle
+SHINGLE_SIZE = 3
+
+# Fichero, dentro de la carpeta del crawler, donde se registran las páginas
+# descartadas por ser casi duplicados de otra ya almacenada
+DUPLICATES_FILE = "duplicates.jsonl"
+
+_word_regex = re.compile(r"\w+")
+
+
+def words(text: str) -> List[str]:
+    """Extrae las palabras en minúsculas de un texto"""
+    return _word_regex.findall(text.lower())
+
+
+def _hash(shingle: str) -> int:
+    """Hash de 64 bits estable entre procesos, a diferencia de `hash`"""
+    return int.from_bytes(
+        blake2b(shingle.encode(), digest_size=8).digest(), "big"
+    )
+
+
+def simhash(tokens: List[str], size: int = SHINGLE_SIZE) -> int | None:
+    """Calcula la huella SimHash de un texto.
+
+    Cada bit de la huella es el voto mayoritario de ese bit en los hashes de
+    los shingles del texto, así que textos que comparten la mayoría de sus
+    shingles tienen huellas a poca distancia de Hamming.
+
+    Args:
+        tokens (List[str]): palabras del texto
+        size (int): palabras de cada shingle
+    Returns:
+        int | None: la huella, None si el texto no tiene palabras
+    """
+    if not tokens:
+        return None
+
+    import numpy as np
+
+    n_shingles = max(len(tokens) - size + 1, 1)
+    hashes = np.fromiter(
+        (_hash(" ".join(tokens[i : i + size])) for i in range(n_shingles)),
+        dtype=np.uint64,
+        count=n_shingles,
+    )
+    # Una fila de bits por shingle. El orden de los bits no importa siempre
+    # que se empaqueten de vuelta con el mismo.
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(n_shingles, -1)
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > n_shingles
+    return int(np.packbits(majority).view(np.uint64)[0])
+
+
+class SimHashIndex:
+    """Índice de huellas SimHash para encontrar casi duplicados sin comparar
+    con todas las huellas vistas.
+
+    Cada huella se parte en `max_distance + 1` bandas de bits. Si dos
+    huellas difieren en `max_distance` bits o menos, alguna de sus bandas
+    es idéntica, así que basta con comparar con las huellas que comparten
+    alguna banda con la buscada.
+    """
+
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        n_bands = max_distance + 1
+        bounds = [i * FINGERPRINT_BITS // n_bands for i in range(n_bands + 1)]
+        self.bands = [
+            (lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])
+        ]
+        self.tables: List[Dict[int, List[Tuple[int, Any]]]] = [
+            {} for _ in self.bands
+        ]
+
+    def find(self, fingerprint: int) -> Any:
+        """Busca un casi duplicado de una huella
+
+        Args:
+            fingerprint (int): huella a buscar
+        Returns:
+            Any: la clave de la primera huella encontrada a distancia no
+                mayor que `max_distance`, None si no hay ninguna
+        """
+        for (shift, mask), table in zip(self.bands, self.tables):
+            for other, key in table.get((fingerprint >> shift) & mask, []):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, fingerprint: int, key: Any) -> None:
+        """Añade una huella al índice
+
+        Args:
+            fingerprint (int): huella a añadir
+            key (Any): valor que devolverá `find` para sus casi duplicados
+        """
+        for (shift, mask), table in zip(self.bands, self.tables):
+            band = (fingerprint >> shift) & mask
+            if band not in table:
+                table[band] = []
+            table[band].append((fingerprint, key))
@@ -0,0 +1,568 @@
+import gc
+import math
+import os
+import pickle as pkl
+import re
+import shutil
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import MISSING, dataclass, field, fields, replace
+from typing import IO, Any, Dict, List, Sequence, Set, Tuple
+
+from .analysis import fold_accents, get_analyzer
+from .completion import completion_index, prefix_range, top_terms
+from .spelling import MAX_EDIT_DISTANCE, EditDistance, deletes, deletion_index
+
+# Sufijo del fichero donde se guarda el índice de borrados, junto al índice
+DELETES_SUFFIX = ".deletes"
+
+# Sufijo del fichero donde se guarda el diccionario global de un índice
+# particionado en shards, junto a los shards
+DICTIONARY_SUFFIX = ".dict"
+
+
+@dataclass(slots=True)
+class Document:
+    """Dataclass para representar un documento.
+    Cada documento contendrá:
+        - id: identificador único de documento.
+        - title: título del documento.
+        - url: URL del documento.
+        - text: texto del documento, parseado y limpio.
+        - snippet: extracto del texto del documento.
+        - partial_score: suma cuadrática de ocurrencia de términos.
+        - aliases: URLs de los casi duplicados del documento, que se
+          indexan como este documento.
+
+    Usa `__slots__`, así que sus instancias no tienen `__dict__`. Un índice
+    tiene tantas como documentos.
+    """
+
+    id: int
+    title: str
+    url: str
+    text: str
+    snippet: str
+    partial_score: float
+    aliases: List[str] = field(default_factory=lambda: [])
+
+    def __setstate__(self, state):
+        # Los índices antiguos guardan los documentos con su __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+@dataclass
+class Index:
+    """Dataclass para representar un índice invertido.
+
+    - "postings": diccionario que mapea palabras a listas de índices. E.g.,
+                  si la palabra w1 aparece en los documentos con índices
+                  d1, d2 y d3, su posting list será [d1, d2, d3]. Las
+                  posting lists son `array("I")`, con 4 bytes por posting,
+                  en lugar de listas de enteros de Python, con un puntero y
+                  un objeto int por posting.
+
+    - "documents": lista de `Document`.
+
+    - "terms": diccionario de términos, la lista ordenada de las claves de
+               `postings`. Permite resolver prefijos y comodines mediante
+               búsqueda binaria en lugar de recorrer todo el vocabulario.
+
+    - "deletes": índice de borrados al estilo SymSpell, mapea cada cadena
+                 obtenida al borrar caracteres de un término a dicho
+                 término. Permite búsquedas tolerantes a errores. Es con
+                 diferencia la parte más grande del índice, así que se
+                 guarda en un fichero aparte y se carga la primera vez que
+                 se necesita.
+
+    - "max_edit_distance": distancia de edición con la que se construyó
+                           `deletes`.
+
+    - "frequencies": diccionario que mapea palabras a la frecuencia de la
+                     palabra en cada documento de su posting list, en el
+                     mismo orden que `postings`, como `array("I")`.
+
+    - "doc_lengths": número de términos de cada documento, por id, como
+                     `array("I")`.
+
+    - "avg_length": número medio de términos por documento.
+
+    - "idf": diccionario que mapea palabras a su IDF según BM25.
+
+    - "accents": si los términos se indexaron sin acentos.
+
+    - "stemming": si los términos se indexaron reducidos a su raíz.
+
+    - "deletes_file": fichero del que cargar `deletes` bajo demanda. Lo fija
+                      `load`, vacío si `deletes` ya está en memoria.
+
+    - "static_rank": puntuación estática de cada documento, por id, entre 0
+                     y 1, como `array("d")`. Se obtiene del PageRank del
+                     grafo de enlaces.
+
+    - "static_order": si los ids de los documentos siguen el orden de mayor
+                      a menor `static_rank`. Las posting lists, ordenadas por
+                      id, quedan entonces ordenadas también por puntuación
+                      estática.
+
+    - "df": número de documentos en los que aparece cada término de
+            `terms`, en el mismo orden, como `array("I")`.
+
+    - "completions": mejores completions de los prefijos del vocabulario
+                     que abarcan muchos términos, como posiciones en
+                     `terms` o, con stemming, en `words`. Ver
+                     `completion_index`.
+
+    - "forms": diccionario que mapea cada término analizado a la palabra de
+               los documentos más frecuente que se reduce a él, e.g., "grad"
+               a "grado". Permite mostrar términos legibles al usuario.
+               Vacío si los términos no se analizan.
+
+    - "words": con stemming, palabras de los documentos sin acentos y
+               ordenadas. El autocompletado las usa en lugar de las raíces
+               de `terms`, que no son palabras y pueden ser más cortas que
+               lo que ha escrito el usuario.
+
+    - "word_df": número de documentos en los que aparece cada palabra de
+                 `words`, en el mismo orden, como `array("I")`.
+
+    - "spellings": diccionario que mapea las palabras de `words` a su forma
+                   con acentos más frecuente, si la tienen.
+    """
+
+    postings: Dict[str, "array[int]"] = field(default_factory=lambda: {})
+    documents: List[Document] = field(default_factory=lambda: [])
+    terms: List[str] = field(default_factory=lambda: [])
+    deletes: Dict[str, List[str]] = field(default_factory=lambda: {})
+    max_edit_distance: int = 0
+    frequencies: Dict[str, "array[int]"] = field(default_factory=lambda: {})
+    doc_lengths: "array[int]" = field(default_factory=lambda: array("I"))
+    avg_length: float = 0.0
+    idf: Dict[str, float] = field(default_factory=lambda: {})
+    accents: bool = False
+    stemming: bool = False
+    deletes_file: str = ""
+    static_rank: "array[float]" = field(default_factory=lambda: array("d"))
+    static_order: bool = False
+    df: "array[int]" = field(default_factory=lambda: array("I"))
+    completions: Dict[str, "array[int]"] = field(default_factory=lambda: {})
+    forms: Dict[str, str] = field(default_factory=lambda: {})
+    words: List[str] = field(default_factory=lambda: [])
+    word_df: "array[int]" = field(default_factory=lambda: array("I"))
+    spellings: Dict[str, str] = field(default_factory=lambda: {})
+
+    def analyze(self, term: str) -> str:
+        """Aplica a un término de una query el mismo análisis que se aplicó
+        a los términos de los documentos al indexarlos.
+
+        Args:
+            term (str): término de la query
+        Returns:
+            str: el término tal y como aparecería en el índice
+        """
+        if not self.accents and not self.stemming:
+            return term
+        return get_analyzer(self.accents, self.stemming)(term)
+
+    def fold(self, pattern: str) -> str:
+        """Quita los acentos de un patrón con comodines si los términos del
+        índice no los tienen. El stemmer también los elimina."""
+        if not self.accents and not self.stemming:
+            return pattern
+        return fold_accents(pattern)
+
+    def surface(self, term: str) -> str:
+        """Palabra legible de un término del índice, para mostrarla al
+        usuario en lugar de su raíz"""
+        return self.forms.get(term, term)
+
+    def expand(self, pattern: str, limit: int) -> List[str]:
+        """Expande un patrón con comodines a los términos del índice que
+        lo cumplen. '*' representa cualquier secuencia de caracteres y '?'
+        un único carácter.
+
+        El rango de términos que comparten el prefijo literal del patrón se
+        localiza con búsqueda binaria sobre `terms`, por lo que el coste es
+        logarítmico más el número de términos recorridos. Un patrón que
+        empiece por un comodín no tiene prefijo y recorre el vocabulario.
+
+        Con stemming, una palabra que empieza por un prefijo puede haberse
+        indexado con una raíz más corta que él, e.g., "grados" como "grad".
+        Por eso un patrón de prefijo puro, e.g., "grados*", se expande
+        también a las raíces de las palabras que empiezan por su prefijo,
+        ver `stems`, que van delante del rango por ser comienzo del prefijo.
+        El resto de patrones se comparan con las raíces tal cual, ya que el
+        stemmer no puede aplicarse a un patrón.
+
+        Args:
+            pattern (str): patrón a expandir, e.g., "ingenier*"
+            limit (int): número máximo de términos a devolver
+        Returns:
+            List[str]: términos que cumplen el patrón, en orden lexicográfico
+        """
+        prefix = re.split(r"[*?]", pattern, maxsplit=1)[0]
+        lo = bisect_left(self.terms, prefix)
+        hi = bisect_left(self.terms, prefix + chr(0x10FFFF), lo)
+
+        # Prefijo puro, no hace falta comprobar cada término
+        if pattern == prefix + "*":
+            res = self.stems(prefix) if self.stemming else []
+            res.extend(self.terms[lo : min(hi, lo + limit)])
+            return res[:limit]
+
+        regex = re.compile(
+            "".join(
+                ".*" if c == "*" else "." if c == "?" else re.escape(c)
+                for c in pattern
+            )
+        )
+        res = []
+        for i in range(lo, hi):
+            term = self.terms[i]
+            if regex.fullmatch(term):
+                res.append(term)
+                if len(res) >= limit:
+                    break
+        return res
+
+    def stems(self, prefix: str) -> List[str]:
+        """Términos del índice más cortos que `prefix` que son la raíz de
+        alguna palabra de los documentos que empieza por `prefix`, en orden
+        lexicográfico. Los candidatos son los comienzos de `prefix` que son
+        términos del índice, y se confirman recorriendo las palabras de
+        `words` que empiezan por `prefix` hasta encontrarlos todos."""
+        candidates = set()
+        for end in range(1, len(prefix)):
+            i = bisect_left(self.terms, prefix[:end])
+            if i < len(self.terms) and self.terms[i] == prefix[:end]:
+                candidates.add(prefix[:end])
+        if not candidates:
+            return []
+
+        analyzer = get_analyzer(self.accents, self.stemming)
+        lo = bisect_left(self.words, prefix)
+        hi = bisect_left(self.words, prefix + chr(0x10FFFF), lo)
+        found = set()
+        for i in range(lo, hi):
+            word = self.words[i]
+            stem = analyzer(self.spellings.get(word, word))
+            if stem in candidates:
+                found.add(stem)
+                if len(found) == len(candidates):
+                    break
+        return sorted(found)
+
+    def fuzzy(self, term: str, limit: int) -> List[str]:
+        """Busca los términos del índice a una distancia de edición de
+        `term` no mayor que `max_edit_distance`.
+
+        Solo se calcula la distancia contra los términos que comparten algún
+        borrado con `term`, por lo que el coste no depende del tamaño del
+        vocabulario.
+
+        Args:
+            term (str): término a buscar, posiblemente mal escrito
+            limit (int): número máximo de términos a devolver
+        Returns:
+            List[str]: términos encontrados, ordenados por distancia y, a
+                igual distancia, por número de documentos en los que aparecen
+        """
+        if self.deletes_file:
+            self.deletes = _load(self.deletes_file)
+            self.deletes_file = ""
+
+        max_distance = self.max_edit_distance
+        distance = EditDistance(term, max_distance)
+        res = []
+        searched: Set[str] = set()
+        checked: Set[str] = set()
+        # Los términos a distancia `depth` comparten con `term` un borrado
+        # de como mucho `depth` caracteres de cada uno. Se buscan por
+        # profundidades y se para en cuanto hay `limit` términos a esa
+        # distancia, ya que los de las siguientes quedarían detrás.
+        for depth in range(max_distance + 1):
+            candidates = set()
+            for delete in deletes(term, depth) - searched:
+                searched.add(delete)
+                for candidate in self.deletes.get(delete, []):
+                    if abs(len(candidate) - len(term)) <= max_distance:
+                        candidates.add(candidate)
+            candidates -= checked
+            checked |= candidates
+
+            for candidate in sorted(candidates):
+                d = distance(candidate)
+                if d <= max_distance:
+                    res.append((d, -self.doc_freq(candidate), candidate))
+            if sum(1 for d, _, _ in res if d <= depth) >= limit:
+                break
+        res.sort()
+        return [candidate for _, _, candidate in res[:limit]]
+
+    def doc_freq(self, term: str) -> int:
+        """Número de documentos en los que aparece un término, 0 si no está
+        en el diccionario. Se busca en `terms`, así que no necesita las
+        posting lists y sirve también para el diccionario de los shards."""
+        i = bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return self.df[i]
+        return 0
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """Autocompleta un término a medio escribir con los términos del
+        índice que empiezan por él y aparecen en más documentos. Con
+        stemming se completa con las palabras de `words` y no con las
+        raíces. Los términos se muestran con su forma más frecuente en los
+        documentos.
+
+        Los prefijos que abarcan muchos términos tienen sus completions
+        precalculadas en `completions`. El resto recorren su rango del
+        vocabulario, que es pequeño.
+
+        Args:
+            prefix (str): comienzo del término
+            limit (int): número máximo de completions
+        Returns:
+            List[Tuple[str, int]]: términos y su número de documentos, de
+                más a menos documentos
+        """
+        # Los índices con stemming anteriores a `words` completan con las
+        # raíces
+        if self.stemming and self.words:
+            terms, df, names = self.words, self.word_df, self.spellings
+        else:
+            terms, df, names = self.terms, self.df, self.forms
+
+        prefix = self.fold(prefix.lower())
+        ids: Sequence[int] | None = self.completions.get(prefix)
+        if ids is None or len(ids) < limit:
+            ids = top_terms(prefix_range(terms, prefix), df, limit)
+        return [(names.get(terms[i], terms[i]), df[i]) for i in ids[:limit]]
+
+    def save(self, output_name: str, fast: bool = False) -> None:
+        """Serializa el índice (`self`) en formato binario usando Pickle.
+        El índice de borrados se guarda en `output_name` + `DELETES_SUFFIX`.
+
+        Args:
+            output_name (str): fichero destino
+            fast (bool): desactiva la memo de Pickle. Necesario al serializar
+                en streaming, de lo contrario Pickle retiene una referencia a
+                cada objeto escrito. Los términos de `terms` se guardan
+                antes con memo, así que no se repiten en cada diccionario.
+        """
+        os.makedirs(os.path.dirname(output_name), exist_ok=True)
+        # Con memo, Pickle ya guarda una sola vez cada término
+        shared = self.terms if fast else []
+        _dump(
+            replace(self, deletes={}, deletes_file=""),
+            output_name,
+            fast,
+            shared,
+        )
+        _dump(self.deletes, output_name + DELETES_SUFFIX, fast, shared)
+
+    @staticmethod
+    def load(index_file: str) -> "Index":
+        """Carga un índice guardado con `save`. El índice de borrados no se
+        lee hasta la primera búsqueda tolerante a errores.
+
+        Args:
+            index_file (str): fichero del índice
+        Returns:
+            Index: el índice cargado
+        """
+        index = _load(index_file)
+        # Los índices antiguos incluyen `deletes` en el propio fichero
+        if os.path.exists(index_file + DELETES_SUFFIX):
+            index.deletes_file = index_file + DELETES_SUFFIX
+        # Los índices antiguos no tienen los campos añadidos después. Se
+        # completan con su valor por defecto y los que se derivan de las
+        # posting lists se calculan.
+        missing = _backfill(index)
+        if "terms" in missing:
+            index.terms = sorted(index.postings)
+        if "frequencies" in missing:
+            _bm25_statistics(index)
+        _share_terms(index)
+        # En un shard antiguo `df` solo cuenta los documentos del shard, pero
+        # el coordinador no carga shards sin el diccionario global, ver
+        # `Coordinator`.
+        # Los índices anteriores a las búsquedas tolerantes a errores no
+        # tienen índice de borrados. Se construye con la distancia por
+        # defecto del indexador.
+        if "deletes" in missing:
+            index.max_edit_distance = MAX_EDIT_DISTANCE
+            index.deletes = deletion_index(index.terms, MAX_EDIT_DISTANCE)
+        if "completions" in missing:
+            index.df = array("I", (len(index.postings[t]) for t in index.terms))
+            index.completions = completion_index(index.terms, index.df)
+        return index
+
+
+def _backfill(index: Index) -> List[str]:
+    """Completa con su valor por defecto los campos que no tiene un índice
+    guardado por una versión anterior.
+
+    Returns:
+        List[str]: nombres de los campos completados
+    """
+    missing = []
+    for f in fields(Index):
+        if hasattr(index, f.name):
+            continue
+        if f.default_factory is not MISSING:
+            setattr(index, f.name, f.default_factory())
+        else:
+            setattr(index, f.name, f.default)
+        missing.append(f.name)
+    return missing
+
+
+def _bm25_statistics(index: Index) -> None:
+    """Calcula las estadísticas de BM25 de un índice anterior a ellas. El
+    texto de cada documento son sus términos separados por espacios, así
+    que las frecuencias se pueden contar de nuevo."""
+    counts = [Counter(document.text.split()) for document in index.documents]
+    index.frequencies = {
+        term: array("I", (counts[doc_id][term] for doc_id in docs))
+        for term, docs in index.postings.items()
+    }
+    index.doc_lengths = array("I", (sum(c.values()) for c in counts))
+    n_docs = len(index.documents)
+    index.avg_length = sum(index.doc_lengths) / max(n_docs, 1)
+    index.idf = {
+        term: bm25_idf(n_docs, len(docs))
+        for term, docs in index.postings.items()
+    }
+
+
+def _share_terms(index: Index) -> None:
+    """Hace que los diccionarios del índice compartan los objetos str de
+    `terms` como claves.
+
+    Pickle guarda una sola vez cada objeto que aparece varias veces, salvo
+    al serializar en streaming (`fast`). Sin esto, los índices de la
+    construcción externa guardados antes de `_SharedStrings` cargan cuatro
+    copias de cada término, una por diccionario y otra en `terms`.
+    """
+    if not index.terms or not index.postings:
+        return
+    first = next(iter(index.postings))
+    if index.terms[bisect_left(index.terms, first)] is first:
+        return
+
+    index.terms = [sys.intern(term) for term in index.terms]
+    index.postings = {term: index.postings[term] for term in index.terms}
+    index.frequencies = {term: index.frequencies[term] for term in index.terms}
+    index.idf = {term: index.idf[term] for term in index.terms}
+
+
+class _SharedStrings(list):
+    """Cadenas que `_dump` guarda al principio del fichero con la memo de
+    Pickle activada. El resto del fichero se refiere a ellas por la memo
+    aunque se guarde sin ella (`fast`), así que no se repiten."""
+
+
+class _Pickler(pkl.Pickler):
+    """Pickler que guarda el contenido de cada `array` aparte, en `data`, y
+    en el Pickle solo su tipo. El reduce por defecto de `array` incluye una
+    referencia global a la función que lo reconstruye que, sin memo
+    (`fast`), se escribe y se resuelve al cargar una vez por posting list.
+    Guardar sus bytes en el Pickle tampoco sirve: el memo del unpickler los
+    mantiene hasta el final de la carga y, aunque luego se liberan, dejan
+    huecos entre los arrays que el proceso no devuelve al sistema."""
+
+    def __init__(self, file: IO[bytes], data: IO[bytes]) -> None:
+        super().__init__(file, pkl.HIGHEST_PROTOCOL)
+        self.data = data
+        # Bytes de cada array, en el orden en el que aparecen
+        self.sizes = array("Q")
+
+    def persistent_id(self, obj):
+        if type(obj) is array:
+            obj.tofile(self.data)
+            self.sizes.append(len(obj) * obj.itemsize)
+            return obj.typecode
+        return None
+
+
+class _Unpickler(pkl.Unpickler):
+    def __init__(self, file: IO[bytes]) -> None:
+        super().__init__(file)
+        # Arrays vacíos que se rellenan al terminar la carga, ver `_load`
+        self.arrays: List[array] = []
+
+    def persistent_load(self, pid):
+        # Los ficheros antiguos guardan el tipo y los bytes de cada array
+        if isinstance(pid, tuple):
+            typecode, data = pid
+            return array(typecode, data)
+        res = array(pid)
+        self.arrays.append(res)
+        return res
+
+
+def _dump(obj: Any, fname: str, fast: bool, shared: Sequence[str] = ()) -> None:
+    """Guarda un objeto con Pickle, precedido de las cadenas `shared` (ver
+    `_SharedStrings`) y seguido de los tamaños y el contenido de sus
+    `array` (ver `_Pickler`). El contenido se escribe primero en un fichero
+    temporal, de modo que al serializar en streaming (`fast`) no se mantiene
+    en memoria."""
+    folder = os.path.dirname(fname) or None
+    with open(fname, "wb") as fw, tempfile.TemporaryFile(dir=folder) as data:
+        pickler = _Pickler(fw, data)
+        if shared:
+            pickler.dump(_SharedStrings(shared))
+        pickler.fast = fast
+        pickler.dump(obj)
+        if pickler.sizes:
+            pkl.dump(pickler.sizes, fw, pkl.HIGHEST_PROTOCOL)
+            data.seek(0)
+            shutil.copyfileobj(data, fw)
+
+
+def _load(fname: str) -> Any:
+    """Carga un fichero guardado con `_dump` con el recolector de basura
+    parado. Si no, el recolector recorre una y otra vez los millones de
+    objetos que se van creando, y la carga tarda el doble.
+
+    El contenido de los `array` se lee de una vez y se copia a cada uno
+    desde ese buffer, sin crear un objeto intermedio por array."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(fname, "rb") as fr:
+            # Las cadenas compartidas y el objeto comparten la memo
+            unpickler = _Unpickler(fr)
+            res = unpickler.load()
+            if type(res) is _SharedStrings:
+                res = unpickler.load()
+            if unpickler.arrays:
+                sizes = pkl.load(fr)
+                with memoryview(fr.read()) as data:
+                    start = 0
+                    for arr, size in zip(unpickler.arrays, sizes):
+                        arr.frombytes(data[start : start + size])
+                        start += size
+            return res
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def bm25_idf(n_docs: int, df: int) -> float:
+    """IDF de un término según BM25.
+
+    Args:
+        n_docs (int): número de documentos del índice
+        df (int): número de documentos en los que aparece el término
+    Returns:
+        float: IDF del término
+    """
+    return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
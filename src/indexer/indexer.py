@@ -1,56 +1,26 @@
 import json
 import math
 import os
-import pickle as pkl
 from argparse import Namespace
-from dataclasses import dataclass, field
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from time import time
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Tuple
+from urllib.parse import urljoin
 
-import nltk  # type: ignore
 from bs4 import BeautifulSoup, Tag
 
-
-@dataclass
-class Document:
-    """Dataclass para representar un documento.
-    Cada documento contendrá:
-        - id: identificador único de documento.
-        - title: título del documento.
-        - url: URL del documento.
-        - text: texto del documento, parseado y limpio.
-        - snippet: extracto del texto del documento.
-        - partial_score: suma cuadrática de ocurrencia de términos.
-    """
-
-    id: int
-    title: str
-    url: str
-    text: str
-    snippet: str
-    partial_score: float
-
-
-@dataclass
-class Index:
-    """Dataclass para representar un índice invertido.
-
-    - "postings": diccionario que mapea palabras a listas de índices. E.g.,
-                  si la palabra w1 aparece en los documentos con índices
-                  d1, d2 y d3, su posting list será [d1, d2, d3].
-
-    - "documents": lista de `Document`.
-    """
-
-    postings: Dict[str, List[int]] = field(default_factory=lambda: {})
-    documents: List[Document] = field(default_factory=lambda: [])
-
-    def save(self, output_name: str) -> None:
-        """Serializa el índice (`self`) en formato binario usando Pickle"""
-        os.makedirs(os.path.dirname(output_name), exist_ok=True)
-        with open(output_name, "wb") as fw:
-            pkl.dump(self, fw)
+from ..instrumentation.metrics import Metrics, metrics  # type: ignore
+from .analysis import fold_accents, get_analyzer
+from .completion import completion_index
+from .duplicates import DUPLICATES_FILE, SimHashIndex, simhash
+from .graph import LinkGraph, pagerank, static_rank
+from .index import DICTIONARY_SUFFIX, Document, Index, bm25_idf
+from .spelling import deletes, deletion_index
+from .spimi import SpimiBuilder, StreamedDict, StreamedList, external_group
+from .stopwords import SPANISH_STOPWORDS
 
 
 @dataclass
@@ -59,12 +29,24 @@ class Stats:
 
     n_words: int = field(default_factory=lambda: 0)
     n_docs: int = field(default_factory=lambda: 0)
+    n_duplicates: int = field(default_factory=lambda: 0)
+    n_links: int = field(default_factory=lambda: 0)
     building_time: float = field(default_factory=lambda: 0.0)
 
+    def record(self, registry: Metrics) -> None:
+        """Vuelca las estadísticas en un registro de métricas"""
+        registry.gauge("indexer.stats.words", self.n_words)
+        registry.gauge("indexer.stats.docs", self.n_docs)
+        registry.gauge("indexer.stats.duplicates", self.n_duplicates)
+        registry.gauge("indexer.stats.links", self.n_links)
+        registry.gauge("indexer.stats.building_seconds", self.building_time)
+
     def __str__(self) -> str:
         return (
             f"Words: {self.n_words}\n"
             f"Docs: {self.n_docs}\n"
+            f"Duplicates: {self.n_duplicates}\n"
+            f"Links: {self.n_links}\n"
             f"Time: {self.building_time}"
         )
 
@@ -74,49 +56,271 @@ class Indexer:
 
     def __init__(self, args: Namespace):
         self.args = args
-        self.index = Index()
+        self.index = Index(accents=args.sin_acentos, stemming=args.stemming)
+        self.analyzer = get_analyzer(args.sin_acentos, args.stemming)
+        # Número de documentos en los que aparece cada palabra antes del
+        # análisis, para mostrar los términos analizados con su palabra más
+        # frecuente. No hace falta si los términos no se analizan.
+        self.words: Counter | None = (
+            Counter() if args.sin_acentos or args.stemming else None
+        )
+        # Lo mismo para cada palabra sin acentos. Con stemming se
+        # autocompleta con ellas en lugar de con las raíces.
+        self.folded: Counter | None = Counter() if args.stemming else None
         self.stats = Stats()
         self.doc_id = 0
-        nltk.download("stopwords")
+        # Huellas SimHash de los documentos indexados, para colapsar sus
+        # casi duplicados en ellos como alias
+        self.duplicates = (
+            SimHashIndex(args.distancia_duplicados)
+            if args.distancia_duplicados >= 0
+            else None
+        )
+        self.url_ids: Dict[str, int] = {}
+        self.aliases: Dict[int, List[str]] = {}
+        # Enlaces salientes de cada documento, para el PageRank. Lo crea
+        # `build_index` en la carpeta de salida.
+        self.graph: LinkGraph | None = None
 
-    def _build_index(self, dir):
+    def read_documents(self, dir) -> Iterator[Tuple[Document, Counter]]:
+        """Método para recorrer los ficheros .json creados por el crawler.
+
+        Args:
+            dir (str): carpeta con el contenido de las URL
+        Returns:
+            Iterator[Tuple[Document, Counter]]: cada documento, con su id ya
+                asignado, y la frecuencia de cada término en él
+        """
         for curr, _, files in os.walk(dir):
             for file in files:
-                if file.endswith(".json"):
-                    with open(os.path.join(curr, file), "r") as file:
-                        data = json.load(file)
-
-                        if data["type"] == "html":
-                            text = self.parse(data["text"])
-                            title = self.get_title(data["text"])
-                        else:
-                            text = data["text"]
-                            title = Path(data["url"]).stem
-                        snippet = f"{text[:120]}..."
-                        parsed_text = text
-                        parsed_text = self.remove_split_symbols(parsed_text)
-                        parsed_text = self.remove_punctuation(parsed_text)
-                        parsed_text = self.remove_elongated_spaces(parsed_text)
-                        tokens = self.tokenize(parsed_text)
-                        tokens = self.remove_stopwords(tokens)
-
-                        acc = 0
-                        for word in set(tokens):
-                            if word not in self.index.postings:
-                                self.index.postings[word] = []
-                            self.index.postings[word].append(self.doc_id)
-                            acc += math.pow(tokens.count(word), 2)
-
-                        document = Document(
-                            id=self.doc_id,
-                            title=title,
-                            url=data["url"],
-                            text=" ".join(tokens),
-                            snippet=snippet,
-                            partial_score=math.sqrt(acc),
-                        )
-                        self.index.documents.append(document)
-                        self.doc_id += 1
+                if not file.endswith(".json"):
+                    continue
+
+                with metrics.stage("indexer.read"):
+                    with open(os.path.join(curr, file), "r") as fr:
+                        data = json.load(fr)
+                res = self.make_document(data)
+                if res is not None:
+                    yield res
+
+    def make_document(self, data: dict) -> Tuple[Document, Counter] | None:
+        """Método para crear un documento a partir del contenido de una URL
+        almacenado por el crawler.
+
+        Args:
+            data (dict): contenido del fichero .json de la URL
+        Returns:
+            Tuple[Document, Counter] | None: el documento, con el siguiente
+                id, y la frecuencia de cada término en él. None si es un casi
+                duplicado de un documento anterior
+        """
+        with metrics.stage("indexer.parse"):
+            if data["type"] == "html":
+                text = self.parse(data["text"])
+                title = self.get_title(data["text"])
+            else:
+                text = data["text"]
+                title = Path(data["url"]).stem
+        snippet = f"{text[:120]}..."
+
+        with metrics.stage("indexer.tokenize"):
+            parsed_text = text
+            parsed_text = self.remove_split_symbols(parsed_text)
+            parsed_text = self.remove_punctuation(parsed_text)
+            parsed_text = self.remove_elongated_spaces(parsed_text)
+            tokens = self.tokenize(parsed_text)
+            tokens = self.remove_stopwords(tokens)
+
+        with metrics.stage("indexer.analyze"):
+            words = tokens
+            tokens = self.analyzer.analyze(words)
+
+        if self.is_duplicate(data["url"], tokens):
+            return None
+
+        if self.words is not None:
+            distinct = set(words)
+            self.words.update(distinct)
+            if self.folded is not None:
+                self.folded.update({fold_accents(word) for word in distinct})
+        counts = Counter(tokens)
+        acc = 0.0
+        for count in counts.values():
+            acc += math.pow(count, 2)
+
+        document = Document(
+            id=self.doc_id,
+            title=title,
+            url=data["url"],
+            text=" ".join(tokens),
+            snippet=snippet,
+            partial_score=math.sqrt(acc),
+        )
+        self.url_ids[document.url] = document.id
+        if self.graph is not None:
+            links = data.get("links")
+            # Las páginas de crawls anteriores no guardan sus enlaces
+            if links is None and data["type"] == "html":
+                links = self.get_links(data["text"], data["url"])
+            self.graph.add(document.id, links or [])
+        self.doc_id += 1
+        metrics.incr("indexer.docs")
+        metrics.incr("indexer.tokens", len(tokens))
+        return document, counts
+
+    def is_duplicate(self, url: str, tokens: List[str]) -> bool:
+        """Comprueba si un documento es un casi duplicado de uno anterior.
+        Si lo es, su URL se añade como alias del anterior; si no, se guarda
+        su huella con el id que va a recibir.
+
+        Args:
+            url (str): URL del documento
+            tokens (List[str]): términos del documento
+        Returns:
+            bool: si el documento es un casi duplicado
+        """
+        if self.duplicates is None:
+            return False
+
+        with metrics.stage("indexer.fingerprint"):
+            fingerprint = simhash(tokens)
+            if fingerprint is None:
+                return False
+            original = self.duplicates.find(fingerprint)
+
+        if original is None:
+            self.duplicates.add(fingerprint, self.doc_id)
+            return False
+
+        self.add_alias(original, url)
+        return True
+
+    def add_alias(self, doc_id: int, url: str) -> None:
+        metrics.incr("indexer.duplicates")
+        self.url_ids[url] = doc_id
+        if doc_id not in self.aliases:
+            self.aliases[doc_id] = []
+        self.aliases[doc_id].append(url)
+
+    def read_duplicates(self, dir) -> None:
+        """Añade como alias las páginas que el crawler descartó por ser casi
+        duplicados de otras. Debe llamarse tras leer todos los documentos.
+
+        Args:
+            dir (str): carpeta con el contenido de las URL
+        """
+        fname = os.path.join(dir, DUPLICATES_FILE)
+        if not os.path.exists(fname):
+            return
+
+        with open(fname, "r") as fr:
+            for line in fr:
+                record = json.loads(line)
+                doc_id = self.url_ids.get(record["duplicate_of"])
+                if doc_id is not None:
+                    self.add_alias(doc_id, record["url"])
+
+    def with_aliases(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Completa los documentos con las URLs de sus casi duplicados"""
+        for document in documents:
+            document.aliases = self.aliases.get(document.id, [])
+            yield document
+
+    def _build_index(self, dir):
+        for document, counts in self.read_documents(dir):
+            with metrics.stage("indexer.postings"):
+                for word, count in counts.items():
+                    if word not in self.index.postings:
+                        self.index.postings[word] = array("I")
+                        self.index.frequencies[word] = array("I")
+                    self.index.postings[word].append(document.id)
+                    self.index.frequencies[word].append(count)
+
+            self.index.documents.append(document)
+            self.index.doc_lengths.append(sum(counts.values()))
+
+        self.read_duplicates(dir)
+        for doc_id, urls in self.aliases.items():
+            self.index.documents[doc_id].aliases = urls
+        self.index.static_rank = self.compute_static_rank(
+            len(self.index.documents)
+        )
+
+    def _build_external_index(self, dir, output_name: str) -> None:
+        """Construye y guarda el índice sin superar el presupuesto de memoria
+        `args.memoria` (en MB) para las posting lists.
+
+        Los bloques parciales se vuelcan a disco y se mezclan al final. Las
+        posting lists y las frecuencias se serializan en streaming desde los
+        ficheros mezclados, y el resto de campos por término desde el
+        diccionario en memoria. El índice de borrados se agrupa también en
+        bloques externos.
+        """
+        builder = SpimiBuilder(
+            self.args.memoria * 1024 * 1024,
+            os.path.dirname(output_name),
+        )
+        try:
+            for document, counts in self.read_documents(dir):
+                with metrics.stage("indexer.postings"):
+                    builder.add(document, counts)
+            self.read_duplicates(dir)
+            with metrics.stage("indexer.merge"):
+                builder.finish()
+
+            n_docs = builder.n_docs
+            rank = self.compute_static_rank(n_docs)
+            terms, df = builder.terms, builder.df
+            words, word_df, spellings = self.vocabulary()
+            with metrics.stage("indexer.completions"):
+                if self.folded is not None:
+                    completions = completion_index(words, word_df)
+                else:
+                    completions = completion_index(terms, df)
+            n_words = len(terms)
+            distance = self.args.distancia_edicion
+
+            index = Index(
+                postings=StreamedDict(builder.posting_lists()),
+                documents=StreamedList(self.with_aliases(builder.documents())),
+                terms=terms,
+                max_edit_distance=distance,
+                accents=self.index.accents,
+                stemming=self.index.stemming,
+                frequencies=StreamedDict(builder.term_frequencies()),
+                doc_lengths=array("I", builder.doc_lengths),
+                avg_length=sum(builder.doc_lengths) / max(n_docs, 1),
+                idf=StreamedDict(zip(terms, (bm25_idf(n_docs, n) for n in df))),
+                static_rank=rank,
+                df=df,
+                completions=completions,
+                forms=self.surface_forms(),
+                words=words,
+                word_df=word_df,
+                spellings=spellings,
+            )
+            if distance > 0:
+                # Se agrupan los números de los términos, que se vuelven a
+                # convertir en los mismos objetos de `terms` para que el
+                # índice de borrados no los repita, ver `Index.save`
+                pairs = (
+                    (delete, i)
+                    for i, word in enumerate(terms)
+                    for delete in deletes(word, distance)
+                )
+                groups = external_group(pairs, builder.budget, builder.tmp_dir)
+                index.deletes = StreamedDict(
+                    (delete, [terms[i] for i in ids]) for delete, ids in groups
+                )
+
+            with metrics.stage("indexer.save"):
+                index.save(output_name, fast=True)
+        finally:
+            builder.close()
+
+        self.stats.n_words = n_words
+        self.stats.n_docs = n_docs
+        self.stats.n_duplicates = sum(map(len, self.aliases.values()))
 
     def build_index(self) -> None:
         """Método para construir un índice.
@@ -136,16 +340,264 @@ class Indexer:
         # Indexing
         ts = time()
 
-        self._build_index(self.args.input_folder)
+        os.makedirs(self.args.output_name, exist_ok=True)
+        self.graph = LinkGraph(self.args.output_name)
+        try:
+            if self.args.memoria > 0:
+                self._build_external_index(
+                    self.args.input_folder,
+                    os.path.join(self.args.output_name, "index"),
+                )
+                self.show_stats(building_time=time() - ts)
+                return
+
+            self._build_index(self.args.input_folder)
+        finally:
+            self.graph.close()
+
+        if self.args.orden_estatico:
+            with metrics.stage("indexer.reorder"):
+                self.sort_by_static_rank()
+
+        with metrics.stage("indexer.statistics"):
+            self.compute_statistics()
+
+        with metrics.stage("indexer.dictionary"):
+            self.build_dictionary(self.index)
+
+        if self.args.shards > 1:
+            with metrics.stage("indexer.split"):
+                shards = self.split(self.args.shards)
 
         te = time()
 
         # Save index
-        self.index.save(os.path.join(self.args.output_name, "index"))
+        output_name = os.path.join(self.args.output_name, "index")
+        with metrics.stage("indexer.save"):
+            if self.args.shards <= 1:
+                self.index.save(output_name)
+            else:
+                # Los shards solo guardan sus posting lists y sus documentos.
+                # El diccionario, los borrados y las completions son los del
+                # índice completo y se guardan una sola vez.
+                self.dictionary().save(output_name + DICTIONARY_SUFFIX)
+                for i, shard in enumerate(shards):
+                    shard.save(f"{output_name}.{i}")
 
         # Show stats
+        self.stats.n_words = len(self.index.postings)
+        self.stats.n_docs = len(self.index.documents)
+        self.stats.n_duplicates = sum(map(len, self.aliases.values()))
         self.show_stats(building_time=te - ts)
 
+    def compute_statistics(self) -> None:
+        """Método para precalcular las estadísticas globales que necesita
+        BM25: la longitud media de los documentos y el IDF de cada término.
+        """
+        n_docs = len(self.index.documents)
+        if n_docs == 0:
+            return
+
+        self.index.avg_length = sum(self.index.doc_lengths) / n_docs
+        self.index.idf = {
+            word: bm25_idf(n_docs, len(docs))
+            for word, docs in self.index.postings.items()
+        }
+
+    def compute_static_rank(self, n_docs: int) -> "array[float]":
+        """Método para calcular la puntuación estática de los documentos a
+        partir del PageRank de su grafo de enlaces. Los enlaces a un casi
+        duplicado cuentan como enlaces a su documento, así que debe llamarse
+        tras leer los duplicados del crawler.
+
+        Args:
+            n_docs (int): número de documentos
+        Returns:
+            array[float]: puntuación estática de cada documento, por id.
+                Vacía si no se han recogido los enlaces
+        """
+        if self.graph is None:
+            return array("d")
+        with metrics.stage("indexer.pagerank"):
+            src, dst = self.graph.edges(self.url_ids, n_docs)
+            res = array("d", static_rank(pagerank(n_docs, src, dst)))
+        self.stats.n_links = len(src)
+        return res
+
+    def sort_by_static_rank(self) -> None:
+        """Método para renumerar los documentos de mayor a menor puntuación
+        estática. Las posting lists se reordenan por el nuevo id, de modo
+        que siguen ordenadas para las operaciones de la query y quedan
+        además ordenadas por puntuación estática.
+        """
+        index = self.index
+        order = sorted(
+            range(len(index.documents)), key=lambda i: -index.static_rank[i]
+        )
+        new_ids = [0] * len(order)
+        for new_id, old_id in enumerate(order):
+            new_ids[old_id] = new_id
+
+        index.documents = [
+            replace(index.documents[old_id], id=new_id)
+            for new_id, old_id in enumerate(order)
+        ]
+        index.doc_lengths = array("I", (index.doc_lengths[i] for i in order))
+        index.static_rank = array("d", (index.static_rank[i] for i in order))
+        for word, docs in index.postings.items():
+            pairs = sorted(
+                zip(
+                    (new_ids[doc_id] for doc_id in docs),
+                    index.frequencies[word],
+                )
+            )
+            index.postings[word] = array("I", (doc_id for doc_id, _ in pairs))
+            index.frequencies[word] = array("I", (count for _, count in pairs))
+        index.static_order = True
+
+    def build_dictionary(self, index: Index) -> None:
+        """Método para construir el diccionario de términos ordenado, el
+        índice de borrados y el de autocompletado de un índice ya
+        construido.
+
+        Args:
+            index (Index): índice a completar
+        """
+        index.terms = sorted(index.postings)
+        index.df = array(
+            "I", (len(index.postings[term]) for term in index.terms)
+        )
+        index.words, index.word_df, index.spellings = self.vocabulary()
+        with metrics.stage("indexer.completions"):
+            if self.folded is not None:
+                index.completions = completion_index(index.words, index.word_df)
+            else:
+                index.completions = completion_index(index.terms, index.df)
+        index.max_edit_distance = self.args.distancia_edicion
+        if index.max_edit_distance > 0:
+            index.deletes = deletion_index(index.terms, index.max_edit_distance)
+        index.forms = self.surface_forms()
+
+    def surface_forms(self) -> Dict[str, str]:
+        """Método para elegir la palabra con la que mostrar cada término
+        analizado: la que aparece en más documentos de las que se reducen a
+        él. A igual número de documentos, la primera en orden
+        lexicográfico.
+
+        Returns:
+            Dict[str, str]: palabra de cada término analizado. Vacío si los
+                términos no se analizan
+        """
+        if self.words is None:
+            return {}
+
+        best: Dict[str, Tuple[int, str]] = {}
+        for word, n_docs in self.words.items():
+            term = self.analyzer(word)
+            key = (-n_docs, word)
+            if term not in best or key < best[term]:
+                best[term] = key
+        return {term: word for term, (_, word) in best.items()}
+
+    def vocabulary(self) -> Tuple[List[str], "array[int]", Dict[str, str]]:
+        """Método para construir el vocabulario de palabras con el que se
+        autocompleta con stemming: las palabras sin acentos ordenadas, su
+        número de documentos y su forma con acentos más frecuente.
+
+        Returns:
+            Tuple[List[str], array[int], Dict[str, str]]: palabras, número
+                de documentos de cada una y forma con acentos de las que la
+                tienen. Vacíos sin stemming
+        """
+        if self.folded is None or self.words is None:
+            return [], array("I"), {}
+
+        words = sorted(self.folded)
+        word_df = array("I", (self.folded[word] for word in words))
+        best: Dict[str, Tuple[int, str]] = {}
+        for word, n_docs in self.words.items():
+            folded = fold_accents(word)
+            key = (-n_docs, word)
+            if folded not in best or key < best[folded]:
+                best[folded] = key
+        spellings = {
+            folded: word for folded, (_, word) in best.items() if word != folded
+        }
+        return words, word_df, spellings
+
+    def dictionary(self) -> Index:
+        """Método para extraer del índice ya construido su diccionario
+        global: los términos con su número de documentos, los borrados y las
+        completions, sin posting lists ni documentos.
+
+        El coordinador de los shards lo usa para expandir los comodines y
+        los términos aproximados, sugerir correcciones y autocompletar igual
+        que sobre el índice sin particionar.
+
+        Returns:
+            Index: el diccionario del índice
+        """
+        return Index(
+            terms=self.index.terms,
+            deletes=self.index.deletes,
+            max_edit_distance=self.index.max_edit_distance,
+            accents=self.index.accents,
+            stemming=self.index.stemming,
+            df=self.index.df,
+            completions=self.index.completions,
+            forms=self.index.forms,
+            words=self.index.words,
+            word_df=self.index.word_df,
+            spellings=self.index.spellings,
+        )
+
+    def split(self, n_shards: int) -> List[Index]:
+        """Método para particionar el índice por documentos en `n_shards`
+        índices independientes. El documento con id `i` va al shard
+        `i % n_shards` con id local `i // n_shards`, de modo que las posting
+        lists de cada shard siguen ordenadas.
+
+        Las estadísticas globales (longitud media e IDF) se copian en todos
+        los shards para que las puntuaciones sean comparables entre ellos.
+        Cada shard tiene su diccionario ordenado, pero no el de borrados ni
+        el de autocompletado, que se resuelven sobre el diccionario global.
+
+        Args:
+            n_shards (int): número de shards
+        Returns:
+            List[Index]: los shards del índice
+        """
+        shards = [
+            Index(
+                avg_length=self.index.avg_length,
+                accents=self.index.accents,
+                stemming=self.index.stemming,
+                static_order=self.index.static_order,
+            )
+            for _ in range(n_shards)
+        ]
+
+        for doc in self.index.documents:
+            shard = shards[doc.id % n_shards]
+            shard.documents.append(replace(doc, id=doc.id // n_shards))
+            shard.doc_lengths.append(self.index.doc_lengths[doc.id])
+            shard.static_rank.append(self.index.static_rank[doc.id])
+
+        for word, docs in self.index.postings.items():
+            frequencies = self.index.frequencies[word]
+            for doc_id, count in zip(docs, frequencies):
+                shard = shards[doc_id % n_shards]
+                if word not in shard.postings:
+                    shard.postings[word] = array("I")
+                    shard.frequencies[word] = array("I")
+                    shard.idf[word] = self.index.idf[word]
+                shard.postings[word].append(doc_id // n_shards)
+                shard.frequencies[word].append(count)
+
+        for shard in shards:
+            shard.terms = sorted(shard.postings)
+        return shards
+
     def parse(self, text: str) -> str:
         """Método para extraer el texto de un documento.
         Puedes utilizar la librería 'beautifulsoup' para extraer solo
@@ -194,8 +646,7 @@ class Indexer:
             List[str]: lista de palabras del documento, sin stopwords
         """
 
-        stopwords = set(nltk.corpus.stopwords.words("spanish"))
-        return [word for word in words if word not in stopwords]
+        return [word for word in words if word not in SPANISH_STOPWORDS]
 
     def remove_punctuation(self, text: str) -> str:
         """Método para eliminar signos de puntuación de un texto:
@@ -231,6 +682,22 @@ class Indexer:
         """
         return text.replace("\n", " ").replace("\t", " ").replace("\r", " ")
 
+    def get_links(self, text: str, url: str) -> List[str]:
+        """Método para extraer los enlaces de un documento HTML
+
+        Args:
+            text (str): texto de un documento
+            url (str): URL del documento, para resolver enlaces relativos
+        Returns:
+            List[str]: URLs a las que enlaza el documento
+        """
+        soup = BeautifulSoup(text, "html.parser")
+        return [
+            urljoin(url, str(tag["href"]))
+            for tag in soup.find_all("a", href=True)
+            if isinstance(tag, Tag)
+        ]
+
     def get_title(self, text: str) -> str:
         soup = BeautifulSoup(text, "html.parser")
         title = soup.find("title")
@@ -243,6 +710,5 @@ class Indexer:
 
     def show_stats(self, building_time: float) -> None:
         self.stats.building_time = building_time
-        self.stats.n_words = len(self.index.postings)
-        self.stats.n_docs = len(self.index.documents)
+        self.stats.record(metrics)
         print(self.stats)
@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, List, Set
+
+# Longitud del prefijo de cada término usado para generar los borrados.
+# Limita el tamaño del índice de borrados sin perder candidatos, igual que
+# en SymSpell.
+PREFIX_LENGTH = 7
+
+# Distancia de edición máxima por defecto de las búsquedas tolerantes a
+# errores
+MAX_EDIT_DISTANCE = 2
+
+
+def deletes(term: str, distance: int) -> Set[str]:
+    """Genera todas las cadenas que se obtienen al borrar hasta `distance`
+    caracteres del prefijo de `term`, incluido el propio prefijo.
+
+    Args:
+        term (str): término a procesar
+        distance (int): número máximo de caracteres a borrar
+    Returns:
+        Set[str]: conjunto de borrados del prefijo del término
+    """
+    prefix = term[:PREFIX_LENGTH]
+    res = {prefix}
+    frontier = {prefix}
+    for _ in range(distance):
+        frontier = {
+            word[:i] + word[i + 1 :]
+            for word in frontier
+            for i in range(len(word))
+        }
+        res |= frontier
+    return res
+
+
+def deletion_index(terms: Iterable[str], distance: int) -> Dict[str, List[str]]:
+    """Construye el índice de borrados de un vocabulario. Cada borrado se
+    mapea a los términos de los que procede.
+
+    Args:
+        terms (Iterable[str]): vocabulario
+        distance (int): distancia de edición máxima soportada
+    Returns:
+        Dict[str, List[str]]: diccionario de borrados a términos
+    """
+    res: Dict[str, List[str]] = {}
+    for term in terms:
+        for delete in deletes(term, distance):
+            res.setdefault(delete, []).append(term)
+    return res
+
+
+class EditDistance:
+    """Distancia de Damerau-Levenshtein (alineamiento óptimo) de un término
+    fijo a muchos candidatos, como los de una búsqueda de `Index.fuzzy`.
+
+    Usa el algoritmo de vectores de bits de Hyyrö (2003): cada columna de
+    la matriz de programación dinámica se representa con enteros cuyos bits
+    son las diferencias entre celdas consecutivas, así que se calcula con
+    unas pocas operaciones por carácter del candidato en lugar de un bucle
+    por celda. Las máscaras de los caracteres del término se construyen una
+    vez y se reutilizan para todos los candidatos.
+
+    Las columnas de cada candidato se guardan, de modo que el siguiente
+    continúa desde la del prefijo que comparte con él. Recorridos en orden
+    lexicográfico, los candidatos comparten casi siempre la raíz.
+    """
+
+    def __init__(self, term: str, max_distance: int):
+        self.term = term
+        self.max_distance = max_distance
+        # Bits de las posiciones de cada carácter en el término
+        self.masks: Dict[str, int] = {}
+        for i, char in enumerate(term):
+            self.masks[char] = self.masks.get(char, 0) | 1 << i
+        self.last = 1 << (len(term) - 1) if term else 0
+        # Tabla que borra los caracteres del término
+        self.foreign = str.maketrans("", "", term)
+        # Último candidato y columnas tras cada uno de sus caracteres: las
+        # diferencias verticales positivas y negativas, la diagonal, la
+        # máscara del carácter y la distancia
+        self.previous = ""
+        self.columns = [((1 << len(term)) - 1, 0, 0, 0, len(term))]
+
+    def __call__(self, other: str) -> int:
+        """Calcula la distancia del término a `other`
+
+        Args:
+            other (str): candidato
+        Returns:
+            int: distancia, o `max_distance + 1` si es mayor
+        """
+        too_far = self.max_distance + 1
+        if abs(len(self.term) - len(other)) > self.max_distance:
+            return too_far
+        if not self.term:
+            return len(other)
+        # Cada carácter del candidato que no está en el término necesita
+        # una edición
+        if len(other.translate(self.foreign)) > self.max_distance:
+            return too_far
+
+        # Columnas del prefijo común con el candidato anterior
+        start = 0
+        end = min(len(other), len(self.previous), len(self.columns) - 1)
+        while start < end and other[start] == self.previous[start]:
+            start += 1
+        columns = self.columns
+        del columns[start + 1 :]
+        self.previous = other
+
+        masks, last = self.masks, self.last
+        vp, vn, d0, prev_match, distance = columns[start]
+        remaining = len(other) - start
+        for char in other[start:]:
+            match = masks.get(char, 0)
+            transposition = ((~d0 & match) << 1) & prev_match
+            d0 = (((match & vp) + vp) ^ vp) | match | vn | transposition
+            hp = vn | ~(d0 | vp)
+            hn = d0 & vp
+            if hp & last:
+                distance += 1
+            elif hn & last:
+                distance -= 1
+            hp = (hp << 1) | 1
+            hn <<= 1
+            vp = hn | ~(d0 | hp)
+            vn = hp & d0
+            prev_match = match
+            columns.append((vp, vn, d0, prev_match, distance))
+
+            # Las distancias no decrecen a lo largo de una diagonal, así que
+            # la de la celda de la columna en la diagonal de la última es
+            # una cota inferior de la distancia final
+            remaining -= 1
+            row = len(self.term) - remaining
+            if row > 0:
+                below = (1 << row) - 1
+                bound = (
+                    len(columns)
+                    - 1
+                    + (vp & below).bit_count()
+                    - (vn & below).bit_count()
+                )
+                if bound > self.max_distance:
+                    return too_far
+        return min(distance, too_far)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Calcula la distancia de Damerau-Levenshtein (alineamiento óptimo)
+    entre dos cadenas, ver `EditDistance`.
+
+    Args:
+        a (str): primera cadena
+        b (str): segunda cadena
+        max_distance (int): distancia a partir de la que se abandona
+    Returns:
+        int: distancia entre las cadenas, o `max_distance + 1` si es mayor
+    """
+    return EditDistance(a, max_distance)(b)
@@ -0,0 +1,262 @@
+import heapq
+import os
+import pickle as pkl
+import shutil
+import tempfile
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from ..instrumentation.metrics import metrics  # type: ignore
+
+# Estimación del coste en memoria de cada posting (id y frecuencia en sus
+# arrays, 4 bytes cada uno más la holgura de crecimiento) y de cada término
+# nuevo (clave, entrada del diccionario y arrays vacíos). Se usan para
+# decidir cuándo volcar un bloque a disco sin tener que medir la memoria real
+# del proceso.
+POSTING_BYTES = 10
+TERM_BYTES = 320
+
+# Entrada de los bloques en disco: las posting lists se guardan como los bytes
+# de sus arrays, que se serializan más rápido que los propios arrays
+_RawEntry = Tuple[str, bytes, bytes]
+
+# Bytes de cada id o frecuencia en los arrays de las posting lists
+_ITEM_BYTES = array("I").itemsize
+
+
+def _read_pickles(fname: str) -> Iterator[Any]:
+    """Lee secuencialmente los objetos serializados uno tras otro en un
+    fichero."""
+    with open(fname, "rb") as fr:
+        while True:
+            try:
+                yield pkl.load(fr)
+            except EOFError:
+                return
+
+
+def external_group(
+    pairs: Iterable[Tuple[str, Any]], budget: int, tmp_dir: str
+) -> Iterator[Tuple[str, List[Any]]]:
+    """Agrupa por clave una secuencia de pares (clave, valor) sin superar el
+    presupuesto de memoria, volcando bloques ordenados a disco y mezclándolos
+    al final. Los valores de cada clave conservan el orden de llegada.
+
+    Args:
+        pairs (Iterable[Tuple[str, Any]]): pares a agrupar
+        budget (int): presupuesto de memoria en bytes
+        tmp_dir (str): directorio en el que crear los bloques
+    Returns:
+        Iterator[Tuple[str, List[Any]]]: cada clave con sus valores, en orden
+            de clave
+    """
+    runs: List[str] = []
+    groups: Dict[str, List[Any]] = {}
+    used = 0
+
+    def flush():
+        run = os.path.join(tmp_dir, f"group.{len(runs)}")
+        with open(run, "wb") as fw:
+            for key in sorted(groups):
+                pkl.dump((key, groups[key]), fw)
+        runs.append(run)
+
+    for key, value in pairs:
+        if key not in groups:
+            groups[key] = []
+            used += TERM_BYTES
+        groups[key].append(value)
+        used += POSTING_BYTES
+        if used >= budget:
+            flush()
+            groups = {}
+            used = 0
+    if groups:
+        flush()
+        groups = {}
+
+    current: Tuple[str, List[Any]] | None = None
+    readers = [_read_pickles(run) for run in runs]
+    for key, values in heapq.merge(*readers, key=lambda x: x[0]):
+        if current is not None and current[0] == key:
+            current[1].extend(values)
+            continue
+        if current is not None:
+            yield current
+        current = (key, values)
+    if current is not None:
+        yield current
+
+    for run in runs:
+        os.remove(run)
+
+
+class StreamedDict(dict):
+    """Diccionario que se serializa consumiendo un iterador de pares
+    (clave, valor) en lugar de su contenido. Al deserializarlo se obtiene un
+    `dict` normal, pero nunca llega a estar entero en memoria al guardarlo.
+    """
+
+    def __init__(self, items: Iterator[Tuple[Any, Any]]):
+        super().__init__()
+        self.items_iter = items
+
+    def __reduce_ex__(self, protocol):
+        return dict, (), None, None, self.items_iter
+
+
+class StreamedList(list):
+    """Lista que se serializa consumiendo un iterador, ver `StreamedDict`."""
+
+    def __init__(self, items: Iterator[Any]):
+        super().__init__()
+        self.items_iter = items
+
+    def __reduce_ex__(self, protocol):
+        return list, (), None, self.items_iter, None
+
+
+class SpimiBuilder:
+    """Constructor de índices invertidos en memoria acotada (SPIMI).
+
+    Las posting lists se acumulan en memoria hasta alcanzar el presupuesto,
+    momento en el que se vuelcan a disco como un bloque ordenado por término.
+    Los documentos se vuelcan a disco según llegan. Al terminar, los bloques
+    se mezclan en streaming (k-way). La mezcla deja en memoria el
+    diccionario, `terms` y `df`, y en disco las posting lists y las
+    frecuencias en ficheros separados, en el orden de `terms`, para
+    serializar cada campo del índice final con una sola lectura.
+    """
+
+    def __init__(self, budget: int, tmp_dir: str):
+        """
+        Args:
+            budget (int): presupuesto de memoria para las posting lists, en
+                bytes
+            tmp_dir (str): directorio en el que crear los ficheros temporales
+        """
+        self.budget = budget
+        os.makedirs(tmp_dir, exist_ok=True)
+        self.tmp_dir = tempfile.mkdtemp(prefix="spimi-", dir=tmp_dir)
+        self.runs: List[str] = []
+        self.merged_postings = os.path.join(self.tmp_dir, "postings")
+        self.merged_frequencies = os.path.join(self.tmp_dir, "frequencies")
+        self.terms: List[str] = []
+        self.df = array("I")
+        self.postings: Dict[str, Tuple[array[int], array[int]]] = {}
+        self.used = 0
+        self.n_docs = 0
+        self.doc_lengths: List[int] = []
+        self.docs_file = open(os.path.join(self.tmp_dir, "documents"), "wb")
+
+    def add(self, document: Any, counts: Dict[str, int]) -> None:
+        """Añade un documento y sus frecuencias de términos al índice.
+
+        Args:
+            document (Document): documento a añadir, con su id ya asignado
+            counts (Dict[str, int]): frecuencia de cada término en el
+                documento
+        """
+        pkl.dump(document, self.docs_file)
+        self.doc_lengths.append(sum(counts.values()))
+        self.n_docs += 1
+
+        for word, count in counts.items():
+            if word not in self.postings:
+                self.postings[word] = (array("I"), array("I"))
+                self.used += TERM_BYTES
+            docs, frequencies = self.postings[word]
+            docs.append(document.id)
+            frequencies.append(count)
+        self.used += POSTING_BYTES * len(counts)
+
+        if self.used >= self.budget:
+            with metrics.stage("indexer.spimi_flush"):
+                self.flush()
+
+    def flush(self) -> None:
+        """Vuelca las posting lists en memoria a un bloque ordenado en disco."""
+        if not self.postings:
+            return
+
+        run = os.path.join(self.tmp_dir, f"run.{len(self.runs)}")
+        with open(run, "wb") as fw:
+            for word in sorted(self.postings):
+                docs, frequencies = self.postings[word]
+                pkl.dump((word, docs.tobytes(), frequencies.tobytes()), fw)
+        self.runs.append(run)
+        self.postings = {}
+        self.used = 0
+
+    def finish(self) -> None:
+        """Vuelca el último bloque y mezcla todos los bloques.
+
+        Los bloques contienen documentos consecutivos, así que concatenar en
+        orden de bloque las entradas de un mismo término mantiene su posting
+        list ordenada.
+        """
+        self.flush()
+        self.docs_file.close()
+
+        runs = [_read_pickles(run) for run in self.runs]
+        with open(self.merged_postings, "wb") as fp, open(
+            self.merged_frequencies, "wb"
+        ) as ff:
+
+            def write(entry: _RawEntry) -> None:
+                word, docs, frequencies = entry
+                self.terms.append(word)
+                self.df.append(len(docs) // _ITEM_BYTES)
+                pkl.dump(docs, fp)
+                pkl.dump(frequencies, ff)
+
+            current: _RawEntry | None = None
+            for word, docs, frequencies in heapq.merge(
+                *runs, key=lambda x: x[0]
+            ):
+                if current is not None and current[0] == word:
+                    current = (
+                        word,
+                        current[1] + docs,
+                        current[2] + frequencies,
+                    )
+                    continue
+                if current is not None:
+                    write(current)
+                current = (word, docs, frequencies)
+            if current is not None:
+                write(current)
+
+        for run in self.runs:
+            os.remove(run)
+        self.runs = []
+
+    def posting_lists(self) -> Iterator[Tuple[str, "array[int]"]]:
+        """Recorre las posting lists del índice mezclado en orden de término.
+
+        Returns:
+            Iterator[Tuple[str, array[int]]]: tuplas (término, posting list)
+        """
+        for word, docs in zip(self.terms, _read_pickles(self.merged_postings)):
+            yield word, array("I", docs)
+
+    def term_frequencies(self) -> Iterator[Tuple[str, "array[int]"]]:
+        """Recorre las frecuencias del índice mezclado en orden de término.
+
+        Returns:
+            Iterator[Tuple[str, array[int]]]: tuplas (término, frecuencia en
+                cada documento de su posting list)
+        """
+        merged = _read_pickles(self.merged_frequencies)
+        for word, frequencies in zip(self.terms, merged):
+            yield word, array("I", frequencies)
+
+    def documents(self) -> Iterator[Any]:
+        """Recorre los documentos en orden de id."""
+        return _read_pickles(os.path.join(self.tmp_dir, "documents"))
+
+    def close(self) -> None:
+        """Elimina los ficheros temporales"""
+        if not self.docs_file.closed:
+            self.docs_file.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
@@ -0,0 +1,274 @@
+import json
+import sys
+import threading
+from argparse import ArgumentParser, Namespace
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Límites superiores de los buckets de los histogramas de tiempo, en segundos
+TIME_BUCKETS = (
+    0.00001,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+)
+
+# Límites superiores de los buckets de los histogramas de tamaños, en bytes
+SIZE_BUCKETS = (1 << 10, 1 << 14, 1 << 17, 1 << 20, 1 << 23, 1 << 26)
+
+_null_stage = nullcontext()
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos, como los de Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        """Añade las observaciones de otro histograma con los mismos
+        buckets"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Devuelve los pares (límite, observaciones <= límite)"""
+        res = []
+        acc = 0
+        for bound, count in zip(self.buckets, self.counts):
+            acc += count
+            res.append((f"{bound:g}", acc))
+        res.append(("+Inf", self.count))
+        return res
+
+
+class _Stage:
+    """Cronómetro de una etapa, registra su duración al salir del bloque"""
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.ts = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.metrics.observe(
+            f"{self.name}_seconds", perf_counter() - self.ts, TIME_BUCKETS
+        )
+
+
+class Metrics:
+    """Registro de métricas del proceso: tiempos por etapa, contadores,
+    gauges e histogramas.
+
+    Desactivado por defecto. Mientras lo está, todos los métodos vuelven
+    inmediatamente y `stage` devuelve un context manager vacío, de modo que
+    la instrumentación puede quedarse en los caminos críticos.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def stage(self, name: str):
+        """Mide la duración del bloque `with` como la etapa `name`"""
+        if not self.enabled:
+            return _null_stage
+        return _Stage(self, name)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Incrementa el contador `name`"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Fija el valor del gauge `name`"""
+        if not self.enabled:
+            return
+        self.gauges[name] = value
+
+    def observe(
+        self, name: str, value: float, buckets: Tuple[float, ...] = SIZE_BUCKETS
+    ) -> None:
+        """Añade una observación al histograma `name`"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    def merge(
+        self, counters: Dict[str, float], histograms: Dict[str, Histogram]
+    ) -> None:
+        """Suma los contadores e histogramas de otro proceso, e.g., los de
+        un worker, a los de este"""
+        if not self.enabled:
+            return
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, hist in histograms.items():
+                if name not in self.histograms:
+                    self.histograms[name] = Histogram(hist.buckets)
+                self.histograms[name].merge(hist)
+
+    def to_json(self) -> str:
+        data: Dict[str, Any] = {
+            "counters": self.counters,
+            "gauges": self.gauges,
+            "histograms": {
+                name: {
+                    "count": hist.count,
+                    "sum": hist.sum,
+                    "buckets": dict(hist.cumulative()),
+                }
+                for name, hist in self.histograms.items()
+            },
+        }
+        return json.dumps(data, indent=4)
+
+    def to_prometheus(self) -> str:
+        """Exporta las métricas en el formato de texto de Prometheus"""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            name = _prometheus_name(name)
+            lines.append(f"# TYPE {name}_total counter")
+            lines.append(f"{name}_total {value:g}")
+        for name, value in sorted(self.gauges.items()):
+            name = _prometheus_name(name)
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        for name, hist in sorted(self.histograms.items()):
+            name = _prometheus_name(name)
+            lines.append(f"# TYPE {name} histogram")
+            for bound, count in hist.cumulative():
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{name}_sum {hist.sum:g}")
+            lines.append(f"{name}_count {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+
+def _prometheus_name(name: str) -> str:
+    return name.replace(".", "_").replace("-", "_")
+
+
+# Registro global del proceso
+metrics = Metrics()
+
+
+def add_arguments(parser: ArgumentParser) -> None:
+    """Añade a un script los argumentos de métricas y profiling"""
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        choices=["json", "prometheus"],
+        help="Registra tiempos por etapa, contadores e histogramas y los"
+        " emite al terminar en el formato indicado",
+    )
+
+    parser.add_argument(
+        "--metrics-output",
+        type=str,
+        help="Fichero donde escribir las métricas. Por defecto, stderr",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Perfila la ejecución con cProfile y guarda las estadísticas en"
+        " el fichero indicado (legible con pstats)",
+    )
+
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Muestra al terminar las líneas que más memoria reservaron",
+    )
+
+
+@contextmanager
+def instrumented(args: Namespace) -> Iterator[Metrics]:
+    """Activa las métricas y el profiling pedidos en `args` durante el
+    bloque `with`, y los emite al salir."""
+    # Los módulos de profiling se importan solo cuando se piden, así no
+    # penalizan el arranque de cada ejecución.
+    if args.metrics:
+        metrics.enabled = True
+    if args.tracemalloc:
+        import tracemalloc
+
+        tracemalloc.start()
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+    ts = perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        metrics.gauge("process.wall_seconds", perf_counter() - ts)
+
+        if profiler is not None:
+            import pstats
+
+            profiler.dump_stats(args.profile)
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(20)
+
+        if args.tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            print("Top 20 reservas de memoria:", file=sys.stderr)
+            for stat in snapshot.statistics("lineno")[:20]:
+                print(stat, file=sys.stderr)
+
+        if args.metrics:
+            out = (
+                metrics.to_json()
+                if args.metrics == "json"
+                else metrics.to_prometheus()
+            )
+            if args.metrics_output:
+                with open(args.metrics_output, "w") as fw:
+                    fw.write(out)
+            else:
+                print(out, file=sys.stderr)
@@ -1,6 +1,13 @@
 from argparse import ArgumentParser
 
-from .parser import Parser
+from ..indexer.completion import COMPLETIONS  # type: ignore
+from ..instrumentation.metrics import (  # type: ignore
+    add_arguments,
+    instrumented,
+    metrics,
+)
+from .ast import MAX_EXPANSIONS
+from .parser import parse_query
 from .retriever import Retriever
 
 
@@ -30,6 +37,23 @@ def parse_args():
         help="Ruta al fichero de texto con una query por línea",
         required=False,
     )
+    parser.add_argument(
+        "-a",
+        "--autocompletar",
+        type=str,
+        help="Comienzo de un término a autocompletar con los términos del"
+        " índice que aparecen en más documentos",
+        required=False,
+    )
+
+    parser.add_argument(
+        "--servidor",
+        type=int,
+        help="Puerto en el que servir el autocompletado por HTTP, en"
+        " /autocompletar?prefijo=...",
+        required=False,
+    )
+
     parser.add_argument(
         "-n",
         "--max_resultados",
@@ -38,31 +62,141 @@ def parse_args():
         help="Número de resultados",
     )
 
+    parser.add_argument(
+        "--max-completions",
+        type=int,
+        default=COMPLETIONS,
+        help="Número de términos con los que se autocompleta. Hasta"
+        f" {COMPLETIONS} están precalculados en el índice",
+    )
+
+    parser.add_argument(
+        "-e",
+        "--max-expansiones",
+        type=int,
+        default=MAX_EXPANSIONS,
+        help="Número máximo de términos en los que se expande un comodín"
+        " (e.g., ingenier*)",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--sugerencias",
+        action="store_true",
+        help="Sugiere correcciones para los términos que no están en el"
+        " índice",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--ranking",
+        type=str,
+        choices=["coseno", "bm25"],
+        default="coseno",
+        help="Función de puntuación de los resultados",
+    )
+
+    parser.add_argument(
+        "--k1",
+        type=float,
+        default=1.2,
+        help="Parámetro k1 de BM25, saturación de la frecuencia de términos",
+    )
+
+    parser.add_argument(
+        "--b",
+        type=float,
+        default=0.75,
+        help="Parámetro b de BM25, normalización por longitud del documento",
+    )
+
+    parser.add_argument(
+        "--peso-estatico",
+        type=float,
+        default=0.0,
+        help="Peso de la puntuación estática (PageRank) del documento. La"
+        " puntuación de cada resultado se multiplica por"
+        " 1 + peso * puntuación estática. 0 la desactiva (por defecto)",
+    )
+
+    parser.add_argument(
+        "--parada-temprana",
+        action="store_true",
+        help="Con BM25 sobre un índice ordenado por puntuación estática"
+        " (--orden-estatico del indexador), puntúa los documentos por"
+        " bloques y para en cuanto ninguno de los restantes puede entrar en"
+        " los resultados. Solo compensa en queries con muchos documentos"
+        " y pocos términos",
+    )
+
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Número de shards del índice. Con más de uno, cada shard"
+        " (<index-file>.N) se sirve desde un proceso independiente",
+    )
+
+    add_arguments(parser)
+
     # Añade aquí cualquier otro argumento que condicione
     # el funcionamiento del retriever
 
     args = parser.parse_args()
-    if not args.query and not args.file:
+    modes = [args.query, args.file, args.autocompletar, args.servidor]
+    if all(mode is None for mode in modes):
         parser.error(
-            "Debes introducir una query (-q) o un fichero (-f) con queries."
+            "Debes introducir una query (-q), un fichero (-f) con queries,"
+            " un término a autocompletar (-a) o el puerto del servidor"
+            " (--servidor)."
         )
-    if args.query and args.file:
+    if sum(mode is not None for mode in modes) > 1:
         parser.error(
-            "Introduce solo una query (-q) o un fichero (-f), no ambos."
+            "Introduce solo una query (-q), un fichero (-f), un término a"
+            " autocompletar (-a) o el puerto del servidor (--servidor)."
         )
     return args
 
 
 if __name__ == "__main__":
     args = parse_args()
-    retriever = Retriever(args)
-    if args.query:
-        parser = Parser(args.query)
-        ast = parser.parse()
-        for res in retriever.search_query(ast):
-            print(res)
-    elif args.file:
-        for query, results in retriever.search_from_file(args.file).items():
-            print(f"#### {query} ####")
-            for res in results:
+    with instrumented(args):
+        if args.shards > 1:
+            # multiprocessing solo se carga si hay shards que servir
+            from .coordinator import Coordinator
+
+            retriever: Retriever = Coordinator(args)
+        else:
+            retriever = Retriever(args)
+        if args.query:
+            with metrics.stage("retriever.parse"):
+                ast = parse_query(args.query, args.max_expansiones)
+            for res in retriever.search_query(ast):
                 print(res)
+            if args.sugerencias:
+                for term, suggestion in retriever.suggest(ast).items():
+                    print(
+                        f"¿Quisiste decir '{suggestion}' en lugar de '{term}'?"
+                    )
+        elif args.file:
+            for query, results in retriever.search_from_file(args.file).items():
+                print(f"#### {query} ####")
+                for res in results:
+                    print(res)
+        elif args.autocompletar is not None:
+            for term, n_docs in retriever.complete(args.autocompletar):
+                print(f"{term} ({n_docs} documentos)")
+        else:
+            # El servidor HTTP solo se carga si se pide
+            from .server import make_server
+
+            server = make_server(retriever, args.servidor)
+            print(f"Sirviendo en http://127.0.0.1:{server.server_port}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+
+        retriever.close()
@@ -1,20 +1,55 @@
+import heapq
 from abc import ABC, abstractmethod
-from typing import List
+from dataclasses import dataclass
+from typing import List, Sequence
 
-from ..indexer.indexer import Index  # type: ignore
+from ..indexer.index import Index  # type: ignore
+
+# Número máximo de términos en los que se puede expandir un comodín
+MAX_EXPANSIONS = 64
+
+
+def merge_postings(postings: List[Sequence[int]]) -> List[int]:
+    """Une varias posting lists ordenadas mediante una mezcla k-way,
+    eliminando los identificadores repetidos.
+
+    Args:
+        postings (List[Sequence[int]]): posting lists ordenadas a unir
+    Returns:
+        List[int]: posting list ordenada con la unión de todas ellas
+    """
+    res: List[int] = []
+    for doc in heapq.merge(*postings):
+        if not res or res[-1] != doc:
+            res.append(doc)
+    return res
+
+
+@dataclass
+class Evaluation:
+    """Resultado de evaluar un nodo del AST. Cada evaluación crea uno nuevo,
+    los nodos no guardan nada de ella."""
+
+    # ids de los documentos que cumplen la consulta. Puede ser una posting
+    # list del índice, que no debe modificarse
+    docs: Sequence[int]
+    # Términos del índice con los que se ha evaluado, e.g., las expansiones
+    # de los comodines
+    terms: List[str]
 
 
 class AstNode(ABC):
     """Representación de un nodo del AST"""
 
     @abstractmethod
-    def eval(self, index: Index) -> List[int]:
+    def eval(self, index: Index) -> Evaluation:
         """Evalúa el nodo utilizando el índice provisto
 
         Args:
             index (Index): Índice utilizado en la evaluación del AST
         Returns:
-            List[Result]: lista de resultados que cumplen la consulta
+            Evaluation: documentos que cumplen la consulta y términos del
+                índice con los que se ha evaluado
         """
         ...
 
@@ -27,20 +62,43 @@ class AstNode(ABC):
         """
         ...
 
+    @abstractmethod
+    def resolve(self, dictionary: Index) -> "AstNode":
+        """Sustituye los comodines y los términos aproximados por los
+        términos del diccionario en los que se expanden. Permite expandirlos
+        una sola vez contra el diccionario global y evaluar el resultado en
+        cada shard.
+
+        Args:
+            dictionary (Index): índice con el diccionario de términos
+        Returns:
+            AstNode: un AST nuevo, sin comodines ni términos aproximados
+        """
+        ...
+
 
 class AndNode(AstNode):
     def __init__(self, left: AstNode, right: AstNode):
         self.left = left
         self.right = right
 
-    def eval(self, index: Index) -> List[int]:
-        return list(set(self.left.eval(index)) & set(self.right.eval(index)))
+    def eval(self, index: Index) -> Evaluation:
+        left = self.left.eval(index)
+        right = self.right.eval(index)
+        return Evaluation(
+            list(set(left.docs) & set(right.docs)), left.terms + right.terms
+        )
 
     def get_words(self) -> List[str]:
         res = self.left.get_words()
         res.extend(self.right.get_words())
         return res
 
+    def resolve(self, dictionary: Index) -> AstNode:
+        return AndNode(
+            self.left.resolve(dictionary), self.right.resolve(dictionary)
+        )
+
     def __str__(self):
         return f"({self.left} AND {self.right})"
 
@@ -50,9 +108,12 @@ class OrNode(AstNode):
         self.left = left
         self.right = right
 
-    def eval(self, index: Index) -> List[int]:
-        return list(
-            sorted(set(self.left.eval(index)) | set(self.right.eval(index)))
+    def eval(self, index: Index) -> Evaluation:
+        left = self.left.eval(index)
+        right = self.right.eval(index)
+        return Evaluation(
+            list(sorted(set(left.docs) | set(right.docs))),
+            left.terms + right.terms,
         )
 
     def get_words(self) -> List[str]:
@@ -60,6 +121,11 @@ class OrNode(AstNode):
         res.extend(self.right.get_words())
         return res
 
+    def resolve(self, dictionary: Index) -> AstNode:
+        return OrNode(
+            self.left.resolve(dictionary), self.right.resolve(dictionary)
+        )
+
     def __str__(self):
         return f"({self.left} OR {self.right})"
 
@@ -68,13 +134,18 @@ class NotNode(AstNode):
     def __init__(self, data):
         self.data = data
 
-    def eval(self, index: Index) -> List[int]:
-        all_docs: set = set(doc.id for doc in index.documents)
-        return list(all_docs - set(self.data.eval(index)))
+    def eval(self, index: Index) -> Evaluation:
+        # Los ids de los documentos son sus posiciones en la lista
+        all_docs = set(range(len(index.documents)))
+        data = self.data.eval(index)
+        return Evaluation(list(all_docs - set(data.docs)), data.terms)
 
     def get_words(self) -> List[str]:
         return self.data.get_words()
 
+    def resolve(self, dictionary: Index) -> AstNode:
+        return NotNode(self.data.resolve(dictionary))
+
     def __str__(self):
         return f"NOT {self.data}"
 
@@ -83,11 +154,92 @@ class WordNode(AstNode):
     def __init__(self, data):
         self.data = data
 
-    def eval(self, index: Index) -> List[int]:
-        return index.postings.get(self.data, [])
+    def eval(self, index: Index) -> Evaluation:
+        term = index.analyze(self.data)
+        return Evaluation(index.postings.get(term, []), [term])
 
     def get_words(self) -> List[str]:
         return [self.data]
 
+    def resolve(self, dictionary: Index) -> AstNode:
+        return self
+
+    def __str__(self):
+        return self.data
+
+
+class WildcardNode(AstNode):
+    def __init__(self, data, max_expansions: int = MAX_EXPANSIONS):
+        self.data = data
+        self.max_expansions = max_expansions
+
+    def eval(self, index: Index) -> Evaluation:
+        terms = index.expand(index.fold(self.data), self.max_expansions)
+        return Evaluation(
+            merge_postings([index.postings[term] for term in terms]), terms
+        )
+
+    def get_words(self) -> List[str]:
+        # El patrón no es un término, sus términos dependen del índice y
+        # solo se conocen al evaluarlo
+        return []
+
+    def resolve(self, dictionary: Index) -> AstNode:
+        terms = dictionary.expand(
+            dictionary.fold(self.data), self.max_expansions
+        )
+        return TermsNode(terms, str(self))
+
+    def __str__(self):
+        return self.data
+
+
+class FuzzyNode(AstNode):
+    def __init__(self, data, max_expansions: int = MAX_EXPANSIONS):
+        self.data = data
+        self.max_expansions = max_expansions
+
+    def eval(self, index: Index) -> Evaluation:
+        terms = index.fuzzy(index.analyze(self.data), self.max_expansions)
+        return Evaluation(
+            merge_postings([index.postings[term] for term in terms]), terms
+        )
+
+    def get_words(self) -> List[str]:
+        # Como en WildcardNode, los términos parecidos solo se conocen al
+        # evaluar el nodo
+        return []
+
+    def resolve(self, dictionary: Index) -> AstNode:
+        terms = dictionary.fuzzy(
+            dictionary.analyze(self.data), self.max_expansions
+        )
+        return TermsNode(terms, str(self))
+
+    def __str__(self):
+        return f"~{self.data}"
+
+
+class TermsNode(AstNode):
+    """Unión de términos ya analizados, en los que se ha resuelto un comodín
+    o un término aproximado. Ver `AstNode.resolve`."""
+
+    def __init__(self, terms: List[str], data: str):
+        self.terms = terms
+        # Texto del nodo original
+        self.data = data
+
+    def eval(self, index: Index) -> Evaluation:
+        postings = [
+            index.postings[t] for t in self.terms if t in index.postings
+        ]
+        return Evaluation(merge_postings(postings), list(self.terms))
+
+    def get_words(self) -> List[str]:
+        return []
+
+    def resolve(self, dictionary: Index) -> AstNode:
+        return self
+
     def __str__(self):
         return self.data
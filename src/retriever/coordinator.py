@@ -0,0 +1,156 @@
+import heapq
+import multiprocessing
+import os
+from argparse import Namespace
+from itertools import islice
+from multiprocessing.connection import Connection
+from typing import Any, List, Tuple
+
+from ..indexer.index import DICTIONARY_SUFFIX, Index  # type: ignore
+from ..instrumentation.metrics import metrics  # type: ignore
+from .ast import AstNode
+from .retriever import Result, Retriever
+
+
+def _serve(args: Namespace, conn: Connection) -> None:
+    """Bucle de un worker. Carga su shard y resuelve las peticiones que le
+    envía el coordinador hasta recibir None. Entonces le responde con sus
+    métricas.
+
+    Cada petición es una tupla (método, query) y se responde con una tupla
+    (error, resultado).
+    """
+    metrics.reset()
+    metrics.enabled = bool(args.metrics)
+    retriever = Retriever(args)
+    while True:
+        request = conn.recv()
+        if request is None:
+            conn.send((metrics.counters, metrics.histograms))
+            break
+
+        method, query = request
+        try:
+            conn.send((None, getattr(retriever, method)(query)))
+        except Exception as e:
+            conn.send((e, None))
+    conn.close()
+
+
+class Coordinator(Retriever):
+    """Recuperador sobre un índice particionado en shards.
+
+    Cada shard se sirve desde un proceso worker independiente. Las queries
+    se envían ya parseadas a todos los workers y sus listas de resultados se
+    mezclan con un heap.
+
+    El coordinador carga como índice el diccionario global, sin posting
+    lists. Con él expande los comodines y los términos aproximados antes de
+    enviar la query, de modo que todos los shards la evalúan con los mismos
+    términos que el índice sin particionar. Las sugerencias y el
+    autocompletado se resuelven también sobre él, sin consultar a los
+    shards.
+    """
+
+    def __init__(self, args: Namespace):
+        super().__init__(args)
+        self.workers: List[Tuple[multiprocessing.Process, Connection]] = []
+
+        for i in range(args.shards):
+            shard_args = Namespace(**vars(args))
+            shard_args.index_file = f"{args.index_file}.{i}"
+
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve, args=(shard_args, child_conn), daemon=True
+            )
+            process.start()
+            # Sin cerrar este extremo, la tubería sigue abierta aunque el
+            # worker muera y el coordinador espera su respuesta para siempre
+            child_conn.close()
+            self.workers.append((process, conn))
+
+    def load_index(self) -> Index:
+        """Carga el diccionario global de los shards. Los índices
+        particionados antes de guardarlo no lo tienen y deben volver a
+        construirse."""
+        fname = self.args.index_file + DICTIONARY_SUFFIX
+        if not os.path.exists(fname):
+            raise FileNotFoundError(
+                f"No se encuentra el diccionario de los shards {fname}, "
+                "vuelve a construir el índice"
+            )
+        with metrics.stage("retriever.load_index"):
+            return Index.load(fname)
+
+    def _scatter(self, method: str, query: AstNode) -> List[Any]:
+        """Envía una petición a todos los workers y recoge sus respuestas.
+
+        Se reciben las respuestas de todos los workers antes de lanzar
+        ningún error, para que no queden pendientes y se tomen como las de
+        la siguiente petición.
+
+        Raises:
+            RuntimeError: si el worker de algún shard ha terminado, e.g.,
+                porque no ha podido cargar su índice
+        """
+        with metrics.stage("retriever.scatter"):
+            dead = []
+            for i, (_, conn) in enumerate(self.workers):
+                try:
+                    conn.send((method, query))
+                except OSError:
+                    dead.append(i)
+
+            res = []
+            errors = []
+            for i, (_, conn) in enumerate(self.workers):
+                if i in dead:
+                    continue
+                try:
+                    error, value = conn.recv()
+                except (EOFError, OSError):
+                    dead.append(i)
+                    continue
+                if error is not None:
+                    errors.append(error)
+                res.append(value)
+
+        if dead:
+            shards = ", ".join(
+                f"{i} ({self.args.index_file}.{i})" for i in sorted(dead)
+            )
+            raise RuntimeError(
+                f"Han terminado los workers de los shards {shards}, revisa"
+                " que existan sus índices"
+            )
+        if errors:
+            raise errors[0]
+        return res
+
+    def search_query(self, query: AstNode) -> List[Result]:
+        """Resuelve una query en todos los shards y mezcla sus top-k.
+
+        Args:
+            query (AstNode): consulta a resolver
+        Returns:
+            List[Result]: los `max_resultados` mejores resultados globales
+        """
+        with metrics.stage("retriever.resolve"):
+            query = query.resolve(self.index)
+        results = self._scatter("search_query", query)
+        merged = heapq.merge(*results, key=lambda x: x.score, reverse=True)
+        return list(islice(merged, self.args.max_resultados))
+
+    def close(self) -> None:
+        """Detiene los workers y suma sus métricas a las del coordinador"""
+        for process, conn in self.workers:
+            # Los workers que han terminado no tienen métricas que sumar
+            try:
+                conn.send(None)
+                metrics.merge(*conn.recv())
+            except (EOFError, OSError):
+                pass
+            conn.close()
+            process.join()
+        self.workers = []
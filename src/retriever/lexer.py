@@ -1,4 +1,6 @@
+import re
 from dataclasses import dataclass
+from typing import List
 
 WORD = 0
 AND = 1
@@ -7,9 +9,14 @@ NOT = 3
 LPAREN = 4
 RPAREN = 5
 DONE = 6
+WILDCARD = 7
+FUZZY = 8
 
-_ignorable_whitespace = " \t\n"
-_delimiters = _ignorable_whitespace + "()"
+# Un token es un paréntesis o una secuencia de caracteres sin delimitadores.
+# Lo que queda entre dos tokens son espacios ignorables (" ", "\t" y "\n").
+_token_regex = re.compile(r"[()]|[^ \t\n()]+")
+_wildcard_regex = re.compile(r"[*?]")
+_fuzzy_prefix = "~"
 
 
 @dataclass
@@ -28,56 +35,67 @@ LParenToken = Token(LPAREN, "(")
 RParenToken = Token(RPAREN, ")")
 
 
+# Tokens que se corresponden con una cadena fija
+_fixed_tokens = {
+    "AND": AndToken,
+    "OR": OrToken,
+    "NOT": NotToken,
+    "(": LParenToken,
+    ")": RParenToken,
+}
+
+
+def tokenize(query: str) -> List[Token]:
+    """Traduce una query a la lista completa de sus tokens en una sola
+    pasada de la expresión regular, sin incluir el DoneToken final.
+
+    Args:
+        query (str): query a traducir
+    Returns:
+        List[Token]: tokens de la query, en orden
+    """
+    tokens = []
+    for value in _token_regex.findall(query):
+        token = _fixed_tokens.get(value)
+        if token is None:
+            if value[0] == _fuzzy_prefix and len(value) > 1:
+                token = Token(FUZZY, value)
+            elif _wildcard_regex.search(value):
+                token = Token(WILDCARD, value)
+            else:
+                token = Token(WORD, value)
+        tokens.append(token)
+    return tokens
+
+
+def normalize(query: str) -> str:
+    """Forma canónica de una query: sus tokens separados por un espacio.
+    Dos queries con la misma forma canónica producen los mismos tokens.
+
+    Args:
+        query (str): query a normalizar
+    Returns:
+        str: la query normalizada
+    """
+    return " ".join(_token_regex.findall(query))
+
+
 class Lexer:
     """Lexer encargado de leer queries y traducirlas a tokens"""
 
     def __init__(self, query: str):
         self.query = query
+        self.tokens = tokenize(query)
         self.index = 0
         # Asignado a DoneToken para que el linter sea feliz
         self.cur_token = DoneToken
         self.next_token()
 
-    def _eat_whitespace(self):
-        """Método que elimina espacios en blanco de la query procesada."""
-        while (
-            self.index < len(self.query)
-            and self.query[self.index] in _ignorable_whitespace
-        ):
-            self.index += 1
-
     def next_token(self):
         """Mueve el lexer al próximo token."""
-        self._eat_whitespace()
-
-        if self.index >= len(self.query):
+        if self.index >= len(self.tokens):
             self.cur_token = DoneToken
             return
 
-        if self.query[self.index] == "(":
-            self.index += 1
-            self.cur_token = LParenToken
-            return
-
-        if self.query[self.index] == ")":
-            self.index += 1
-            self.cur_token = RParenToken
-            return
-
-        offset = 0
-        while (
-            self.index + offset < len(self.query)
-            and self.query[self.index + offset] not in _delimiters
-        ):
-            offset += 1
-
-        token = self.query[self.index : self.index + offset]
-        self.index += offset
-        if token == "AND":
-            self.cur_token = AndToken
-        elif token == "OR":
-            self.cur_token = OrToken
-        elif token == "NOT":
-            self.cur_token = NotToken
-        else:
-            self.cur_token = Token(WORD, token)
+        self.cur_token = self.tokens[self.index]
+        self.index += 1
@@ -1,5 +1,19 @@
-from .ast import AndNode, AstNode, NotNode, OrNode, WordNode
+from functools import lru_cache
+from typing import Tuple
+
+from .ast import (
+    MAX_EXPANSIONS,
+    AndNode,
+    AstNode,
+    FuzzyNode,
+    NotNode,
+    OrNode,
+    WildcardNode,
+    WordNode,
+)
 from .lexer import (
+    FUZZY,
+    WILDCARD,
     WORD,
     AndToken,
     DoneToken,
@@ -8,8 +22,14 @@ from .lexer import (
     NotToken,
     OrToken,
     RParenToken,
+    normalize,
 )
 
+_term_types = (WORD, WILDCARD, FUZZY)
+
+# Número de queries distintas cuyo AST se mantiene en caché
+QUERY_CACHE_SIZE = 4096
+
 
 class InvalidQueryException(Exception):
     def __init__(self, message):
@@ -17,8 +37,9 @@ class InvalidQueryException(Exception):
 
 
 class Parser:
-    def __init__(self, query: str):
+    def __init__(self, query: str, max_expansions: int = MAX_EXPANSIONS):
         self.lexer = Lexer(query)
+        self.max_expansions = max_expansions
         self.depth = 0
         self.cur_token = self.lexer.cur_token
 
@@ -28,17 +49,25 @@ class Parser:
         self.cur_token = self.lexer.cur_token
 
     def _parse_word_node(self) -> AstNode:
-        """Transforma un token WORD a un WordNode del AST
+        """Transforma un token WORD a un WordNode del AST, un token
+        WILDCARD a un WildcardNode o un token FUZZY a un FuzzyNode
 
         Returns:
             WordNode: Un nodo del AST que representa una palabra a buscar
         """
-        if self.cur_token.type != WORD:
+        if self.cur_token.type == WILDCARD:
+            node: AstNode = WildcardNode(
+                self.cur_token.value, self.max_expansions
+            )
+        elif self.cur_token.type == FUZZY:
+            node = FuzzyNode(self.cur_token.value[1:], self.max_expansions)
+        elif self.cur_token.type == WORD:
+            node = WordNode(self.cur_token.value)
+        else:
             raise InvalidQueryException(
                 f"Expected WORD, got {self.cur_token.value}"
             )
 
-        node = WordNode(self.cur_token.value)
         self._next_token()
 
         return node
@@ -52,7 +81,7 @@ class Parser:
         self._next_token()
         if self.cur_token == LParenToken:
             return NotNode(self._parse_nested_query())
-        if self.cur_token.type == WORD:
+        if self.cur_token.type in _term_types:
             return NotNode(self._parse_word_node())
 
         raise InvalidQueryException(
@@ -101,7 +130,7 @@ class Parser:
 
         if self.cur_token == NotToken:
             right = self._parse_not_node()
-        elif self.cur_token.type == WORD:
+        elif self.cur_token.type in _term_types:
             right = self._parse_word_node()
         elif self.cur_token == LParenToken:
             right = self._parse_nested_query()
@@ -129,7 +158,7 @@ class Parser:
         if left is None:
             if self.cur_token == NotToken:
                 return self._parse_not_node()
-            elif self.cur_token.type == WORD:
+            elif self.cur_token.type in _term_types:
                 return self._parse_word_node()
             elif self.cur_token == LParenToken:
                 return self._parse_nested_query()
@@ -164,3 +193,33 @@ class Parser:
             raise InvalidQueryException("Empty query")
 
         return tree
+
+
+def parse_query(query: str, max_expansions: int = MAX_EXPANSIONS) -> AstNode:
+    """Transforma una query en su AST, reutilizando el de las queries ya
+    vistas. La caché es LRU y usa como clave la query normalizada, de modo
+    que las queries que solo difieren en los espacios comparten AST.
+
+    Los nodos del AST no guardan ningún estado al evaluarse. Cada evaluación
+    devuelve sus documentos y términos en un `Evaluation` nuevo, así que el
+    mismo AST se puede evaluar varias veces, incluso sobre índices
+    distintos.
+
+    Args:
+        query (str): query a transformar
+        max_expansions (int): máximo de términos de cada comodín
+    Returns:
+        AstNode: El AST equivalente a la query.
+    """
+    return _parse_normalized(normalize(query), max_expansions)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _parse_normalized(query: str, max_expansions: int) -> AstNode:
+    return Parser(query, max_expansions).parse()
+
+
+def query_cache_info() -> Tuple[int, int]:
+    """Devuelve los aciertos y fallos acumulados de la caché de queries"""
+    info = _parse_normalized.cache_info()
+    return info.hits, info.misses
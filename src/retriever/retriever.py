@@ -1,13 +1,34 @@
 import math
-import pickle as pkl
 from argparse import Namespace
+from collections import OrderedDict
 from dataclasses import dataclass
 from time import time
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
 
-from ..indexer.indexer import Document, Index  # type: ignore
+from ..indexer.index import Document, Index  # type: ignore
+from ..instrumentation.metrics import metrics  # type: ignore
 from .ast import AstNode
-from .parser import Parser
+from .parser import parse_query, query_cache_info
+
+if TYPE_CHECKING:
+    # numpy solo hace falta al puntuar con BM25, se importa bajo demanda para
+    # no pagar su carga en cada proceso que resuelve una query por coseno.
+    import numpy as np
+
+# Buckets del histograma de documentos que cumplen cada query
+MATCH_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Documentos del primer bloque que se puntúa al ordenar con parada
+# temprana. Cada bloque siguiente es cuatro veces más grande.
+BLOCK_SIZE = 1024
+
+# Términos a partir de los cuales no compensa puntuar por bloques, como en
+# los comodines con muchas expansiones
+MAX_BLOCK_TERMS = 8
+
+# Posting lists que se mantienen en la caché de `term_impacts`. Cada una
+# ocupa unos 24 bytes, así que la caché no pasa de unos 24 MB.
+IMPACTS_CACHE_POSTINGS = 1 << 20
 
 
 @dataclass
@@ -28,6 +49,15 @@ class Retriever:
     def __init__(self, args: Namespace):
         self.args = args
         self.index = self.load_index()
+        # Posting lists y puntuaciones BM25 como arrays de numpy, se
+        # construyen bajo demanda la primera vez que se puntúa cada término.
+        # Ver `term_impacts`.
+        self.impacts: OrderedDict[
+            str, Tuple[np.ndarray, np.ndarray, np.ndarray]
+        ] = OrderedDict()
+        self.impacts_postings = 0
+        self.bm25_norm: np.ndarray | None = None
+        self.static: np.ndarray | None = None
 
     def search_query(self, query: AstNode) -> List[Result]:
         """Método para resolver una query.
@@ -49,18 +79,262 @@ class Retriever:
         Returns:
             List[Result]: lista de resultados que cumplen la consulta
         """
-        terms = query.get_words()
+        # Los términos salen de la evaluación, los comodines solo conocen
+        # los términos en los que se expanden al evaluarlos.
+        metrics.incr("retriever.queries")
+        with metrics.stage("retriever.eval"):
+            evaluation = query.eval(self.index)
+        docs, terms = evaluation.docs, evaluation.terms
+        metrics.observe("retriever.matches", len(docs), MATCH_BUCKETS)
+
+        with metrics.stage("retriever.score"):
+            if self.args.ranking == "bm25":
+                if self.args.parada_temprana and self.index.static_order:
+                    return self.rank_bm25_static(terms, docs)
+                return self.rank_bm25(terms, docs)
+
+            res = [self.int_to_result(index, terms) for index in docs]
+            res.sort(key=lambda x: x.score, reverse=True)
+
+            return res[: self.args.max_resultados]
+
+    def rank_bm25(self, terms: List[str], docs: Sequence[int]) -> List[Result]:
+        """Ordena los documentos que cumplen una query según BM25.
+
+        Las puntuaciones de todos los documentos se acumulan de forma
+        vectorizada recorriendo la posting list de cada término, usando las
+        estadísticas precalculadas por el indexador.
+
+        Args:
+            terms (List[str]): términos de la query
+            docs (Sequence[int]): ids de los documentos que cumplen la query
+        Returns:
+            List[Result]: los `max_resultados` mejores resultados
+        """
+        import numpy as np
 
-        res = [
-            self.int_to_result(index, terms) for index in query.eval(self.index)
+        scores = self.bm25(terms)
+        if self.index.static_rank:
+            scores *= self.static_boost()
+        candidates = np.fromiter(docs, dtype=np.int64)
+        k = self.args.max_resultados
+        if len(candidates) > k:
+            top = np.argpartition(-scores[candidates], k)[:k]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        res = []
+        for doc_id in candidates:
+            doc = self.index.documents[doc_id]
+            res.append(
+                Result(
+                    url=doc.url,
+                    snippet=doc.snippet,
+                    score=float(scores[doc_id]),
+                )
+            )
+        return res
+
+    def rank_bm25_static(
+        self, terms: List[str], docs: Sequence[int]
+    ) -> List[Result]:
+        """Ordena según BM25 y la puntuación estática los documentos que
+        cumplen una query, en un índice con los documentos numerados de
+        mayor a menor puntuación estática.
+
+        Los documentos se puntúan por bloques en orden de id. La puntuación
+        BM25 de los documentos que quedan está acotada por la suma de lo
+        máximo que aporta cada término a los documentos de su posting list
+        a partir del siguiente, y su puntuación estática, por la del
+        siguiente. En cuanto el peor de los `max_resultados` mejores supera
+        esa cota, el resto de documentos ya no puede entrar y se deja de
+        puntuar.
+
+        Args:
+            terms (List[str]): términos de la query
+            docs (Sequence[int]): ids de los documentos que cumplen la query
+        Returns:
+            List[Result]: los `max_resultados` mejores resultados
+        """
+        import numpy as np
+
+        k = self.args.max_resultados
+        if k == 0:
+            return []
+        size = max(BLOCK_SIZE, 2 * k)
+        terms = [term for term in set(terms) if term in self.index.postings]
+        if len(docs) <= size or len(terms) > MAX_BLOCK_TERMS:
+            return self.rank_bm25(terms, docs)
+
+        # AND y NOT operan con conjuntos y no garantizan el orden
+        candidates = np.sort(np.fromiter(docs, dtype=np.int64, count=len(docs)))
+        boost = self.static_boost()
+        scores = np.zeros(len(self.index.documents))
+
+        top = np.zeros(0, dtype=np.int64)
+        top_scores = np.zeros(0)
+        start = 0
+        while start < len(candidates):
+            # Cada término aporta a los documentos del bloque los de su
+            # posting list entre el primero y el último del bloque
+            first = candidates[start]
+            ranges = []
+            bound = 0.0
+            for term in terms:
+                postings, impacts, bounds = self.term_impacts(term)
+                lo = np.searchsorted(postings, first)
+                ranges.append((postings, impacts, lo))
+                bound += bounds[lo]
+            if len(top) == k and top_scores.min() >= bound * boost[first]:
+                metrics.incr("retriever.early_stops")
+                break
+
+            block = candidates[start : start + size]
+            last = block[-1]
+            for postings, impacts, lo in ranges:
+                hi = np.searchsorted(postings, last, side="right")
+                scores[postings[lo:hi]] += impacts[lo:hi]
+
+            top = np.concatenate((top, block))
+            top_scores = np.concatenate(
+                (top_scores, scores[block] * boost[block])
+            )
+            if len(top) > k:
+                best = np.argpartition(-top_scores, k)[:k]
+                top = top[best]
+                top_scores = top_scores[best]
+            start += size
+            size *= 4
+        metrics.observe(
+            "retriever.scored", min(start, len(candidates)), MATCH_BUCKETS
+        )
+
+        order = np.lexsort((top, -top_scores))
+        return [
+            Result(
+                url=self.index.documents[doc_id].url,
+                snippet=self.index.documents[doc_id].snippet,
+                score=float(score),
+            )
+            for doc_id, score in zip(top[order], top_scores[order])
         ]
-        res.sort(key=lambda x: x.score, reverse=True)
 
-        return res[: self.args.max_resultados]
+    def bm25(self, terms: List[str]) -> "np.ndarray":
+        """Calcula la puntuación BM25 de todos los documentos del índice.
+
+        Args:
+            terms (List[str]): términos de la query
+        Returns:
+            np.ndarray: puntuación de cada documento, indexada por id
+        """
+        import numpy as np
+
+        scores = np.zeros(len(self.index.documents))
+        for term in set(terms):
+            if term not in self.index.postings:
+                continue
+
+            postings, impacts, _ = self.term_impacts(term)
+            scores[postings] += impacts
+        return scores
+
+    def term_impacts(
+        self, term: str
+    ) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Devuelve la posting list de un término como array de numpy, lo
+        que aporta el término a la puntuación BM25 de cada documento de la
+        lista y, para cada posición de la lista, lo máximo que aporta desde
+        esa posición hasta el final. Esta última tiene una posición más, con
+        0, para el final de la lista.
+
+        Se cachean para siguientes consultas los de los términos usados más
+        recientemente, hasta sumar `IMPACTS_CACHE_POSTINGS` documentos.
+        """
+        import numpy as np
+
+        res = self.impacts.get(term)
+        if res is not None:
+            self.impacts.move_to_end(term)
+            return res
+
+        if self.bm25_norm is None:
+            lengths = np.asarray(self.index.doc_lengths, dtype=np.float64)
+            avg_length = self.index.avg_length or 1.0
+            self.bm25_norm = self.args.k1 * (
+                1 - self.args.b + self.args.b * lengths / avg_length
+            )
+
+        postings = np.asarray(self.index.postings[term], dtype=np.int64)
+        tf = np.asarray(self.index.frequencies[term], dtype=np.float64)
+        impacts = (
+            self.index.idf[term]
+            * tf
+            * (self.args.k1 + 1)
+            / (tf + self.bm25_norm[postings])
+        )
+        bounds = np.zeros(len(impacts) + 1)
+        bounds[:-1] = np.maximum.accumulate(impacts[::-1])[::-1]
+        res = (postings, impacts, bounds)
+
+        if len(postings) <= IMPACTS_CACHE_POSTINGS:
+            self.impacts[term] = res
+            self.impacts_postings += len(postings)
+            while self.impacts_postings > IMPACTS_CACHE_POSTINGS:
+                _, (evicted, _, _) = self.impacts.popitem(last=False)
+                self.impacts_postings -= len(evicted)
+        return res
+
+    def static_boost(self) -> "np.ndarray":
+        """Devuelve el factor por el que se multiplica la puntuación de cada
+        documento, 1 + peso_estatico * puntuación estática."""
+        import numpy as np
+
+        if self.static is None:
+            self.static = 1 + self.args.peso_estatico * np.asarray(
+                self.index.static_rank, dtype=np.float64
+            )
+        return self.static
+
+    def suggest(self, query: AstNode) -> Dict[str, str]:
+        """Método para el modo "quizás quisiste decir". Para cada término de
+        la query que no aparece en el índice busca el término más parecido.
+        Si el índice está analizado, se sugiere la palabra más frecuente que
+        se reduce a ese término y no el término en sí.
+
+        Args:
+            query (AstNode): consulta
+        Returns:
+            Dict[str, str]: diccionario de palabra desconocida a sugerencia
+        """
+        res = {}
+        for word in query.get_words():
+            term = self.index.analyze(word)
+            if self.index.doc_freq(term):
+                continue
+
+            candidates = self.index.fuzzy(term, 1)
+            if candidates:
+                res[word] = self.index.surface(candidates[0])
+        return res
+
+    def complete(self, prefix: str) -> List[Tuple[str, int]]:
+        """Método para autocompletar un término a medio escribir con los
+        términos del índice que aparecen en más documentos.
+
+        Args:
+            prefix (str): comienzo del término
+        Returns:
+            List[Tuple[str, int]]: hasta `args.max_completions` términos y
+                su número de documentos, de más a menos documentos
+        """
+        with metrics.stage("retriever.complete"):
+            return self.index.complete(prefix, self.args.max_completions)
 
     def int_to_result(self, index: int, terms: List[str]) -> Result:
         res = self.index.documents[index]
         score = self.score(terms, res)
+        if self.index.static_rank:
+            score *= 1 + self.args.peso_estatico * self.index.static_rank[index]
         return Result(url=res.url, snippet=res.snippet, score=score)
 
     def search_from_file(self, fname: str) -> Dict[str, List[Result]]:
@@ -77,23 +351,29 @@ class Retriever:
         with open(fname, "r") as fr:
             ts = time()
 
-            # Las siguientes dos líneas son para dejar feliz a los linters,
-            # eliminarlas al implementar la versión final del código.
             n_queries = 0
-
             for query in fr.readlines():
-                parser = Parser(query)
-                ast = parser.parse()
+                with metrics.stage("retriever.parse"):
+                    ast = parse_query(query, self.args.max_expansiones)
                 resultados[f"{ast}"] = self.search_query(ast)
+                n_queries += 1
 
             te = time()
             print(f"Time to solve {n_queries}: {te - ts}")
+
+        hits, misses = query_cache_info()
+        metrics.gauge("retriever.query_cache.hits", hits)
+        metrics.gauge("retriever.query_cache.misses", misses)
         return resultados
 
     def load_index(self) -> Index:
         """Método para cargar un índice invertido desde disco."""
-        with open(self.args.index_file, "rb") as fr:
-            return pkl.load(fr)
+        with metrics.stage("retriever.load_index"):
+            return Index.load(self.args.index_file)
+
+    def close(self) -> None:
+        """Libera los recursos del retriever. El índice en memoria no
+        necesita liberarse, pero `Coordinator` sí termina sus procesos."""
 
     def score(self, terms: List[str], document: Document) -> float:
         tf = 0
@@ -0,0 +1,44 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .retriever import Retriever
+
+
+def make_server(retriever: Retriever, port: int) -> HTTPServer:
+    """Crea el servidor HTTP del autocompletado para el front end del
+    buscador. Atiende:
+
+    - GET /autocompletar?prefijo=inge: completions del término a medio
+      escribir, como una lista JSON de pares [término, documentos].
+
+    Las peticiones se atienden de una en una en el hilo que llama a
+    `serve_forever`, ya que el retriever no está preparado para usarse desde
+    varios hilos.
+
+    Args:
+        retriever (Retriever): recuperador que resuelve las peticiones
+        port (int): puerto en el que escuchar, 0 para elegir uno libre
+    Returns:
+        HTTPServer: el servidor, sin arrancar
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != "/autocompletar":
+                self.send_error(404)
+                return
+
+            prefix = parse_qs(url.query).get("prefijo", [""])[0]
+            body = json.dumps(retriever.complete(prefix)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return HTTPServer(("127.0.0.1", port), Handler)
@@ -0,0 +1,11 @@
+import pytest
+
+from src.benchmark.corpus import Corpus
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory) -> str:
+    """Corpus sintético pequeño, con el formato del crawler"""
+    folder = str(tmp_path_factory.mktemp("corpus"))
+    Corpus(n_stems=500, seed=0).write(folder, 120, words_per_doc=80)
+    return folder
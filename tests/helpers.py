@@ -0,0 +1,46 @@
+import os
+from argparse import Namespace
+
+from src.indexer.indexer import Indexer
+
+
+def indexer_args(input_folder: str, output_name: str, **kwargs) -> Namespace:
+    """Argumentos por defecto del indexador, como los de su app"""
+    args = Namespace(
+        input_folder=input_folder,
+        output_name=output_name,
+        distancia_edicion=2,
+        shards=1,
+        memoria=0,
+        sin_acentos=False,
+        stemming=False,
+        distancia_duplicados=-1,
+        orden_estatico=False,
+    )
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+
+def crawler_args(url: str, output_folder: str, **kwargs) -> Namespace:
+    """Argumentos del crawler, como los de su app pero con un presupuesto
+    de webs y unas peticiones concurrentes pequeños"""
+    args = Namespace(
+        url=url,
+        max_webs=10,
+        output_folder=output_folder,
+        jobs=3,
+        distancia_duplicados=-1,
+        tamano_maximo=20,
+        workers=1,
+        metrics=None,
+    )
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    return args
+
+
+def build(input_folder: str, output_name: str, **kwargs) -> str:
+    """Construye un índice y devuelve la ruta de su fichero"""
+    Indexer(indexer_args(input_folder, output_name, **kwargs)).build_index()
+    return os.path.join(output_name, "index")
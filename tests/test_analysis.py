@@ -0,0 +1,56 @@
+import pytest
+from helpers import build
+
+from src.benchmark.querying import retriever_args
+from src.indexer.index import Index
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+
+@pytest.fixture(scope="module")
+def stemmed(corpus, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("stemming")
+    return build(corpus, str(folder), stemming=True)
+
+
+def test_prefix_wildcard_finds_shorter_stems(stemmed):
+    index = Index.load(stemmed)
+    # Palabras indexadas con una raíz más corta que ellas
+    forms = [(t, w) for t, w in index.forms.items() if len(w) > len(t) + 1]
+    assert forms
+
+    for term, word in forms[:50]:
+        assert term in index.expand(index.fold(word + "*"), 64)
+        assert term in index.expand(index.fold(word[:-1] + "*"), 64)
+
+
+def test_prefix_wildcard_matches_stems_of_words(stemmed):
+    index = Index.load(stemmed)
+
+    def stem(word):
+        return index.analyze(index.spellings.get(word, word))
+
+    # Prefijos de las palabras, incluidos los que son más largos que alguna
+    # raíz corta que no tiene nada que ver, e.g., "de" para "denuncia*"
+    prefixes = {w[:i] for w in index.words[::10] for i in range(2, len(w) + 1)}
+    shorter = 0
+    for prefix in sorted(prefixes):
+        expected = {stem(w) for w in index.words if w.startswith(prefix)}
+        expected.update(t for t in index.terms if t.startswith(prefix))
+        res = index.expand(prefix + "*", 10000)
+        assert res == sorted(expected), prefix
+        shorter += any(len(t) < len(prefix) for t in res)
+    assert shorter
+
+
+def test_suggestions_are_surface_words(stemmed):
+    retriever = Retriever(retriever_args(stemmed))
+    index = retriever.index
+    words = sorted(w for t, w in index.forms.items() if t != w and len(t) > 5)
+    # Intercambia dos letras de la raíz de cada palabra
+    typos = [w[:2] + w[3] + w[2] + w[4:] for w in words[:20]]
+
+    suggestions = retriever.suggest(parse_query(" OR ".join(typos)))
+    assert suggestions
+    for suggestion in suggestions.values():
+        assert index.surface(index.analyze(suggestion)) == suggestion
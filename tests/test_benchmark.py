@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from src.benchmark import report
+from src.benchmark.indexing import measure
+
+
+def test_measure_returns_value():
+    res = measure(len, "abc")
+    assert res["value"] == 3
+    assert res["peak_rss"] > 0
+
+
+@pytest.mark.parametrize(
+    "fn, args", [(int, ("x",)), (os._exit, (3,))], ids=["excepcion", "salida"]
+)
+def test_measure_raises_if_the_process_dies(fn, args):
+    with pytest.raises(RuntimeError, match="sin resultado"):
+        measure(fn, *args)
+
+
+def result(benchmark, params, **metrics):
+    return {"benchmark": benchmark, "params": params, "metrics": metrics}
+
+
+def test_compare_finds_regressions(tmp_path):
+    baseline = [
+        result("indexado", {"docs": 1000}, time=1.0, docs_per_sec=1000.0),
+        result("consultas", {"mix": "simple"}, p99=0.01, qps=500.0),
+    ]
+    fname = str(tmp_path / "baseline.json")
+    report.save(baseline, fname)
+    assert report.load(fname) == baseline
+
+    results = [
+        # Dentro de la tolerancia
+        result("indexado", {"docs": 1000}, time=1.05, docs_per_sec=960.0),
+        # Más lento y con menos consultas por segundo
+        result("consultas", {"mix": "simple"}, p99=0.02, qps=400.0),
+        # Sin medición de referencia
+        result("consultas", {"mix": "profunda"}, p99=1.0, qps=1.0),
+    ]
+    regressions = report.compare(results, report.load(fname), 0.1)
+    assert len(regressions) == 2
+    assert all(r.startswith("consultas {'mix': 'simple'}") for r in regressions)
+    assert report.compare(results, baseline, 1.0) == []
+
+
+def test_check_budgets():
+    res = result("arranque", {}, import_time=0.12, cold_query=0.8)
+    budgets = {"import_time": 0.1, "cold_query": 1.0}
+    assert report.check_budgets(res, budgets) == [
+        "arranque {} import_time: 0.12 > 0.1"
+    ]
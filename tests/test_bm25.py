@@ -0,0 +1,92 @@
+import math
+from collections import Counter
+
+import pytest
+from helpers import build
+
+from src.benchmark.querying import retriever_args
+from src.indexer.index import Index
+from src.retriever import retriever as retriever_module
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+QUERIES = ("caeros", "caeros OR gaera", "ni* OR sibra* OR trecu", "ca*")
+
+
+def brute_force(index, terms, k1, b):
+    """Puntuación BM25 de cada documento con algún término de `terms`,
+    contando las frecuencias en el texto de los documentos"""
+    counts = [Counter(doc.text.split()) for doc in index.documents]
+    avg_length = sum(sum(c.values()) for c in counts) / len(counts)
+    scores = {}
+    for doc, count in zip(index.documents, counts):
+        length = sum(count.values())
+        score = 0.0
+        for term in set(terms):
+            df = sum(term in c for c in counts)
+            tf = count[term]
+            if not tf:
+                continue
+            idf = math.log(1 + (len(counts) - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * length / avg_length)
+            score += idf * tf * (k1 + 1) / (tf + norm)
+        if score:
+            scores[doc.url] = score
+    return scores
+
+
+@pytest.fixture(scope="module")
+def index_file(corpus, tmp_path_factory):
+    return build(corpus, str(tmp_path_factory.mktemp("bm25")))
+
+
+@pytest.mark.parametrize("k1, b", [(1.2, 0.75), (2.0, 0.3)])
+@pytest.mark.parametrize("query", QUERIES)
+def test_bm25_matches_brute_force(index_file, query, k1, b):
+    index = Index.load(index_file)
+    retriever = Retriever(
+        retriever_args(
+            index_file, ranking="bm25", max_resultados=1000, k1=k1, b=b
+        )
+    )
+
+    evaluation = parse_query(query).resolve(index).eval(index)
+    expected = brute_force(index, evaluation.terms, k1, b)
+    res = retriever.search_query(parse_query(query))
+
+    assert expected
+    assert {r.url: r.score for r in res} == pytest.approx(expected)
+    assert [r.score for r in res] == pytest.approx(
+        sorted(expected.values(), reverse=True)
+    )
+
+
+def test_bm25_keeps_the_best_results(index_file):
+    args = dict(ranking="bm25", max_resultados=1000)
+    retriever = Retriever(retriever_args(index_file, **args))
+    top = Retriever(retriever_args(index_file, **dict(args, max_resultados=5)))
+
+    for query in QUERIES:
+        expected = retriever.search_query(parse_query(query))[:5]
+        res = top.search_query(parse_query(query))
+        # Con empates, cualquiera de los documentos empatados vale
+        assert [r.score for r in res] == [r.score for r in expected]
+
+
+def test_impacts_cache_is_bounded(index_file, monkeypatch):
+    args = dict(ranking="bm25", max_resultados=1000)
+    retriever = Retriever(retriever_args(index_file, **args))
+    expected = [retriever.search_query(parse_query(q)) for q in QUERIES]
+
+    monkeypatch.setattr(retriever_module, "IMPACTS_CACHE_POSTINGS", 50)
+    retriever = Retriever(retriever_args(index_file, **args))
+    for _ in range(2):
+        for query, results in zip(QUERIES, expected):
+            res = retriever.search_query(parse_query(query))
+            assert [r.score for r in res] == pytest.approx(
+                [r.score for r in results]
+            )
+            assert retriever.impacts_postings == sum(
+                len(postings) for postings, _, _ in retriever.impacts.values()
+            )
+            assert 0 < retriever.impacts_postings <= 50
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+from helpers import build
+
+from src.benchmark.querying import retriever_args
+from src.indexer import index as index_module
+from src.indexer.index import Index
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_retriever_app_imports_no_heavy_modules():
+    heavy = ("numpy", "nltk", "bs4", "pypdf", "requests", "multiprocessing")
+    code = (
+        "import sys, src.retriever.app;"
+        f"print(','.join(m for m in {heavy!r} if m in sys.modules))"
+    )
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert res.stdout.strip() == ""
+
+
+def test_deletes_are_loaded_on_first_fuzzy_search(corpus, tmp_path):
+    index_file = build(corpus, str(tmp_path / "nuevo"))
+    index = Index.load(index_file)
+    assert index.deletes == {}
+    assert index.deletes_file == index_file + index_module.DELETES_SUFFIX
+
+    # Un índice antiguo, con el índice de borrados en el propio fichero
+    old = Index.load(index_file)
+    old.fuzzy("caeros", 10)
+    old_file = str(tmp_path / "antiguo")
+    index_module._dump(old, old_file, False)
+    assert Index.load(old_file).deletes == old.deletes
+
+    for term in ("caerso", "gaeras", "trceu", "xyzzy"):
+        assert index.fuzzy(term, 10) == old.fuzzy(term, 10)
+    assert index.deletes_file == ""
+
+    args = dict(max_resultados=1000)
+    retriever = Retriever(retriever_args(index_file, **args))
+    expected = Retriever(retriever_args(old_file, **args))
+    for query in ("~caerso", "~gaeras OR trecu"):
+        res = retriever.search_query(parse_query(query))
+        assert res
+        assert res == expected.search_query(parse_query(query))
@@ -0,0 +1,100 @@
+import json
+import os
+import random
+from collections import Counter
+
+import pytest
+from helpers import build, indexer_args
+
+from src.benchmark.querying import retriever_args
+from src.indexer.analysis import fold_accents
+from src.indexer.completion import completion_index
+from src.indexer.index import Index
+from src.indexer.indexer import Indexer
+from src.retriever.coordinator import Coordinator
+from src.retriever.retriever import Retriever
+
+
+def brute_force(words, prefix, limit):
+    """Completions recorriendo todo el vocabulario `words`, que mapea cada
+    palabra a su número de documentos y su forma a mostrar"""
+    matches = [
+        (-n_docs, word, name)
+        for word, (n_docs, name) in words.items()
+        if word.startswith(prefix)
+    ]
+    return [(name, -n_docs) for n_docs, _, name in sorted(matches)[:limit]]
+
+
+def prefixes(words):
+    rng = random.Random(0)
+    sample = rng.sample(sorted(words), 100)
+    return [""] + [w[:i] for w in sample for i in range(1, len(w) + 1)]
+
+
+@pytest.fixture(scope="module")
+def plain(corpus, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("completion")
+    return {
+        "memoria": build(corpus, str(folder / "memoria")),
+        "externo": build(corpus, str(folder / "externo"), memoria=1),
+        "shards": build(corpus, str(folder / "shards"), shards=3),
+    }
+
+
+@pytest.mark.parametrize("variant", ["memoria", "externo", "shards"])
+def test_completions_match_vocabulary_scan(plain, variant):
+    index = Index.load(plain["memoria"])
+    words = {t: (len(index.postings[t]), t) for t in index.terms}
+
+    shards = 3 if variant == "shards" else 1
+    args = retriever_args(plain[variant], shards=shards, max_completions=7)
+    retriever = Coordinator(args) if shards > 1 else Retriever(args)
+    try:
+        for prefix in prefixes(words):
+            assert retriever.complete(prefix) == brute_force(words, prefix, 7)
+    finally:
+        retriever.close()
+
+
+def test_precomputed_completions_match_vocabulary_scan():
+    rng = random.Random(0)
+    terms = sorted({"".join(rng.choices("abc", k=6)) for _ in range(300)})
+    df = [rng.randint(1, 20) for _ in terms]
+    words = {t: (n, t) for t, n in zip(terms, df)}
+
+    completions = completion_index(terms, df, size=5, scan_limit=4)
+    assert completions
+    for prefix, ids in completions.items():
+        expected = brute_force(words, prefix, 5)
+        assert [(terms[i], df[i]) for i in ids] == expected
+
+
+def test_stemmed_completions_are_words(corpus, tmp_path):
+    index = Index.load(build(corpus, str(tmp_path), stemming=True))
+
+    # Vocabulario sin stemming, contado directamente de las páginas
+    indexer = Indexer(indexer_args(corpus, str(tmp_path)))
+    folded: Counter = Counter()
+    spellings: Counter = Counter()
+    for curr, _, files in os.walk(corpus):
+        for file in files:
+            with open(os.path.join(curr, file)) as fr:
+                text = indexer.parse(json.load(fr)["text"])
+            text = indexer.remove_punctuation(
+                indexer.remove_split_symbols(text)
+            )
+            distinct = set(indexer.remove_stopwords(indexer.tokenize(text)))
+            folded.update({fold_accents(word) for word in distinct})
+            spellings.update(distinct)
+    names = {}
+    for word, n_docs in sorted(spellings.items(), key=lambda x: (-x[1], x[0])):
+        names.setdefault(fold_accents(word), word)
+    words = {word: (n_docs, names[word]) for word, n_docs in folded.items()}
+
+    for prefix in prefixes(words):
+        assert index.complete(prefix, 7) == brute_force(words, prefix, 7)
+
+    # Una palabra completa más larga que su raíz se completa a sí misma
+    word = next(w for w in sorted(words) if len(index.analyze(w)) < len(w))
+    assert word in [name for name, _ in index.complete(word, 7)]
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+import pytest
+from helpers import crawler_args
+
+from src.crawler.crawler import Crawler
+from src.crawler.streaming import PageWriter
+
+URL = "https://universidadeuropea.com"
+
+
+class FakeCrawler(Crawler):
+    """Crawler que no hace peticiones. La URL base enlaza a `links`, la
+    página "rota" falla y la "lenta" tarda en descargarse."""
+
+    links = ("a", "b", "rota")
+
+    def download(self, url: str) -> dict:
+        if url.endswith("/rota"):
+            # Las demás páginas del lote terminan antes
+            time.sleep(0.2)
+            raise ConnectionError(url)
+        if url.endswith("/lenta"):
+            time.sleep(0.5)
+
+        writer = PageWriter(self.page_path(url), url, "html")
+        writer.write("texto")
+        links = (
+            {f"{URL}/{link}" for link in self.links} if url == URL else set()
+        )
+        writer.close(links)
+        return {
+            "url": url,
+            "status_code": 200,
+            "crawled_urls": links,
+            "fingerprint": None,
+            "writer": writer,
+        }
+
+
+def stored(folder) -> list:
+    return sorted(
+        os.path.relpath(os.path.join(curr, file), folder)
+        for curr, _, files in os.walk(folder)
+        for file in files
+    )
+
+
+def test_failed_task_discards_finished_pages(tmp_path):
+    crawler = FakeCrawler(crawler_args(URL, str(tmp_path)))
+    with pytest.raises(ExceptionGroup):
+        asyncio.run(crawler.crawl())
+
+    # Solo queda la página base, guardada en el lote anterior
+    assert stored(tmp_path) == ["universidadeuropea.com/content.json"]
+
+
+def test_cancelled_crawl_discards_pages_being_downloaded(tmp_path):
+    crawler = FakeCrawler(crawler_args(URL, str(tmp_path)))
+    crawler.links = ("a", "lenta")
+
+    async def cancel():
+        await asyncio.wait_for(crawler.crawl(), timeout=0.3)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(cancel())
+
+    # "a" es del mismo lote que "lenta", así que tampoco se guarda
+    assert stored(tmp_path) == ["universidadeuropea.com/content.json"]
+
+
+def test_discard_after_commit(tmp_path):
+    writer = PageWriter(str(tmp_path / "content.json"), URL, "html")
+    writer.commit()
+    writer.discard()
+    writer.discard()
+
+    assert stored(tmp_path) == ["content.json"]
@@ -0,0 +1,116 @@
+import json
+import os
+import random
+import re
+
+import pytest
+
+from src.benchmark.crawling import crawl
+from src.benchmark.site import SiteServer
+from src.crawler.streaming import LinkParser
+from src.indexer.duplicates import (
+    DUPLICATES_FILE,
+    FINGERPRINT_BITS,
+    SimHashIndex,
+    simhash,
+    words,
+)
+
+
+def brute_force(fingerprints, fingerprint, max_distance):
+    """Claves de las huellas a distancia no mayor que `max_distance`"""
+    return {
+        key
+        for other, key in fingerprints
+        if (fingerprint ^ other).bit_count() <= max_distance
+    }
+
+
+def flip(rng, fingerprint, n_bits):
+    for bit in rng.sample(range(FINGERPRINT_BITS), n_bits):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6])
+def test_banding_matches_hamming_scan(max_distance):
+    rng = random.Random(max_distance)
+    fingerprints = [(rng.getrandbits(FINGERPRINT_BITS), i) for i in range(500)]
+    index = SimHashIndex(max_distance)
+    for fingerprint, key in fingerprints:
+        index.add(fingerprint, key)
+
+    # Huellas a distancias alrededor de `max_distance` de alguna indexada
+    queries = [
+        flip(rng, rng.choice(fingerprints)[0], rng.randint(0, 2 * max_distance))
+        for _ in range(2000)
+    ] + [rng.getrandbits(FINGERPRINT_BITS) for _ in range(200)]
+
+    found = 0
+    for fingerprint in queries:
+        expected = brute_force(fingerprints, fingerprint, max_distance)
+        key = index.find(fingerprint)
+        if expected:
+            assert key in expected
+            found += 1
+        else:
+            assert key is None
+    assert 0 < found < len(queries)
+
+
+def test_simhash_of_near_duplicates_is_close():
+    rng = random.Random(0)
+    vocabulary = [f"palabra{i}" for i in range(2000)]
+    text = rng.choices(vocabulary, k=400)
+    variant = text[:-2] + ["página", "2"]
+    other = rng.choices(vocabulary, k=400)
+
+    distance = (simhash(text) ^ simhash(variant)).bit_count()
+    assert distance <= 3
+    assert (simhash(text) ^ simhash(other)).bit_count() > 3 * distance + 10
+    assert simhash([]) is None
+
+
+def test_link_parser_keeps_main_content_words():
+    html = (
+        "<html><head><title>Título</title><style>p {}</style></head><body>"
+        "<nav>Menú común</nav>"
+        '<div class="page wide"><h1>Grado</h1><div><p>Texto anidado</p>'
+        "</div><script>var x = 1;</script><p>Fin del bloque</p></div>"
+        "<footer>Pie común</footer></body></html>"
+    )
+    url = "https://universidadeuropea.com"
+    url_regex = re.compile(f"^{re.escape(url)}")
+    pdf_regex = re.compile(r"^\/.*\.pdf$")
+
+    # El resultado no depende de cómo llegan los fragmentos
+    for size in (len(html), 7, 1):
+        parser = LinkParser(url, url_regex, pdf_regex, keep_words=True)
+        for i in range(0, len(html), size):
+            parser.feed(html[i : i + size])
+        parser.close()
+        assert parser.words == words("Grado Texto anidado Fin del bloque")
+
+
+def test_crawler_skips_variants(tmp_path):
+    n_pages = 15
+    with SiteServer(n_pages, 0, n_variants=3) as server:
+        crawl(server.url, n_pages * 4 + 1, str(tmp_path), 4, 3)
+
+    # Cada cadena de variantes termina en un casi duplicado de una página
+    # anterior de la misma cadena, cuyos enlaces ya no se siguen
+    with open(tmp_path / DUPLICATES_FILE) as fr:
+        records = [json.loads(line) for line in fr]
+    chains = [record["url"].split("?")[0] for record in records]
+    assert sorted(chains) == sorted(
+        f"{server.url}/pagina/{i}" for i in range(n_pages)
+    )
+    for record, chain in zip(records, chains):
+        assert "?orden=" in record["url"]
+        assert record["duplicate_of"].split("?")[0] == chain
+    assert server.served < n_pages * 4 + 1
+    assert not any(
+        file.endswith(".part")
+        for _, _, files in os.walk(tmp_path)
+        for file in files
+    )
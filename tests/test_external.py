@@ -0,0 +1,79 @@
+import os
+from dataclasses import fields
+from typing import List
+
+import pytest
+from helpers import build
+
+from src.indexer import indexer as indexer_module
+from src.indexer.index import DELETES_SUFFIX, Index, _load
+from src.indexer.spimi import SpimiBuilder
+
+# Campos que la construcción externa escribe sin memo de Pickle o en otro
+# orden, que se comparan aparte
+COMPARED_APART = ("deletes", "deletes_file", "completions")
+
+
+class SmallBuilder(SpimiBuilder):
+    """Constructor externo con un presupuesto de 16 KB, para que el corpus
+    de prueba ocupe varios bloques. Cuenta los bloques que vuelca."""
+
+    created: List["SmallBuilder"] = []
+
+    def __init__(self, budget: int, tmp_dir: str):
+        super().__init__(1 << 14, tmp_dir)
+        self.n_runs = 0
+        self.created.append(self)
+
+    def flush(self) -> None:
+        self.n_runs += bool(self.postings)
+        super().flush()
+
+
+@pytest.mark.parametrize("stemming", [False, True], ids=["", "stemming"])
+def test_external_build_matches_in_memory_build(
+    corpus, tmp_path, monkeypatch, stemming
+):
+    monkeypatch.setattr(indexer_module, "SpimiBuilder", SmallBuilder)
+    memory = build(corpus, str(tmp_path / "memoria"), stemming=stemming)
+    external = build(
+        corpus, str(tmp_path / "externo"), stemming=stemming, memoria=1
+    )
+    assert SmallBuilder.created[-1].n_runs > 1
+    expected = Index.load(memory)
+    index = Index.load(external)
+
+    for f in fields(Index):
+        if f.name not in COMPARED_APART:
+            assert getattr(index, f.name) == getattr(expected, f.name), f.name
+    assert index.completions.keys() == expected.completions.keys()
+    for prefix, ids in expected.completions.items():
+        assert list(index.completions[prefix]) == list(ids)
+
+    deletes = _load(expected.deletes_file)
+    assert {k: sorted(v) for k, v in _load(index.deletes_file).items()} == {
+        k: sorted(v) for k, v in deletes.items()
+    }
+
+
+def test_external_build_shares_terms(corpus, tmp_path):
+    index = Index.load(build(corpus, str(tmp_path), memoria=1))
+    keys = {id(term) for term in index.postings}
+    assert all(id(term) in keys for term in index.terms)
+    assert all(id(term) in keys for term in index.frequencies)
+    # El índice de borrados, en su propio fichero, carga una copia de cada
+    # término
+    deletes = _load(index.deletes_file)
+    ids = {id(term) for terms in deletes.values() for term in terms}
+    assert len(ids) == len(index.terms)
+
+
+def test_external_build_does_not_repeat_terms(corpus, tmp_path):
+    def size(index_file):
+        return os.path.getsize(index_file) + os.path.getsize(
+            index_file + DELETES_SUFFIX
+        )
+
+    memory = build(corpus, str(tmp_path / "memoria"))
+    external = build(corpus, str(tmp_path / "externo"), memoria=1)
+    assert size(external) <= 1.05 * size(memory)
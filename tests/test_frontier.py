@@ -0,0 +1,106 @@
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+from helpers import crawler_args
+
+from src.benchmark.crawling import crawl
+from src.benchmark.site import SiteServer
+from src.crawler.coordinator import Coordinator, Worker, owner
+
+N_PAGES = 30
+N_PDFS = 3
+
+
+def pages(folder) -> dict:
+    """Contenido de las páginas almacenadas, por ruta relativa"""
+    res = {}
+    for curr, _, files in os.walk(folder):
+        for file in files:
+            path = os.path.join(curr, file)
+            with open(path) as fr:
+                res[os.path.relpath(path, folder)] = fr.read()
+    return res
+
+
+def test_owner_is_stable_and_balanced():
+    urls = [f"https://universidadeuropea.com/pagina/{i}" for i in range(4000)]
+    code = (
+        "import sys; from src.crawler.coordinator import owner;"
+        "print(' '.join(str(owner(u, 4)) for u in sys.stdin.read().split()))"
+    )
+    # Otro proceso, con otra semilla de `hash`, asigna las mismas URLs
+    res = subprocess.run(
+        [sys.executable, "-c", code],
+        input="\n".join(urls),
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, PYTHONHASHSEED="1"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    owners = [owner(url, 4) for url in urls]
+    assert res.stdout.split() == [str(i) for i in owners]
+
+    counts = Counter(owners)
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert all(abs(n - 1000) < 150 for n in counts.values())
+
+
+@pytest.fixture(scope="module")
+def server():
+    with SiteServer(N_PAGES, N_PDFS) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def single(server, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("single")
+    crawl(server.url, N_PAGES + N_PDFS + 1, str(folder), 4, workers=1)
+    return pages(folder)
+
+
+def test_workers_crawl_the_same_pages(server, single, tmp_path):
+    stored = crawl(
+        server.url, N_PAGES + N_PDFS + 1, str(tmp_path), 4, workers=3
+    )
+
+    assert stored == N_PAGES + N_PDFS + 1
+    assert pages(tmp_path) == single
+
+
+def test_workers_share_the_budget(server, tmp_path):
+    stored = crawl(server.url, 10, str(tmp_path), 4, workers=3)
+    assert stored == 10
+
+
+async def failing_crawl(self, url):
+    raise ConnectionError(url)
+
+
+async def dying_crawl(self, url):
+    os._exit(9)
+
+
+@pytest.mark.parametrize(
+    "crawl_url", [failing_crawl, dying_crawl], ids=["excepcion", "muerte"]
+)
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="los workers solo heredan el parche al crearse con fork",
+)
+def test_failed_worker_stops_the_crawl(
+    server, tmp_path, monkeypatch, crawl_url
+):
+    monkeypatch.setattr(Worker, "_crawl", crawl_url)
+    coordinator = Coordinator(
+        crawler_args(server.url, str(tmp_path), max_webs=N_PAGES, workers=2)
+    )
+
+    with pytest.raises(RuntimeError, match="han fallado"):
+        asyncio.run(asyncio.wait_for(coordinator.crawl(), timeout=30))
+    assert not any(name.endswith(".json") for name in pages(tmp_path))
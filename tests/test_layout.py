@@ -0,0 +1,76 @@
+import os
+import pickle
+from array import array
+
+import pytest
+from helpers import build
+
+from src.benchmark.memory import list_layout
+from src.benchmark.querying import retriever_args
+from src.indexer import index as index_module
+from src.indexer.index import Document, Index
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+
+@pytest.fixture(scope="module")
+def index_file(corpus, tmp_path_factory):
+    return build(corpus, str(tmp_path_factory.mktemp("layout")))
+
+
+def test_index_uses_arrays_and_slots(index_file):
+    index = Index.load(index_file)
+    assert all(type(docs) is array for docs in index.postings.values())
+    assert all(type(fs) is array for fs in index.frequencies.values())
+    assert not hasattr(index.documents[0], "__dict__")
+
+
+@pytest.mark.parametrize("fast", [False, True], ids=["memo", "streaming"])
+def test_arrays_round_trip(tmp_path, fast):
+    data = {
+        "postings": {"a": array("I", [1, 2, 3]), "b": array("I")},
+        "rank": array("d", [0.5, 0.25]),
+        "lists": [[1, 2], (3, 4)],
+    }
+    fname = str(tmp_path / "datos")
+    index_module._dump(data, fname, fast)
+
+    loaded = index_module._load(fname)
+    assert loaded == data
+    assert type(loaded["rank"]) is array and loaded["rank"].typecode == "d"
+
+
+def test_loads_arrays_saved_inside_the_pickle(tmp_path):
+    class OldPickler(pickle.Pickler):
+        """Pickler de los índices anteriores a guardar los arrays aparte"""
+
+        def persistent_id(self, obj):
+            if type(obj) is array:
+                return (obj.typecode, obj.tobytes())
+            return None
+
+    data = {"a": array("I", [1, 2, 3]), "b": array("d", [0.5])}
+    fname = str(tmp_path / "datos")
+    with open(fname, "wb") as fw:
+        OldPickler(fw, pickle.HIGHEST_PROTOCOL).dump(data)
+
+    assert index_module._load(fname) == data
+
+
+def test_list_layout_gives_the_same_results(index_file, tmp_path):
+    list_file = str(tmp_path / "listas" / "index")
+    list_layout(index_file, list_file)
+    assert os.path.exists(list_file)
+
+    index = Index.load(list_file)
+    assert all(type(docs) is list for docs in index.postings.values())
+    assert not isinstance(index.documents[0], Document)
+
+    args = dict(max_resultados=1000)
+    expected = Retriever(retriever_args(index_file, **args))
+    retriever = Retriever(retriever_args(list_file, **args))
+    for ranking in ("coseno", "bm25"):
+        expected.args.ranking = retriever.args.ranking = ranking
+        for query in ("caeros", "ca* OR gaera", "NOT gaera"):
+            res = retriever.search_query(parse_query(query))
+            assert res == expected.search_query(parse_query(query))
@@ -0,0 +1,115 @@
+import pytest
+from helpers import build
+
+from src.benchmark.querying import retriever_args
+from src.instrumentation.metrics import metrics
+from src.retriever.coordinator import Coordinator
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+QUERIES = (
+    "caeros",
+    "ca*",
+    "~caerso OR gaera",
+    "c?i* AND NOT gaera",
+    "ni* OR sibra* OR trecu",
+)
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["", "stemming"])
+def indexes(request, corpus, tmp_path_factory):
+    """El mismo índice completo y particionado en tres shards"""
+    folder = tmp_path_factory.mktemp("sharding")
+    stemming = request.param
+    single = build(corpus, str(folder / "single"), stemming=stemming)
+    sharded = build(
+        corpus, str(folder / "sharded"), stemming=stemming, shards=3
+    )
+    return single, sharded
+
+
+@pytest.fixture(params=["coseno", "bm25"])
+def retrievers(request, indexes):
+    """Un retriever sobre el índice completo y otro sobre sus shards"""
+    single, sharded = indexes
+    args = dict(max_resultados=1000, ranking=request.param)
+    coordinator = Coordinator(retriever_args(sharded, shards=3, **args))
+    yield Retriever(retriever_args(single, **args)), coordinator
+    coordinator.close()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_sharded_results_match_single_index(retrievers, query):
+    retriever, coordinator = retrievers
+
+    expected = retriever.search_query(parse_query(query))
+    res = coordinator.search_query(parse_query(query))
+
+    assert expected
+    assert {r.url: pytest.approx(r.score) for r in res} == {
+        r.url: r.score for r in expected
+    }
+
+
+def test_sharded_suggestions_and_completions(retrievers):
+    retriever, coordinator = retrievers
+    query = parse_query("caerso OR gaeras OR xyzzy")
+
+    assert coordinator.suggest(query) == retriever.suggest(query)
+    for prefix in ("", "c", "ca", "gae"):
+        assert coordinator.complete(prefix) == retriever.complete(prefix)
+
+
+def test_sharded_index_without_dictionary(corpus, tmp_path):
+    index_file = build(corpus, str(tmp_path), shards=2)
+    (tmp_path / "index.dict").unlink()
+
+    with pytest.raises(FileNotFoundError):
+        Coordinator(retriever_args(index_file, shards=2))
+
+
+def test_shard_metrics_are_merged_on_close(indexes):
+    _, sharded = indexes
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        coordinator = Coordinator(
+            retriever_args(sharded, shards=3, metrics="json")
+        )
+        for query in QUERIES:
+            coordinator.search_query(parse_query(query))
+        coordinator.close()
+
+        # Cada shard cuenta las queries que resuelve
+        assert metrics.counters["retriever.queries"] == 3 * len(QUERIES)
+        assert metrics.histograms["retriever.eval_seconds"].count == 3 * len(
+            QUERIES
+        )
+    finally:
+        metrics.reset()
+        metrics.enabled = False
+
+
+def test_worker_errors_leave_no_pending_replies(retrievers):
+    retriever, coordinator = retrievers
+    query = parse_query("caeros")
+
+    # Todos los workers responden con un error
+    with pytest.raises(AttributeError):
+        coordinator._scatter("missing_method", query)
+
+    expected = retriever.search_query(query)
+    res = coordinator.search_query(query)
+    assert {r.url: pytest.approx(r.score) for r in res} == {
+        r.url: r.score for r in expected
+    }
+
+
+def test_dead_shard_worker_is_reported(corpus, tmp_path):
+    index_file = build(corpus, str(tmp_path), shards=2)
+    (tmp_path / "index.1").unlink()
+
+    coordinator = Coordinator(retriever_args(index_file, shards=2))
+    with pytest.raises(RuntimeError, match=r"shards 1 \(.*index\.1\)"):
+        coordinator.search_query(parse_query("caeros"))
+    coordinator.close()
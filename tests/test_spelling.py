@@ -0,0 +1,75 @@
+import random
+
+import pytest
+from helpers import build
+
+from src.indexer.index import Index
+from src.indexer.spelling import EditDistance, edit_distance
+
+
+def osa_distance(a, b):
+    """Distancia de alineamiento óptimo con la matriz completa"""
+    d = [
+        [i + j if i * j == 0 else 0 for j in range(len(b) + 1)]
+        for i in range(len(a) + 1)
+    ]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(
+                d[i - 1][j] + 1,
+                d[i][j - 1] + 1,
+                d[i - 1][j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if (
+                i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def random_word(rng, max_length=10):
+    return "".join(rng.choices("abcd", k=rng.randint(0, max_length)))
+
+
+@pytest.mark.parametrize("max_distance", [0, 1, 2, 3])
+def test_edit_distance_matches_full_matrix(max_distance):
+    rng = random.Random(max_distance)
+    for _ in range(300):
+        term = random_word(rng)
+        # Candidatos en orden, muchos con prefijos comunes, como en `fuzzy`
+        candidates = {random_word(rng) for _ in range(30)}
+        candidates.update(
+            term[:i] + random_word(rng, 3) for i in range(len(term))
+        )
+        distance = EditDistance(term, max_distance)
+        for candidate in sorted(candidates):
+            expected = min(osa_distance(term, candidate), max_distance + 1)
+            assert distance(candidate) == expected, (term, candidate)
+            assert edit_distance(term, candidate, max_distance) == expected
+
+
+def test_fuzzy_matches_vocabulary_scan(corpus, tmp_path):
+    index = Index.load(build(corpus, str(tmp_path)))
+    rng = random.Random(0)
+
+    for term in rng.sample(index.terms, 100):
+        # Una o dos ediciones aleatorias
+        typo = term
+        for _ in range(rng.randint(1, 2)):
+            i = rng.randrange(len(typo) + 1)
+            typo = typo[:i] + rng.choice("aeiolrs") + typo[i + 1 :]
+
+        matches = [
+            (osa_distance(typo, t), -len(index.postings[t]), t)
+            for t in index.terms
+            if abs(len(t) - len(typo)) <= index.max_edit_distance
+        ]
+        expected = [
+            t for d, _, t in sorted(matches) if d <= index.max_edit_distance
+        ]
+        # Con pocos términos la búsqueda para antes de la distancia máxima
+        for limit in (1, 3, 1000):
+            assert index.fuzzy(typo, limit) == expected[:limit], typo
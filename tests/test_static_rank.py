@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pytest
+from helpers import build
+
+from src.benchmark.querying import retriever_args
+from src.indexer import index as index_module
+from src.indexer.graph import pagerank
+from src.indexer.index import Index
+from src.instrumentation.metrics import metrics
+from src.retriever import retriever as retriever_module
+from src.retriever.parser import parse_query
+from src.retriever.retriever import Retriever
+
+QUERIES = ("caeros", "ca* OR gaera", "NOT gaera", "ni* OR sibra* OR trecu")
+
+
+def test_pagerank_matches_dense_power_iteration():
+    rng = np.random.default_rng(0)
+    n_docs = 50
+    src = rng.integers(0, n_docs, 300)
+    dst = rng.integers(0, n_docs, 300)
+    # Documentos sin enlaces salientes
+    keep = src >= 5
+    src, dst = src[keep], dst[keep]
+
+    # Matriz de transición por columnas, los documentos sin enlaces
+    # salientes enlazan a todos
+    transition = np.zeros((n_docs, n_docs))
+    np.add.at(transition, (dst, src), 1)
+    out_degree = transition.sum(axis=0)
+    transition[:, out_degree == 0] = 1
+    transition /= transition.sum(axis=0)
+
+    expected = np.full(n_docs, 1 / n_docs)
+    for _ in range(1000):
+        expected = 0.85 * transition @ expected + 0.15 / n_docs
+
+    rank = pagerank(n_docs, src, dst)
+    assert rank.sum() == pytest.approx(1)
+    assert rank == pytest.approx(expected, abs=1e-9)
+
+
+@pytest.fixture(scope="module")
+def static_index(corpus, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("static")
+    return build(corpus, str(folder), orden_estatico=True)
+
+
+def test_early_stop_matches_bm25(static_index, monkeypatch):
+    # Bloques pequeños para que el corpus de prueba tenga varios
+    monkeypatch.setattr(retriever_module, "BLOCK_SIZE", 1)
+    args = dict(ranking="bm25", max_resultados=2, peso_estatico=0.5)
+    retriever = Retriever(retriever_args(static_index, **args))
+    early = Retriever(
+        retriever_args(static_index, parada_temprana=True, **args)
+    )
+
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        for query in QUERIES + ("gaera", "dé"):
+            expected = retriever.search_query(parse_query(query))
+            res = early.search_query(parse_query(query))
+            assert [r.score for r in res] == pytest.approx(
+                [r.score for r in expected]
+            )
+        assert metrics.counters["retriever.early_stops"] > 0
+    finally:
+        metrics.reset()
+        metrics.enabled = False
+
+
+def test_early_stop_without_results(static_index, monkeypatch):
+    monkeypatch.setattr(retriever_module, "BLOCK_SIZE", 1)
+    args = dict(ranking="bm25", max_resultados=0, parada_temprana=True)
+    retriever = Retriever(retriever_args(static_index, **args))
+    assert retriever.search_query(parse_query("gaera OR caeros")) == []
+
+
+def test_static_order_keeps_results(corpus, static_index, tmp_path):
+    index_file = build(corpus, str(tmp_path))
+    args = dict(ranking="bm25", max_resultados=1000, peso_estatico=0.5)
+    retriever = Retriever(retriever_args(index_file, **args))
+    ordered = Retriever(retriever_args(static_index, **args))
+
+    ranks = Index.load(index_file).static_rank
+    assert list(ordered.index.static_rank) == sorted(ranks, reverse=True)
+    for query in QUERIES:
+        expected = retriever.search_query(parse_query(query))
+        res = ordered.search_query(parse_query(query))
+        assert {r.url: pytest.approx(r.score) for r in res} == {
+            r.url: r.score for r in expected
+        }
+
+
+def test_load_backfills_missing_fields(corpus, tmp_path):
+    index_file = build(corpus, str(tmp_path / "nuevo"))
+    index = Index.load(index_file)
+
+    # Un índice que solo tiene posting lists y documentos, como los de la
+    # primera versión
+    old = Index.__new__(Index)
+    old.__dict__.update(
+        postings={t: list(docs) for t, docs in index.postings.items()},
+        documents=index.documents,
+    )
+    old_file = str(tmp_path / "antiguo")
+    index_module._dump(old, old_file, False)
+    assert not os.path.exists(old_file + index_module.DELETES_SUFFIX)
+
+    loaded = Index.load(old_file)
+    assert loaded.terms == index.terms
+    assert list(loaded.df) == list(index.df)
+    assert loaded.complete("ca", 5) == index.complete("ca", 5)
+    assert loaded.static_rank == Index().static_rank
+    assert loaded.forms == {}
+    assert loaded.max_edit_distance == index.max_edit_distance
+    for term in ("caerso", "gaeras", "trceu"):
+        assert loaded.fuzzy(term, 10) == index.fuzzy(term, 10)
+
+    args = dict(ranking="bm25", max_resultados=1000)
+    for query in ("caeros", "ca* OR gaera", "~caerso"):
+        expected = Retriever(retriever_args(index_file, **args))
+        res = Retriever(retriever_args(old_file, **args))
+        assert res.search_query(parse_query(query)) == expected.search_query(
+            parse_query(query)
+        )